@@ -6,6 +6,8 @@ as either a headless batch process or a web application. It handles configuratio
 user authentication, session state management and rendering. The design allows for both automated
 and interactive workflows, supporting real-time operation, scenario analysis across-markets and manual overrides.
 """
+import argparse
+import json
 import logging
 import math
 import runpy
@@ -45,7 +47,13 @@ def main() -> None:
             return
         try:
             data = Box({key.lower(): value for key, value in optibat.settings.as_dict().items()})  # fmt: off
-            optibat.optibat(data)
+            data = optibat.optibat(data)
+            if not data.optimal:
+                logger.warning("Solution is not optimal (gap %.2f%%, %.1f s), bidding the best incumbent", data.gap * 100.0, data.solve_seconds)  # fmt: off
+            # One JSON object per run, so that regressions can be tracked from the logs.
+            logger.info("Model stats: %s", json.dumps(data.model_stats.to_dict()))
+            if data.model_benchmark:
+                logger.info("Model benchmark: %s", data.benchmark.to_dict())
         except Exception as e:
             logger.exception(e)
         finally:
@@ -500,7 +508,7 @@ def main() -> None:
         )
 
         if ss.data is not None and not ss.data.optimal:
-            st.warning("No se pudo encontrar una solución óptima.")
+            st.warning(f"No se pudo encontrar una solución óptima (gap {ss.data.gap:.2%}).")
 
         st.caption(
             """
@@ -1380,6 +1388,29 @@ def main() -> None:
     ss.run = False
 
 
+def benchmark() -> None:
+    """
+    Offline benchmark entrypoint.
+
+    Replays a model corpus (see model_corpus_path) against every installed solver and
+    formulation variant, and prints the percentiles of time, iterations, nodes, objective, profit and gap.
+    """
+    defaults = Box({key.lower(): value for key, value in optibat.settings.as_dict().items()})  # fmt: off
+    parser = argparse.ArgumentParser(prog="optibat-benchmark", description="Replay a model corpus against several solvers and formulations.")  # fmt: off
+    parser.add_argument("corpus", nargs="?", default=defaults.model_corpus_path, help="corpus directory (model_corpus_path by default)")  # fmt: off
+    parser.add_argument("--solver", nargs="+", default=None, help="solvers to benchmark (every installed solver by default)")  # fmt: off
+    parser.add_argument("--variant", nargs="+", default=None, help="formulation variants to benchmark (all by default)")  # fmt: off
+    parser.add_argument("--output", default=None, help="CSV file for every run")
+    args = parser.parse_args()
+    if args.corpus is None:
+        parser.error("no corpus directory, pass one or set model_corpus_path")
+
+    benchmark = optibat.model.run_benchmark(args.corpus, solvers=args.solver, variants=args.variant, defaults=defaults)  # fmt: off
+    if args.output is not None:
+        benchmark.runs.to_csv(args.output, index=False)
+    print(benchmark.percentiles.to_string())
+
+
 def _on_click_run() -> None:
     # If using manual overrides, apply them but do not modify rest of config.
     if (
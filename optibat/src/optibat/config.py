@@ -284,6 +284,11 @@ settings.validators.register(
         default=5.0,
         is_type_of=float,
     ),
+    Validator(
+        "BESS_PRICING",
+        default="semicycle",
+        is_in=["semicycle", "shadow_price"],
+    ),
     Validator(
         "BESS_GRID_IMPORT_NET_FIXED_MEGAWATT",
         default=lambda settings, validator: dict(),
@@ -314,10 +319,138 @@ settings.validators.register(
         default=math.inf,
         is_type_of=float,
     ),
+    Validator(
+        "GRID_CONNECTION_EXPORT_LIMIT_MEGAWATT",
+        default=math.inf,
+        is_type_of=float,
+    ),
     Validator(
         "SOLVER",
         default="glpk",
-        is_type_of=str,
+        # A list races every solver and keeps the first optimal solution.
+        is_type_of=str | list,
+    ),
+    Validator(
+        "SOLVER_TIME_LIMIT_SECOND",
+        default=None,
+        is_type_of=float | int | None,
+    ),
+    Validator(
+        "SOLVER_GAP_PERCENT",
+        default=None,
+        is_type_of=float | None,
+    ),
+    Validator(
+        "MODEL_DECOMPOSITION",
+        default=None,
+        is_in=[None, "rolling", "hierarchical"],
+    ),
+    Validator(
+        "MODEL_WINDOW_DAY",
+        default=1,
+        is_type_of=int,
+        gte=1,
+    ),
+    Validator(
+        "MODEL_LOOKAHEAD_DAY",
+        default=1,
+        is_type_of=int,
+        gte=0,
+    ),
+    Validator(
+        "MODEL_COARSE_MINUTE",
+        default=60,
+        is_type_of=int,
+        gte=1,
+    ),
+    Validator(
+        "MODEL_RELAXATION",
+        default=True,
+        is_type_of=bool,
+    ),
+    Validator(
+        "MODEL_HEURISTIC",
+        default=True,
+        is_type_of=bool,
+    ),
+    Validator(
+        "MODEL_RECEDING_HORIZON",
+        default=False,
+        is_type_of=bool,
+    ),
+    # Shadow prices are only computed when requested, since they take another solve.
+    Validator(
+        "MODEL_SHADOW_PRICES",
+        default=False,
+        is_type_of=bool,
+    )
+    & (
+        Validator("MODEL_SHADOW_PRICES", eq=True)
+        | Validator("BESS_PRICING", ne="shadow_price")
+    ),
+    Validator(
+        "MODEL_SCALING",
+        default=False,
+        is_type_of=bool,
+    ),
+    Validator(
+        "MODEL_SPREAD_BOUND",
+        default=True,
+        is_type_of=bool,
+    ),
+    Validator(
+        "MODEL_DYNAMIC_PROGRAMMING",
+        default=False,
+        is_type_of=bool,
+    ),
+    Validator(
+        "MODEL_DYNAMIC_PROGRAMMING_STEP_PERCENT",
+        default=1.0,
+        is_type_of=float,
+        gt=0.0,
+        lte=100.0,
+    ),
+    Validator(
+        "MODEL_DYNAMIC_PROGRAMMING_BISECTION_COUNT",
+        default=20,
+        is_type_of=int,
+        gte=0,
+    ),
+    Validator(
+        "MODEL_TIGHT_BIG_M",
+        default=True,
+        is_type_of=bool,
+    ),
+    # HiGHS (appsi_highs and the scipy matrix backend) and glpk have no special ordered sets.
+    Validator(
+        "MODEL_INDICATOR_FORMULATION",
+        default="big_m",
+        is_in=["big_m", "sos1"],
+    )
+    & (
+        Validator("MODEL_INDICATOR_FORMULATION", ne="sos1")
+        | Validator("SOLVER", is_not_in=["glpk", "highs", "appsi_highs", "scipy"])
+    ),
+    Validator(
+        "MODEL_CACHE_SIZE",
+        default=32,
+        is_type_of=int,
+        gte=0,
+    ),
+    Validator(
+        "MODEL_CACHE_PATH",
+        default=None,
+        is_type_of=str | None,
+    ),
+    Validator(
+        "MODEL_CORPUS_PATH",
+        default=None,
+        is_type_of=str | None,
+    ),
+    Validator(
+        "MODEL_BENCHMARK",
+        default=False,
+        is_type_of=bool,
     ),
     Validator(
         "OUTPUT_XXXX_XXXX_PATH",
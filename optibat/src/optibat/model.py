@@ -12,20 +12,38 @@ Author: Josu Gomez Arana (XXXX_XXXX)
 
 from __future__ import annotations
 
-import math
+import hashlib
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import warnings
+import weakref
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Iterator
+from pathlib import Path
+from typing import Callable, Iterator, assert_never
 
 import numpy as np
 import pandas as pd
 import pyomo.environ as pyo
+import scipy
 from box import Box
 from pandas import Series
+from pyomo.common.collections import ComponentMap
+from pyomo.common.errors import ApplicationError
 from pyomo.common.modeling import NOTSET, unique_component_name
+from pyomo.contrib.appsi.base import LegacySolverInterface
 from pyomo.core.base import BlockData
-from pyomo.core.base.indexed_component import IndexedComponent
+from pyomo.core.expr import identify_variables
 from pyomo.environ import ConcreteModel, Model
 from pyomo.opt import OptSolver, SolverResults
+from pyomo.repn import generate_standard_repn
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
 
 
 def run_model(data: Box) -> Box:
@@ -40,267 +58,2416 @@ def run_model(data: Box) -> Box:
         data (Box): Input data and configuration for the optimization.
 
     Returns:
-        Box: The merged input data and optimization results.
+        Box: The merged input data and optimization results, including where the time went and the
+        size of the model (model_stats) and whether the solution comes from the cache (cached).
+
+    It is safe to call from a thread pool, for example for several control panel sessions or
+    modules at once. Models are built, updated and processed in parallel, every thread lends its own
+    template and persistent solver, and only the Pyomo solver calls themselves are serialized.
+    The matrix backend (scipy) solves in parallel too.
+    """
+    fingerprint = _fingerprint(data) if not data.model_benchmark or data.model_corpus_path is not None else None
+    # Benchmarks measure the solve itself, so they always solve.
+    solution = _cached_solution(fingerprint, data) if not data.model_benchmark else None
+    if solution is not None:
+        return data | solution | Box(cached=True)
+
+    start = time.perf_counter()
+    solution = _optimize(data)
+    seconds = time.perf_counter() - start
+    # Cache hits were exported when they were first solved.
+    if data.model_corpus_path is not None:
+        _export_instance(data, fingerprint)
+    # Decomposed solutions are never proven optimal, but they are reproducible if every subproblem is.
+    if not data.model_benchmark and solution.get("subproblems_optimal", solution.optimal):
+        _cache_solution(fingerprint, solution, data)
+    solution = solution | Box(cached=False)
+    if data.model_benchmark:
+        benchmark = _benchmark(data, solution, seconds)
+        solution = solution | Box(benchmark=benchmark)
+        # The benchmark reference is the full resolution solve the hierarchical objective delta is measured against.
+        if "hierarchical" in solution:
+            solution.hierarchical = solution.hierarchical | Box(objective_delta_euro=-benchmark.objective_loss_euro)
+    return data | solution
+
+
+def run_scenarios(scenarios: list[Box], processes: int = 1) -> list[Box]:
+    """
+    Build, solve, and process the battery optimization model for several scenarios at once.
+
+    Intended for what if studies, where the same module is optimized many times while varying
+    thresholds, tolerances or forecasts. Every scenario is a block of a single model, which is
+    solved once with the (Pyomo) solver of the first scenario, instead of paying one solver startup and
+    one file round trip per scenario. The objective is the sum of the scenario objectives, which
+    are independent, so each block is still optimal on its own. With more than one process, the
+    scenarios are split in as many models and solved in parallel.
+
+    Args:
+        scenarios (list[Box]): Input data and configuration for every scenario, with the same topology.
+        processes (int): Number of worker processes, 1 solves everything in this process.
+
+    Returns:
+        list[Box]: The merged input data and optimization results of every scenario, in order.
+    """
+    if processes <= 1 or len(scenarios) <= 1:
+        solutions = _solve_scenarios(scenarios)
+        return [data | solution for data, solution in zip(scenarios, solutions)]
+
+    # Uploaded files are not needed by the model and might not be picklable.
+    batches = [
+        [scenarios[i] | Box(market_csv=None) for i in batch]
+        for batch in np.array_split(np.arange(len(scenarios)), min(processes, len(scenarios)))
+    ]
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=len(batches)) as pool:
+        solutions = [solution for batch in pool.map(_solve_scenarios, batches) for solution in batch]
+    return [data | solution for data, solution in zip(scenarios, solutions)]
+
+
+def run_fleet(modules: list[Box]) -> list[Box]:
+    """
+    Build, solve, and process the battery optimization model for a fleet of modules sharing a grid connection.
+
+    Modules behind the same connection point are usually configured with conservative splits of its
+    export limit (grid_export_limit_megawatt), so that each one can be optimized on its own. Instead,
+    every module is a block of a single model, coupled by the shared export limit of the connection
+    (grid_connection_export_limit_megawatt of the first module), so that the capacity one module does
+    not use is available to the others. The model is solved once with the (Pyomo) solver of the first
+    module, and the objective is the sum of the module objectives.
+
+    Args:
+        modules (list[Box]): Input data and configuration for every module, with the same market periods.
+
+    Returns:
+        list[Box]: The merged input data and optimization results of every module, in order.
+    """
+    solutions = _solve_fleet(modules)
+    return [data | solution for data, solution in zip(modules, solutions)]
+
+
+def run_benchmark(corpus_path: str, solvers: list[str] | None = None, variants: list[str] | None = None, defaults: Box | None = None) -> Box:
+    """
+    Replay every instance of a model corpus against several solvers and formulation variants.
+
+    Instances are captured by run_model when model_corpus_path is set, one directory per instance
+    with its model inputs and the built model as LP and MPS files (see _export_instance). Replaying
+    the inputs, instead of the files, lets every formulation variant be built for every instance, so
+    performance regressions can be detected offline without querying the warehouse.
+
+    Args:
+        corpus_path (str): Directory of the corpus.
+        solvers (list[str] | None): Solvers to benchmark, every installed solver if None.
+        variants (list[str] | None): Formulation variants to benchmark (see _BENCHMARK_VARIANTS), all if None.
+        defaults (Box | None): Settings for inputs missing from older instances.
+
+    Returns:
+        Box: Every run (runs), with the engine that actually solved it (a solver, dynamic_programming or spread_bound),
+            and the percentiles of time, iterations, nodes, objective, profit and gap by solver and variant (percentiles).
+    """
+    solvers = solvers if solvers is not None else _installed_solvers()
+    variants = variants if variants is not None else list(_BENCHMARK_VARIANTS)
+
+    rows = []
+    for path in sorted(Path(corpus_path).expanduser().glob(f"*/{_CORPUS_INPUTS_FILE}")):
+        data = (defaults or Box()) | _read_instance(path)
+        parameters = _model_parameters(data)
+        for solver in solvers:
+            for variant in variants:
+                # The sos1 variant would only measure the big_m fallback (see _indicator_formulation).
+                if _BENCHMARK_VARIANTS[variant].get("model_indicator_formulation") == "sos1" and not _sos_capable(solver):
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    solution = _optimize(data | Box(solver=solver) | _BENCHMARK_VARIANTS[variant])
+                # Failed runs are not optimal.
+                except (ApplicationError, NotImplementedError, RuntimeError, ValueError):
+                    solution = None
+                seconds = time.perf_counter() - start
+                iterations = solution.model_stats.get("iterations") if solution is not None else None
+                nodes = solution.model_stats.get("nodes") if solution is not None else None
+                rows.append({
+                    "instance": path.parent.name,
+                    "solver": solver,
+                    "variant": variant,
+                    "seconds": seconds,
+                    "iterations": iterations if iterations is not None else np.nan,
+                    "nodes": nodes if nodes is not None else np.nan,
+                    "engine": solution.model_stats.solver if solution is not None else None,
+                    "objective_euro": _objective(solution, parameters) if solution is not None else np.nan,
+                    "profit_euro": solution.bess_profit_euro + solution.res_profit_euro if solution is not None else np.nan,
+                    "gap": solution.gap if solution is not None else np.nan,
+                    "optimal": solution.optimal if solution is not None else False,
+                })
+
+    runs = pd.DataFrame(rows, columns=["instance", "solver", "variant", "seconds", "iterations", "nodes", "engine", "objective_euro", "profit_euro", "gap", "optimal"])  # fmt: off
+    # What each run gives away against the best schedule found for the same instance.
+    runs["objective_loss_euro"] = runs.groupby("instance")["objective_euro"].transform("max") - runs["objective_euro"]
+    percentiles = (
+        runs.groupby(["solver", "variant"])[["seconds", "iterations", "nodes", "objective_euro", "objective_loss_euro", "profit_euro", "gap"]]
+        .quantile(_BENCHMARK_PERCENTILES)
+        .unstack()
+    )
+    benchmark = Box(runs=runs, percentiles=percentiles)
+    return benchmark
+
+
+def _solve_scenarios(scenarios: list[Box]) -> list[Box]:
+    """
+    Builds one block per scenario in a single model, solves it once and returns the solution of every block.
+    """
+    solutions = _solve_blocks(scenarios)
+    return solutions
+
+
+def _solve_fleet(modules: list[Box]) -> list[Box]:
+    """
+    Builds one block per module in a single model, couples them by the shared grid export limit,
+    solves it once and returns the solution of every block.
+    """
+    # Blocks are coupled period by position, so the periods themselves must be the same, not just their number.
+    for data in modules[1:]:
+        if not data.market_input.index.equals(modules[0].market_input.index):
+            raise ValueError(f"Modules of a fleet must have the same market periods: {data.dim_up_grid_export}")
+
+    grid_connection_export_limit_megawatt = modules[0].grid_connection_export_limit_megawatt
+    # Each module may export up to the whole connection, the fleet rule splits it between them.
+    if not np.isinf(grid_connection_export_limit_megawatt):
+        modules = [data | Box(grid_export_limit_megawatt=grid_connection_export_limit_megawatt) for data in modules]
+
+    def couple(model):
+        # Periods without price are left out of each block, so they must be the same too.
+        for i in model.block:
+            if not model.block[i].market_label.equals(model.block[0].market_label):
+                raise ValueError(f"Modules of a fleet must have the same priced market periods: {modules[i].dim_up_grid_export}")
+
+        # Without a shared limit, the fleet is just the sum of its modules.
+        if np.isinf(grid_connection_export_limit_megawatt):
+            return
+
+        @model.Constraint(model.block[0].market)
+        def grid_export_limit_rule(model, i):
+            return sum(
+                model.block[j].res_grid_export_net_megawatt_hour[i]
+                + model.block[j].bess_grid_export_net_megawatt_hour[i]
+                for j in model.block
+            ) <= min(
+                pyo.value(model.block[j].grid_export_limits_megawatt[i])
+                * (pyo.value(model.block[j].market_time_unit_minute) * (1.0 / 60.0))
+                for j in model.block
+            )
+
+    solutions = _solve_blocks(modules, couple)
+    return solutions
+
+
+def _solve_blocks(blocks: list[Box], couple: Callable[[pyo.ConcreteModel], None] | None = None) -> list[Box]:
+    """
+    Builds one block per input in a single model, solves it once and returns the solution of every block.
+
+    The coupling, if any, adds the constraints between the blocks. The objective is the sum of the block
+    objectives, and a portfolio is not raced here, the first solver of the first block is used instead.
+    The blocks are always the MIP, without the spread bound, dynamic programming, relaxation and heuristic
+    paths of run_model, which only apply to a single module, and the matrix backend (scipy) cannot hold them.
+    The model statistics of every block are its own size and the outcome of the shared solve.
     """
-    with _disable_index_checking():
-        model = _create_model(data)
-        optimal = _apply_optimizer(model, data)
+    solver = blocks[0].solver if isinstance(blocks[0].solver, str) else blocks[0].solver[0]
+    if solver == "scipy":
+        raise ValueError("Scenarios and fleets are block models, which need a Pyomo solver instead of the matrix backend (scipy)")
+
+    start = time.perf_counter()
+    model = pyo.ConcreteModel()
+    model.block = pyo.Block(range(len(blocks)))
+    for i, data in enumerate(blocks):
+        parameters = _model_parameters(data)
+        _build_model(model.block[i], parameters, _presolve(parameters))
+        model.block[i].market_rule.deactivate()
+
+    if couple is not None:
+        couple(model)
+
+    model.block_rule = pyo.Objective(
+        expr=sum(model.block[i].market_rule.expr for i in model.block),
+        sense=pyo.maximize,
+    )
+
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with pyo.SolverFactory(solver) as opt:
+        results, stage_seconds = _lexisolve(opt, model, scaling=blocks[0].model_scaling, options=_solver_options(blocks[0] | Box(solver=solver)))
+    status = _termination(results) | Box(stage_seconds=stage_seconds)
+    solve_seconds = time.perf_counter() - start
+
+    solutions = []
+    for i, data in enumerate(blocks):
+        start = time.perf_counter()
+        values = _process_results(model.block[i], data)
+        load_seconds = time.perf_counter() - start
+        model_stats = Box(
+            build_seconds=build_seconds,
+            write_seconds=solve_seconds - status.solver_seconds if status.solver_seconds is not None else None,
+            solve_seconds=status.solver_seconds if status.solver_seconds is not None else solve_seconds,
+            load_seconds=load_seconds,
+            **_model_size(model.block[i]),
+            solver=solver,
+            solver_version=_solver_version(data | Box(solver=solver)),
+            termination=status.termination,
+            gap=status.gap,
+            nodes=status.nodes,
+            iterations=status.iterations,
+        )
+        solutions.append(Box(**status, solve_seconds=solve_seconds, model_stats=model_stats, **values))
+    return solutions
+
+
+def _optimize(data: Box) -> Box:
+    """
+    Solves the model with the configured decomposition strategy, returning only the solution.
+    """
+    if data.model_receding_horizon and _frozen_periods(data).any():
+        solution = _solve_receding_horizon(data)
+        return solution
+
+    match data.model_decomposition:
+        case "rolling":
+            solution = _solve_rolling(data)
+            return solution
+        case "hierarchical":
+            solution = _solve_hierarchical(data)
+            return solution
+        case None:
+            solution = _solve_monolithic(data)
+            return solution
+        case _:
+            assert_never()
+
+
+# Settings that change the solution for the same inputs, besides the model parameters themselves.
+_FINGERPRINT_SETTINGS = (
+    "solver",
+    "solver_time_limit_second",
+    "solver_gap_percent",
+    "model_decomposition",
+    "model_window_day",
+    "model_lookahead_day",
+    "model_coarse_minute",
+    "model_shadow_prices",
+    "model_receding_horizon",
+    "model_scaling",
+    "model_relaxation",
+    "model_heuristic",
+    "model_spread_bound",
+    "model_dynamic_programming",
+    "model_dynamic_programming_step_percent",
+    "model_dynamic_programming_bisection_count",
+    "model_tight_big_m",
+    "model_indicator_formulation",
+)
+
+
+# Version of the cached solutions, bumped whenever the formulation or the encoding changes, so that
+# solutions cached by earlier releases are never returned for the same inputs.
+_CACHE_VERSION = 2
+
+
+def _fingerprint(data: Box) -> str:
+    """
+    Hashes every input of the model (prices, matched positions, limits, battery parameters, fixed schedules
+    and solver settings) into a key that is stable across processes, unlike the builtin hash.
+
+    The cache version and the package version are part of the key, so that upgrades never reuse old solutions.
+    """
+    # Every input reaches the model through its parameters, and results are aligned to the input index.
+    inputs = _model_parameters(data).to_dict() | {name: data.get(name) for name in _FINGERPRINT_SETTINGS}
+    try:
+        inputs["version"] = (_CACHE_VERSION, importlib.metadata.version("optibat"))
+    # Running from the sources without installing the package.
+    except importlib.metadata.PackageNotFoundError:
+        inputs["version"] = (_CACHE_VERSION, None)
+    inputs["market_input"] = data.market_input.index
+    # Frozen periods are taken from the session start and the actual state of charge instead.
+    if data.get("model_receding_horizon"):
+        inputs["market_frozen"] = _frozen_periods(data).astype(float)
+        inputs["bess_actual_state_of_charge_megawatt_hour"] = _align(data.bess_actual_state_of_charge_megawatt_hour, data.market_input.index)  # fmt: off
+
+    digest = hashlib.sha256()
+    for name, value in sorted(inputs.items()):
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray):
+            digest.update(np.ascontiguousarray(value, dtype=float).tobytes())
+        elif isinstance(value, pd.Index):
+            digest.update("\0".join(map(str, value)).encode())
+        else:
+            digest.update(repr(value).encode())
+        digest.update(b"\0")
+    fingerprint = digest.hexdigest()
+    return fingerprint
+
+
+# Encoded solutions by input fingerprint, least recently used first.
+_solutions: OrderedDict[str, bytes] = OrderedDict()
+
+_solutions_lock = threading.Lock()
+
+
+def _cached_solution(fingerprint: str, data: Box) -> Box | None:
+    """
+    Returns the stored solution for the fingerprint, from memory or else from the disk cache, or None if there is none.
+
+    Solutions are stored encoded, so every hit is a fresh copy that callers can modify freely.
+    """
+    if data.model_cache_size == 0:
+        return None
+
+    with _solutions_lock:
+        content = _solutions.get(fingerprint)
+        if content is not None:
+            _solutions.move_to_end(fingerprint)
+    if content is not None:
+        solution = _decode_solution(content)
+        return solution
+
+    if data.model_cache_path is None:
+        return None
+
+    path = Path(data.model_cache_path).expanduser() / f"{fingerprint}.json"
+    try:
+        content = path.read_bytes()
+        # Touch the file, so that disk eviction is least recently used too.
+        path.touch()
+    except FileNotFoundError:
+        return None
+
+    _store_solution(fingerprint, content, data.model_cache_size)
+    solution = _decode_solution(content)
+    return solution
+
+
+def _cache_solution(fingerprint: str, solution: Box, data: Box) -> None:
+    """
+    Stores a solution in memory and, if a cache path is configured, on disk, evicting the least recently used ones.
+
+    The disk cache is shared by every process of the machine (headless runs and the control panel), so files are
+    replaced atomically and a file removed by another process while evicting is not an error.
+    """
+    if data.model_cache_size == 0:
+        return
+
+    content = _encode_solution(solution)
+    _store_solution(fingerprint, content, data.model_cache_size)
+
+    if data.model_cache_path is None:
+        return
+
+    directory = Path(data.model_cache_path).expanduser()
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as file:
+        file.write(content)
+    os.replace(file.name, directory / f"{fingerprint}.json")
+
+    def last_used(path):
+        try:
+            return path.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    paths = sorted(directory.glob("*.json"), key=last_used)
+    for path in paths[: max(len(paths) - data.model_cache_size, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def _store_solution(fingerprint: str, content: bytes, maxsize: int) -> None:
+    """
+    Stores an encoded solution in memory, evicting the least recently used ones.
+    """
+    with _solutions_lock:
+        _solutions[fingerprint] = content
+        _solutions.move_to_end(fingerprint)
+        while len(_solutions) > maxsize:
+            _solutions.popitem(last=False)
+
+
+def _encode_solution(solution: Box) -> bytes:
+    """
+    Encodes a solution as JSON, with Series as their labels and values, both with their data type.
+
+    The cache directory might be writable by other users, and unlike pickles, decoding JSON never runs any code.
+    """
+
+    def encode(value):
+        if isinstance(value, Series):
+            return {"index": value.index.tolist(), "index_dtype": str(value.index.dtype), "values": [None if pd.isna(item) else item for item in value.tolist()], "dtype": str(value.dtype)}  # fmt: off
+        if isinstance(value, (np.floating, np.integer, np.bool_)):
+            return value.item()
+        if isinstance(value, pd.Timestamp):
+            return value.isoformat()
+        raise TypeError(f"Cannot encode {type(value).__name__} in the solution cache")
+
+    content = json.dumps(solution, default=encode).encode()
+    return content
+
+
+def _decode_solution(content: bytes) -> Box:
+    """
+    Decodes a solution encoded by _encode_solution.
+    """
+
+    def decode(value):
+        if value.keys() == {"index", "index_dtype", "values", "dtype"}:
+            return pd.Series(data=value["values"], index=pd.Index(value["index"], dtype=value["index_dtype"]), dtype=value["dtype"])  # fmt: off
+        return value
+
+    solution = Box(json.loads(content, object_hook=decode))
+    return solution
+
+
+def _solve_monolithic(data: Box) -> Box:
+    """
+    Solves the whole horizon at once, racing the solvers if a portfolio is configured.
+
+    If enabled, standalone modules are solved by dynamic programming first, which is much cheaper than
+    the MIP, and only fall back to it if the cycle cap leaves a gap. Modules whose prices cannot pay for
+    any cycle are left idle without solving anything.
+    """
+    parameters = _model_parameters(data)
+    if _spread_bound_condition(data, parameters):
+        solution = _solve_idle(data, parameters)
+        return solution
+
+    if _dynamic_programming_condition(data):
+        solution = _solve_dynamic_programming(data, parameters)
+        if solution.optimal:
+            return solution
+
+    solution = _race_optimizers(data) if isinstance(data.solver, list) else _solve(data, parameters)
+    return solution
+
+
+def _solve(data: Box, parameters: Box) -> Box:
+    """
+    Builds, solves and processes the model with a single solver, returning only the solution.
+
+    The parameters and the presolve are computed once here and passed down to every stage.
+    """
+    # The matrix backend skips Pyomo entirely, which pays off on long horizons where
+    # building the model takes longer than solving it.
+    # Most days the LP relaxation is already integral, so the MIP is only solved if it is not.
+    if data.solver == "scipy":
+        start = time.perf_counter()
+        matrix = _create_matrix(parameters)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        status = _apply_matrix_optimizer(matrix, data, relaxed=True) if data.model_relaxation else None
+        if status is None or not status.optimal:
+            status = _apply_matrix_optimizer(matrix, data)
+        solve_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        values = _process_matrix_results(matrix, data)
+        load_seconds = time.perf_counter() - start
+        # The arrays are handed over to HiGHS in memory, there is nothing to write.
+        model_stats = Box(
+            build_seconds=build_seconds,
+            write_seconds=None,
+            solve_seconds=solve_seconds,
+            load_seconds=load_seconds,
+            variables=len(matrix.c),
+            binaries=int(np.count_nonzero(matrix.integrality)),
+            constraints=matrix.A.shape[0],
+            nonzeros=matrix.A.nnz,
+            solver=data.solver,
+            solver_version=_solver_version(data),
+            termination=status.termination,
+            gap=status.gap,
+            nodes=status.nodes,
+            iterations=status.iterations,
+        )
+        solution = Box(**status, solve_seconds=solve_seconds, model_stats=model_stats, **values)
+        return solution
+
+    presolve = _presolve(parameters)
+    start = time.perf_counter()
+    with _template_model(parameters, presolve) as model:
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        relaxed_status = _apply_relaxed_optimizer(model, data) if data.model_relaxation else None
+        status = relaxed_status
+        if status is None or not status.optimal:
+            status = _apply_optimizer(model, data, parameters)
+        solve_seconds = time.perf_counter() - start
+        start = time.perf_counter()
         values = _process_results(model, data)
-        solution = Box(optimal=optimal, **values)
-        return data | solution
+        load_seconds = time.perf_counter() - start
+        # The LP is solved after reading the schedule, which it might replace by an alternative optimum.
+        # There is no schedule to fix if the gap is unknown.
+        shadow_prices = _apply_shadow_prices(model, data) if data.model_shadow_prices and not np.isnan(status.gap) else {}
+
+        # The rest of each solve call is spent writing the problem and reading the solution back.
+        statuses = [status] if relaxed_status is None or relaxed_status is status else [relaxed_status, status]
+        solver_seconds = sum(status.solver_seconds for status in statuses) if all(status.solver_seconds is not None for status in statuses) else None  # fmt: off
+        iterations = sum(status.iterations for status in statuses) if all(status.iterations is not None for status in statuses) else None  # fmt: off
+        model_stats = Box(
+            build_seconds=build_seconds,
+            write_seconds=solve_seconds - solver_seconds if solver_seconds is not None else None,
+            solve_seconds=solver_seconds if solver_seconds is not None else solve_seconds,
+            load_seconds=load_seconds,
+            **_model_size(model),
+            solver=data.solver,
+            solver_version=_solver_version(data),
+            termination=status.termination,
+            gap=status.gap,
+            nodes=status.nodes,
+            iterations=iterations,
+        )
+        solution = Box(
+            **status,
+            solve_seconds=solve_seconds,
+            presolve=Box(variables_removed=presolve.variables_removed, constraints_removed=presolve.constraints_removed),
+            model_stats=model_stats,
+            **values,
+            **shadow_prices,
+        )
+        return solution
+
+
+def _model_size(model: BlockData) -> Box:
+    """
+    Counts the free variables, binaries, active constraints and nonzeros (free variables per constraint) of a model.
+    """
+    variables = [var for var in model.component_data_objects(ctype=pyo.Var, active=True) if not var.fixed]
+    constraints = list(model.component_data_objects(ctype=pyo.Constraint, active=True))
+    nonzeros = sum(sum(1 for _ in identify_variables(constraint.body, include_fixed=False)) for constraint in constraints)  # fmt: off
+    size = Box(
+        variables=len(variables),
+        binaries=sum(var.is_binary() for var in variables),
+        constraints=len(constraints),
+        nonzeros=nonzeros,
+    )
+    return size
+
+
+# Version of every solver used so far, since asking shell solvers starts a process.
+_solver_versions: dict[str, str | None] = {}
+
+
+def _solver_version(data: Box) -> str | None:
+    """
+    Returns the version of the configured solver, or None if it does not report it.
+    """
+    if data.solver not in _solver_versions:
+        if data.solver == "scipy":
+            version = scipy.__version__
+        elif data.solver.startswith("appsi_"):
+            version = _persistent_solver(data).version()
+        else:
+            with pyo.SolverFactory(data.solver) as opt:
+                version = opt.version()
+        _solver_versions[data.solver] = ".".join(map(str, version)) if isinstance(version, tuple) else version
+    return _solver_versions[data.solver]
+
+
+def _solve_rolling(data: Box) -> Box:
+    """
+    Solves the horizon as a sequence of overlapping windows (rolling horizon decomposition).
+
+    Each window optimizes model_window_day days of detail plus model_lookahead_day days of lookahead, but
+    only commits the detail periods. The state of charge at the end of the committed periods is chained into
+    the initial state of charge of the next window. Solve time grows much faster than linearly with the horizon,
+    so several short windows are much cheaper than the monolithic solve, and only the first day is bid anyway.
+    Truncated windows cannot see the whole horizon, so with more than one window the solution is not optimal and
+    its gap is unknown (NaN), even if every window is (subproblems_optimal). The loss against the monolithic
+    solve is measured by model_benchmark.
+    """
+    # fmt: off
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    periods_per_day = round(24 * 60 / data.market_time_unit_minute)
+    window = data.model_window_day * periods_per_day
+    lookahead = data.model_lookahead_day * periods_per_day
+
+    solutions = []
+    solve_seconds = 0.0
+    model_stats = []
+    values = {}
+    bess_initial_state_of_charge_percent = data.bess_initial_state_of_charge_percent
+    for start in range(0, len(market), window):
+        horizon = market[start:start + window + lookahead]
+        last = start + window + lookahead >= len(market)
+        # The last window reaches the end of the horizon, so all of it is committed.
+        detail = market[start:start + window] if not last else horizon
+
+        window_data = data | Box(
+            market_price_euro_per_megawatt_hour=data.market_price_euro_per_megawatt_hour.where(data.market_price_euro_per_megawatt_hour.index.isin(horizon)),
+            market_horizon_day=len(horizon) / periods_per_day,
+            bess_initial_state_of_charge_percent=bess_initial_state_of_charge_percent,
+            bess_final_state_of_charge_percent=data.bess_final_state_of_charge_percent if last else None,
+        )
+        window_solution = _solve_monolithic(window_data)
+        solutions.append(window_solution)
+        solve_seconds += window_solution.solve_seconds
+        model_stats.append(window_solution.model_stats)
+
+        committed = data.market_input.index.isin(detail)
+        for name, value in window_solution.items():
+            if not isinstance(value, Series):
+                continue
+
+            values[name] = value.where(committed, other=values[name]) if name in values else value.where(committed)
+
+        bess_initial_state_of_charge_percent = (
+            window_solution.bess_state_of_charge_megawatt_hour[detail[-1]]
+            / data.bess_energy_capacity_megawatt_hour
+            * 100.0
+            if data.bess_energy_capacity_megawatt_hour != 0.0
+            else data.bess_minimum_state_of_charge_percent
+        )
+
+        if last:
+            break
+
+    subproblems_optimal = all(solution.optimal for solution in solutions)
+    # A single window is the monolithic solve.
+    optimal = subproblems_optimal and len(solutions) == 1
+    gap = solutions[0].gap if len(solutions) == 1 else np.nan
+    totals = _totals(values, _model_parameters(data))
+    solution = Box(optimal=optimal, gap=gap, subproblems_optimal=subproblems_optimal, solve_seconds=solve_seconds, model_stats=_merge_model_stats(model_stats), **values, **totals)  # fmt: off
+    return solution
+
+
+def _solve_hierarchical(data: Box) -> Box:
+    """
+    Solves the horizon coarse to fine (hierarchical time aggregation).
+
+    The whole horizon is first solved with periods of model_coarse_minute minutes, which is much
+    smaller and is enough to get the state of charge trajectory right. Then, only the first
+    model_window_day days (the bidding window) are solved at full resolution, ending at the state
+    of charge of the coarse trajectory. The rest of the horizon keeps the coarse schedule, spread
+    evenly over its periods. Neither pass sees the whole horizon at full resolution, so the solution
+    is not optimal and its gap is unknown (NaN), even if both passes are (subproblems_optimal).
+    The coarse objective delta is what the merged schedule earns over the coarse estimate, both
+    evaluated at their own resolution. The objective delta is what it earns over the monolithic
+    full resolution solve, which is only known with model_benchmark (NaN otherwise, see run_model).
+    """
+    # fmt: off
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    periods_per_day = round(24 * 60 / data.market_time_unit_minute)
+    window = data.model_window_day * periods_per_day
+    periods_per_block = max(1, round(data.model_coarse_minute / data.market_time_unit_minute))
+    # Nothing to aggregate, or nothing beyond the bidding window.
+    if periods_per_block == 1 or len(market) <= window:
+        solution = _solve_monolithic(data)
+        return solution
+
+    start = time.perf_counter()
+    coarse_data = _aggregate(data, periods_per_block)
+    coarse_solution = _solve_monolithic(coarse_data)
+    coarse_seconds = time.perf_counter() - start
+    coarse_values = _disaggregate(coarse_solution, coarse_data, data, periods_per_block)
+
+    detail = market[:window]
+    bess_final_state_of_charge_percent = (
+        coarse_values["bess_state_of_charge_megawatt_hour"][detail[-1]]
+        / data.bess_energy_capacity_megawatt_hour
+        * 100.0
+        if data.bess_energy_capacity_megawatt_hour != 0.0
+        else data.bess_minimum_state_of_charge_percent
+    )
+    # The window may use every cycle of the horizon that the coarse schedule does not use after it.
+    bess_cycles_count = (
+        coarse_values["bess_discharge_megawatt_hour"][~data.market_input.index.isin(detail)].sum()
+        / data.bess_energy_capacity_megawatt_hour
+        if data.bess_energy_capacity_megawatt_hour != 0.0
+        else 0.0
+    )
+    bess_maximum_cycles_count = data.market_horizon_day * data.bess_maximum_cycles_count_per_day - bess_cycles_count
+    start = time.perf_counter()
+    fine_data = data | Box(
+        market_price_euro_per_megawatt_hour=data.market_price_euro_per_megawatt_hour.where(data.market_price_euro_per_megawatt_hour.index.isin(detail)),
+        market_horizon_day=len(detail) / periods_per_day,
+        bess_maximum_cycles_count_per_day=max(bess_maximum_cycles_count, 0.0) / (len(detail) / periods_per_day),
+        bess_final_state_of_charge_percent=bess_final_state_of_charge_percent,
+    )
+    fine_solution = _solve_monolithic(fine_data)
+    fine_seconds = time.perf_counter() - start
+
+    committed = data.market_input.index.isin(detail)
+    values = {
+        name: fine_solution[name].where(committed, other=value)
+        for name, value in coarse_values.items()
+    }
+    # Series only solved at full resolution (shadow prices) are missing beyond the bidding window.
+    values |= {
+        name: value
+        for name, value in fine_solution.items()
+        if isinstance(value, Series) and name not in values
+    }
+
+    parameters = _model_parameters(data)
+    totals = _totals(values, parameters)
+    coarse_objective = _objective(coarse_solution, _model_parameters(coarse_data))
+    objective = _objective(values, parameters)
+    hierarchical = Box(
+        coarse_seconds=coarse_seconds,
+        fine_seconds=fine_seconds,
+        coarse_periods=len(coarse_data.market_input.index),
+        fine_periods=len(detail),
+        coarse_objective_euro=coarse_objective,
+        objective_euro=objective,
+        coarse_objective_delta_euro=objective - coarse_objective,
+        objective_delta_euro=np.nan,
+    )
+    solutions = [coarse_solution, fine_solution]
+    solution = Box(
+        optimal=False,
+        gap=np.nan,
+        subproblems_optimal=all(solution.optimal for solution in solutions),
+        solve_seconds=sum(solution.solve_seconds for solution in solutions),
+        model_stats=_merge_model_stats([solution.model_stats for solution in solutions]),
+        hierarchical=hierarchical,
+        **values,
+        **totals,
+    )
+    return solution
+
+
+# How every input indexed by market period is aggregated over the periods of a coarse period.
+# Energies are added up, powers and prices averaged, and states taken at the end of the period.
+_AGGREGATIONS = {
+    "market_price_euro_per_megawatt_hour": "mean",
+    "bess_grid_import_net_fixed_megawatt": "mean",
+    "bess_grid_import_matched_megawatt_hour": "sum",
+    "bess_res_import_fixed_megawatt": "mean",
+    "bess_grid_export_net_fixed_megawatt": "mean",
+    "bess_grid_export_matched_megawatt_hour": "sum",
+    "bess_grid_export_limits_megawatt": "mean",
+    "bess_state_of_charge_fixed_percent": "last",
+    "res_export_megawatt_hour": "sum",
+    "res_grid_export_matched_megawatt_hour": "sum",
+    "res_grid_export_limits_megawatt": "mean",
+    "grid_export_limits_megawatt": "mean",
+}
+
+
+def _aggregate(data: Box, periods_per_block: int) -> Box:
+    """
+    Aggregates the market periods of the data in blocks of consecutive periods, labeled by their first period.
+
+    Fixed schedules are only kept for blocks where every period is fixed, the missing
+    ones are left to the model.
+    """
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    starts = np.arange(0, len(market), periods_per_block)
+    ends = np.append(starts[1:], len(market)) - 1
+    sizes = ends - starts + 1
+    labels = market[starts]
+
+    aggregated = Box(
+        market_input=pd.DataFrame(index=labels),
+        market_time_unit_minute=data.market_time_unit_minute * periods_per_block,
+    )
+    for name, how in _AGGREGATIONS.items():
+        value = data[name]
+        if not isinstance(value, (Series, dict)):
+            continue
+
+        # Missing periods are NaN, so that blocks with any missing period are missing too.
+        values = _align(value, market)
+        match how:
+            case "sum":
+                values = np.add.reduceat(values, starts)
+            case "mean":
+                values = np.add.reduceat(values, starts) / sizes
+            case "last":
+                values = values[ends]
+            case _:
+                assert_never()
+
+        values = pd.Series(data=values, index=labels, dtype=float)
+        aggregated[name] = values if isinstance(value, Series) else values.dropna().to_dict()
+    return data | aggregated
+
+
+def _disaggregate(solution: Box, coarse_data: Box, data: Box, periods_per_block: int) -> dict[str, Series[float]]:
+    """
+    Spreads every indexed value of a coarse solution over the market periods of its block (see _aggregate).
+
+    Energies are split evenly, so the state of charge is interpolated linearly within every
+    block, and indicators are repeated.
+    """
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    block = np.arange(len(market)) // periods_per_block
+    offset = np.arange(len(market)) - block * periods_per_block
+    size = np.bincount(block)[block]
+
+    def value(name):
+        return _align(solution[name], coarse_data.market_input.index)[block]
+
+    state_of_charge = value("bess_state_of_charge_megawatt_hour")
+    previous_state_of_charge = value("bess_previous_state_of_charge_megawatt_hour")
+    values = {}
+    for name in _VARIABLES:
+        if not isinstance(solution[name], Series):
+            continue
+
+        if name == "bess_state_of_charge_megawatt_hour":
+            values[name] = previous_state_of_charge + (offset + 1) / size * (state_of_charge - previous_state_of_charge)
+        elif name == "bess_previous_state_of_charge_megawatt_hour":
+            values[name] = previous_state_of_charge + offset / size * (state_of_charge - previous_state_of_charge)
+        elif name.endswith("_megawatt_hour"):
+            values[name] = value(name) / size
+        else:
+            values[name] = value(name)
+        values[name] = pd.Series(data=values[name], index=market, dtype=float).reindex(data.market_input.index)
+    return values
+
+
+def _frozen_periods(data: Box) -> np.ndarray:
+    """
+    Flags the market periods that start before the session (market_datetime, which follows current_datetime
+    in MIC sessions), as a boolean array aligned to the input index.
+
+    Period start times are computed from the market dates and periods like the market index, so
+    inputs without them (offline files without those columns) have no frozen periods.
+    """
+    market_input = data.market_input
+    if data.get("market_datetime") is None or "market_dates" not in market_input or "market_periods" not in market_input:
+        frozen = np.zeros(len(market_input.index), dtype=bool)
+        return frozen
+
+    market_dates = pd.to_datetime(market_input.market_dates).dt.tz_localize(data.market_timezone)
+    market_datetimes = market_dates + (market_input.market_periods - 1) * pd.Timedelta(minutes=data.market_time_unit_minute)  # fmt: off
+    frozen = (market_datetimes < data.market_datetime).to_numpy(dtype=bool)
+    return frozen
+
+
+def _solve_receding_horizon(data: Box) -> Box:
+    """
+    Solves only the periods from the session start on (receding horizon), freezing the earlier ones.
+
+    Periods before the session are already delivered or committed, so their schedule is the
+    matched positions, and the state of charge follows the actual state of charge wherever it is
+    measured. The remaining periods start at the state of charge the frozen ones end at, and may only use
+    the cycles the frozen ones leave, so the model shrinks with every session of the day.
+    """
+    # fmt: off
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    frozen = _frozen_periods(data)
+    frozen_values = _frozen_values(data, frozen)
+    bess_state_of_charge_megawatt_hour = frozen_values["bess_state_of_charge_megawatt_hour"].dropna()
+
+    bess_initial_state_of_charge_percent = (
+        bess_state_of_charge_megawatt_hour.iloc[-1]
+        / data.bess_energy_capacity_megawatt_hour
+        * 100.0
+        if data.bess_energy_capacity_megawatt_hour != 0.0 and not bess_state_of_charge_megawatt_hour.empty
+        else data.bess_initial_state_of_charge_percent
+    )
+    bess_cycles_count = (
+        frozen_values["bess_discharge_megawatt_hour"].sum()
+        / data.bess_energy_capacity_megawatt_hour
+        if data.bess_energy_capacity_megawatt_hour != 0.0
+        else 0.0
+    )
+    bess_maximum_cycles_count = data.market_horizon_day * data.bess_maximum_cycles_count_per_day - bess_cycles_count
+
+    open_data = data | Box(
+        market_price_euro_per_megawatt_hour=data.market_price_euro_per_megawatt_hour.where(~frozen),
+        bess_initial_state_of_charge_percent=bess_initial_state_of_charge_percent,
+        bess_maximum_cycles_count_per_day=max(bess_maximum_cycles_count, 0.0) / data.market_horizon_day,
+        model_receding_horizon=False,
+    )
+    # Nothing left to optimize, the horizon is already delivered.
+    if not data.market_input.index[~frozen].isin(market).any():
+        model_stats = Box(
+            build_seconds=None,
+            write_seconds=None,
+            solve_seconds=0.0,
+            load_seconds=None,
+            variables=None,
+            binaries=None,
+            constraints=None,
+            nonzeros=None,
+            solver="receding_horizon",
+            solver_version=None,
+            termination="optimal",
+            gap=0.0,
+            nodes=None,
+            iterations=None,
+        )
+        open_solution = Box(optimal=True, gap=model_stats.gap, solve_seconds=0.0, model_stats=model_stats)
+    else:
+        open_solution = _optimize(open_data)
+
+    values = {}
+    for name, value in frozen_values.items():
+        values[name] = open_solution[name].where(~frozen, other=value) if name in open_solution else value
+    totals = _totals(values, _model_parameters(data))
+    solution = open_solution | Box(**values, **totals, frozen_periods=int(np.count_nonzero(frozen & data.market_input.index.isin(market))))
+    return solution
+
+
+def _frozen_values(data: Box, frozen: np.ndarray) -> dict[str, Series[float]]:
+    """
+    Computes the schedule of the frozen periods from the matched positions and the actual state of charge.
+
+    Every matched position is a net flow without new (gross) positions, and renewable imports are
+    not matched, so they are zero. The state of charge starts every period at the actual value if it is
+    measured (the start of the period), or at the end of the previous period otherwise, which is
+    projected with the efficiencies.
+    """
+    index = data.market_input.index
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    frozen = frozen & index.isin(market)
+    charging_efficiency = data.bess_charging_efficiency_percent / 100.0
+    discharging_efficiency_reciprocal = 1.0 / (data.bess_discharging_efficiency_percent / 100.0) if data.bess_discharging_efficiency_percent != 0.0 else 0.0  # fmt: off
+
+    def matched(name):
+        return np.where(frozen, np.nan_to_num(_align(data[name], index)), np.nan)
+
+    bess_grid_import_net_megawatt_hour = matched("bess_grid_import_matched_megawatt_hour")
+    bess_grid_export_net_megawatt_hour = matched("bess_grid_export_matched_megawatt_hour")
+    res_grid_export_net_megawatt_hour = matched("res_grid_export_matched_megawatt_hour")
+    bess_charge_megawatt_hour = charging_efficiency * bess_grid_import_net_megawatt_hour
+    bess_discharge_megawatt_hour = discharging_efficiency_reciprocal * bess_grid_export_net_megawatt_hour
+
+    bess_actual_state_of_charge_megawatt_hour = _align(data.get("bess_actual_state_of_charge_megawatt_hour"), index)
+    bess_previous_state_of_charge_megawatt_hour = np.full(len(index), np.nan)
+    bess_state_of_charge_megawatt_hour = np.full(len(index), np.nan)
+    state_of_charge = data.bess_initial_state_of_charge_percent / 100.0 * data.bess_energy_capacity_megawatt_hour
+    for i in np.flatnonzero(frozen):
+        if not np.isnan(bess_actual_state_of_charge_megawatt_hour[i]):
+            state_of_charge = bess_actual_state_of_charge_megawatt_hour[i]
+        bess_previous_state_of_charge_megawatt_hour[i] = state_of_charge
+        state_of_charge = np.clip(
+            state_of_charge + bess_charge_megawatt_hour[i] - bess_discharge_megawatt_hour[i],
+            a_min=0.0,
+            a_max=data.bess_energy_capacity_megawatt_hour,
+        )
+        bess_state_of_charge_megawatt_hour[i] = state_of_charge
+
+    zeros = np.where(frozen, 0.0, np.nan)
+    values = {
+        "bess_grid_import_net_megawatt_hour": bess_grid_import_net_megawatt_hour,
+        "bess_grid_import_gross_megawatt_hour": zeros,
+        "bess_res_import_megawatt_hour": zeros,
+        "bess_res_import_curtailed_megawatt_hour": zeros,
+        "bess_res_import_uncurtailed_megawatt_hour": zeros,
+        "bess_res_import_curtailed_uncurtailed_indicator": zeros,
+        "bess_res_import_priority_indicator": np.where(frozen, (res_grid_export_net_megawatt_hour > 0.0).astype(float), np.nan),
+        "bess_grid_export_net_megawatt_hour": bess_grid_export_net_megawatt_hour,
+        "bess_grid_export_gross_megawatt_hour": zeros,
+        "bess_charge_megawatt_hour": bess_charge_megawatt_hour,
+        "bess_discharge_megawatt_hour": bess_discharge_megawatt_hour,
+        "bess_charge_discharge_indicator": np.where(frozen, (bess_charge_megawatt_hour > 0.0).astype(float), np.nan),
+        "bess_state_of_charge_megawatt_hour": bess_state_of_charge_megawatt_hour,
+        "bess_previous_state_of_charge_megawatt_hour": bess_previous_state_of_charge_megawatt_hour,
+        "res_grid_export_net_megawatt_hour": res_grid_export_net_megawatt_hour,
+        "res_grid_export_gross_megawatt_hour": zeros,
+    }
+    values = {name: pd.Series(data=value, index=index, dtype=float) for name, value in values.items()}
+    return values
+
+
+def _merge_model_stats(model_stats: list[Box]) -> Box:
+    """
+    Combines the model statistics of every solve of a single run, such as the rolling windows.
+
+    Times, sizes, nodes and iterations are added up (None if any solve does not report them), the gap is the
+    worst one and the termination is the first one that is not optimal.
+    """
+    def total(name):
+        values = [stats[name] for stats in model_stats]
+        return sum(values) if all(value is not None for value in values) else None
+
+    solvers = list(dict.fromkeys(stats.solver for stats in model_stats))
+    merged = Box(
+        build_seconds=total("build_seconds"),
+        write_seconds=total("write_seconds"),
+        solve_seconds=total("solve_seconds"),
+        load_seconds=total("load_seconds"),
+        variables=total("variables"),
+        binaries=total("binaries"),
+        constraints=total("constraints"),
+        nonzeros=total("nonzeros"),
+        solver=",".join(solvers),
+        # Racing portfolios might pick a different solver for every window.
+        solver_version=model_stats[0].solver_version if len(solvers) == 1 else None,
+        termination=next((stats.termination for stats in model_stats if stats.termination != "optimal"), "optimal"),
+        gap=float(np.max([stats.gap for stats in model_stats])),
+        nodes=total("nodes"),
+        iterations=total("iterations"),
+    )
+    return merged
+
+
+def _totals(values: dict[str, float | Series[float]], parameters: Box) -> dict[str, float]:
+    """
+    Computes the scalar variables (cycles and profits) of a schedule, as the model would.
+    """
+    def value(name):
+        return _align(values[name], parameters.market, fill_value=0.0)
+
+    totals = {
+        "bess_cycles_count": float(
+            value("bess_discharge_megawatt_hour").sum()
+            * parameters.bess_energy_capacity_reciprocal_per_megawatt_hour
+        ),
+        "bess_profit_euro": float(
+            (
+                parameters.bess_grid_export_net_price_euro_per_megawatt_hour * value("bess_grid_export_net_megawatt_hour")
+                - parameters.bess_grid_import_net_price_euro_per_megawatt_hour * value("bess_grid_import_net_megawatt_hour")
+                - parameters.bess_res_import_curtailed_price_euro_per_megawatt_hour * value("bess_res_import_curtailed_megawatt_hour")
+                - parameters.bess_res_import_uncurtailed_price_euro_per_megawatt_hour * value("bess_res_import_uncurtailed_megawatt_hour")
+            ).sum()
+        ),
+        "res_profit_euro": float(
+            (
+                parameters.res_grid_export_net_price_euro_per_megawatt_hour * value("res_grid_export_net_megawatt_hour")
+            ).sum()
+        ),
+    }
+    return totals
+
+
+def _objective(values: dict[str, float | Series[float]], parameters: Box) -> float:
+    """
+    Evaluates the market objective of a schedule, as market_rule would.
+    """
+    def value(name):
+        return _align(values[name], parameters.market, fill_value=0.0)
+
+    objective = float(
+        (
+            parameters.market_discount_factor
+            * (
+                (parameters.bess_grid_export_net_price_euro_per_megawatt_hour - parameters.bess_profit_threshold_euro_per_megawatt_hour)
+                * value("bess_grid_export_net_megawatt_hour")
+                - (parameters.bess_grid_import_net_price_euro_per_megawatt_hour + parameters.market_rate)
+                * value("bess_grid_import_net_megawatt_hour")
+                - parameters.bess_res_import_curtailed_price_euro_per_megawatt_hour
+                * value("bess_res_import_curtailed_megawatt_hour")
+                - parameters.bess_res_import_uncurtailed_price_euro_per_megawatt_hour
+                * value("bess_res_import_uncurtailed_megawatt_hour")
+                + parameters.res_grid_export_net_price_euro_per_megawatt_hour
+                * value("res_grid_export_net_megawatt_hour")
+            )
+        ).sum()
+    )
+    return objective
+
+
+def _benchmark(data: Box, solution: Box, seconds: float) -> Box:
+    """
+    Compares a solution against the reference monolithic solve of the same data with the baseline MIP formulation.
+
+    Both schedules are evaluated with the same objective over the whole horizon, so the
+    loss is what the faster strategy gives away against solving everything at once.
+    Branch and bound nodes and simplex iterations are None if the solver does not report them. The reference
+    is solved unscaled, so with model_scaling the time and iterations are compared before and after scaling.
+    """
+    start = time.perf_counter()
+    reference = _solve_monolithic(data | _BENCHMARK_REFERENCE)
+    reference_seconds = time.perf_counter() - start
+
+    parameters = _model_parameters(data)
+    objective = _objective(solution, parameters)
+    reference_objective = _objective(reference, parameters)
+
+    benchmark = Box(
+        optimal=solution.optimal,
+        reference_optimal=reference.optimal,
+        objective_euro=objective,
+        reference_objective_euro=reference_objective,
+        objective_loss_euro=reference_objective - objective,
+        profit_euro=solution.bess_profit_euro + solution.res_profit_euro,
+        reference_profit_euro=reference.bess_profit_euro + reference.res_profit_euro,
+        seconds=seconds,
+        reference_seconds=reference_seconds,
+        seconds_saved=reference_seconds - seconds,
+        nodes=solution.get("nodes"),
+        reference_nodes=reference.get("nodes"),
+        iterations=solution.get("model_stats", Box()).get("iterations"),
+        reference_iterations=reference.get("model_stats", Box()).get("iterations"),
+    )
+    return benchmark
+
+
+# Settings that disable every approximate strategy and formulation improvement, for the reference solve of benchmarks.
+_BENCHMARK_REFERENCE = Box(
+    model_dynamic_programming=False,
+    model_relaxation=False,
+    model_heuristic=False,
+    model_spread_bound=False,
+    model_tight_big_m=False,
+    model_indicator_formulation="big_m",
+    model_scaling=False,
+)
+
+
+# Formulation variants of offline benchmarks, as settings applied on top of each instance.
+_BENCHMARK_VARIANTS = {
+    "default": Box(),
+    "baseline": _BENCHMARK_REFERENCE,
+    "sos1": Box(model_indicator_formulation="sos1", model_dynamic_programming=False),
+    "rolling": Box(model_decomposition="rolling"),
+    "scaled": Box(model_scaling=True, model_dynamic_programming=False),
+    # Against the baseline of the same solver (glpk by default), standalone modules compare dynamic programming and the MIP.
+    "dynamic_programming": Box(model_dynamic_programming=True),
+}
+
+_BENCHMARK_PERCENTILES = [0.5, 0.9, 0.99]
+
+# Solvers tried by offline benchmarks, if installed.
+_BENCHMARK_SOLVERS = ("glpk", "cbc", "appsi_highs", "gurobi", "cplex", "scipy")
+
+
+def _installed_solvers() -> list[str]:
+    """
+    Returns the benchmark solvers that are installed, the matrix backend always is.
+    """
+    solvers = []
+    for solver in _BENCHMARK_SOLVERS:
+        if solver == "scipy":
+            solvers.append(solver)
+            continue
+
+        with pyo.SolverFactory(solver) as opt:
+            if opt.available(exception_flag=False):
+                solvers.append(solver)
+    return solvers
+
+
+# Version of the corpus format. Existing fields are never changed nor removed, only new ones added,
+# so that instances captured by every release can be replayed by every later release.
+_CORPUS_VERSION = 1
+
+_CORPUS_INPUTS_FILE = "inputs.json"
+
+# Every input read by the model. Credentials and uploaded files are never stored.
+_CORPUS_INPUTS = (
+    "market_input",
+    "market_price_euro_per_megawatt_hour",
+    "market_time_unit_minute",
+    "market_rate",
+    "market_horizon_day",
+    "dim_ufi_bess_grid_import",
+    "dim_ufi_bess_res_import",
+    "dim_ufi_bess_grid_export",
+    "dim_ufi_res_grid_export",
+    "dim_up_grid_export",
+    "bess_grid_import_net_fixed_megawatt",
+    "bess_grid_import_matched_megawatt_hour",
+    "bess_res_import_fixed_megawatt",
+    "bess_res_import_clipping_percent",
+    "bess_res_import_clipping_threshold_megawatt",
+    "bess_res_import_priority",
+    "bess_grid_export_net_fixed_megawatt",
+    "bess_grid_export_matched_megawatt_hour",
+    "bess_grid_export_limits_megawatt",
+    "bess_power_capacity_megawatt",
+    "bess_energy_capacity_megawatt_hour",
+    "bess_charging_efficiency_percent",
+    "bess_discharging_efficiency_percent",
+    "bess_maximum_cycles_count_per_day",
+    "bess_profit_threshold_euro_per_megawatt_hour",
+    "bess_minimum_state_of_charge_percent",
+    "bess_maximum_state_of_charge_percent",
+    "bess_initial_state_of_charge_percent",
+    "bess_final_state_of_charge_percent",
+    "bess_state_of_charge_fixed_percent",
+    "bess_state_of_health_percent",
+    "bess_availability_percent",
+    "res_export_megawatt_hour",
+    "res_export_price_euro_per_megawatt_hour",
+    "res_grid_export_matched_megawatt_hour",
+    "res_grid_export_limits_megawatt",
+    "grid_export_limit_megawatt",
+    "grid_export_limits_megawatt",
+    *_FINGERPRINT_SETTINGS,
+)
+
+
+def _export_instance(data: Box, fingerprint: str) -> None:
+    """
+    Stores the model inputs and the built model (LP and MPS) in the corpus, once per input fingerprint.
+
+    Inputs are JSON, with Series as their labels and values and the input frame as its index, which
+    does not depend on the Pandas or Pyomo releases that wrote them, unlike pickles. The model files
+    are the default formulation, for solvers benchmarked outside of Python, written from the model
+    template the solve left behind (see _template_model) instead of building the model again.
+    """
+    directory = Path(data.model_corpus_path).expanduser() / fingerprint
+    if (directory / _CORPUS_INPUTS_FILE).exists():
+        return
+
+    def encode(value):
+        if isinstance(value, pd.DataFrame):
+            return {"index": list(map(str, value.index))}
+        if isinstance(value, Series):
+            return {"index": list(map(str, value.index)), "values": [None if pd.isna(item) else float(item) for item in value]}
+        if isinstance(value, (np.floating, np.integer, np.bool_)):
+            return value.item()
+        return value
+
+    instance = {
+        "version": _CORPUS_VERSION,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "inputs": {name: encode(data.get(name)) for name in _CORPUS_INPUTS},
+    }
+
+    directory.mkdir(parents=True, exist_ok=True)
+    parameters = _model_parameters(data)
+    with _template_model(parameters, _presolve(parameters)) as model:
+        # Labels are the component names, which are easier to compare between formulations.
+        model.write(str(directory / "model.lp"), io_options={"symbolic_solver_labels": True})
+        model.write(str(directory / "model.mps"), io_options={"symbolic_solver_labels": True})
+    # The inputs are written last, so that an instance is only complete once they exist.
+    (directory / _CORPUS_INPUTS_FILE).write_text(json.dumps(instance, indent=1), encoding="utf-8")
+
+
+def _read_instance(path: Path) -> Box:
+    """
+    Reads the model inputs of a corpus instance, as they were passed to run_model.
+
+    Later releases only add fields, so instances of every earlier version are read, but not of later ones.
+    """
+    instance = json.loads(path.read_text(encoding="utf-8"))
+    version = instance.get("version")
+    if not isinstance(version, int) or not 1 <= version <= _CORPUS_VERSION:
+        raise ValueError(f"Unsupported corpus format version {version!r} (up to {_CORPUS_VERSION}): {path}")
+
+    def decode(name, value):
+        if name == "market_input":
+            return pd.DataFrame(index=pd.Index(value["index"]))
+        if isinstance(value, dict) and value.keys() == {"index", "values"}:
+            return pd.Series(data=value["values"], index=pd.Index(value["index"]), dtype=float)
+        return value
+
+    data = Box({name: decode(name, value) for name, value in instance["inputs"].items()})
+    return data
+
+
+def _spread_bound_condition(data: Box, parameters: Box) -> bool:
+    """
+    Checks whether leaving the battery idle is optimal, because no price spread can pay for the losses and the threshold.
+
+    Storing a megawatt hour costs its discounted import price plus the rate over the charging efficiency, and
+    discharging it earns its discounted export price minus the profit threshold times the discharging efficiency.
+    Any schedule splits into charges paired with later discharges, discharges of the initial energy paired with
+    later charges if the final state of charge is the initial one, and unpaired charges and discharges if it is
+    free. Idle is optimal if none of them pays, which takes a running minimum (or maximum) over the periods.
+    Renewables without battery imports export whatever is available anyway, so there is nothing to schedule.
+    Modules with fixed schedules or states of charge are not checked.
+    """
+    # fmt: off
+    if (
+        not data.model_spread_bound
+        or data.dim_ufi_bess_res_import is not None
+        or data.bess_grid_import_net_fixed_megawatt
+        or data.bess_res_import_fixed_megawatt
+        or data.bess_grid_export_net_fixed_megawatt
+    ):
+        return False
+
+    health = parameters.bess_state_of_health_percent / 100.0 * parameters.bess_availability_percent / 100.0
+    capacity = parameters.bess_energy_capacity_megawatt_hour
+    charging_efficiency = parameters.bess_charging_efficiency_percent / 100.0
+    discharging_efficiency = parameters.bess_discharging_efficiency_percent / 100.0
+    lower = parameters.bess_minimum_state_of_charge_percent / 100.0 * capacity
+    upper = min(parameters.bess_maximum_state_of_charge_percent / 100.0, health) * capacity
+    initial = parameters.bess_initial_state_of_charge_percent / 100.0 * capacity
+    tolerance = 1e-6
+
+    final_condition = parameters.bess_final_state_of_charge_condition
+    if final_condition and not np.isclose(parameters.bess_final_state_of_charge_percent / 100.0 * capacity, initial):
+        return False
+    if not np.isnan(parameters.bess_state_of_charge_fixed_megawatt_hour).all() or lower > upper + tolerance:
+        return False
+
+    # Per megawatt hour of stored energy, periods where the flow is not allowed never pay.
+    costs = (
+        parameters.market_discount_factor * (parameters.bess_grid_import_net_price_euro_per_megawatt_hour + parameters.market_rate) / charging_efficiency
+        if parameters.bess_grid_import_condition and charging_efficiency > 0.0 and parameters.bess_charging_power_capacity_megawatt > 0.0
+        else np.full(len(parameters.market), np.inf)
+    )
+    rewards = (
+        np.where(
+            parameters.bess_grid_export_limits_megawatt > 0.0,
+            parameters.market_discount_factor * (parameters.bess_grid_export_net_price_euro_per_megawatt_hour - parameters.bess_profit_threshold_euro_per_megawatt_hour) * discharging_efficiency,
+            -np.inf,
+        )
+        if parameters.bess_grid_export_condition and discharging_efficiency > 0.0 and parameters.bess_discharging_power_capacity_megawatt > 0.0
+        else np.full(len(parameters.market), -np.inf)
+    )
+
+    # Best spread of a charge followed by a later discharge, and of a discharge followed by a later charge.
+    cycle_spread = np.max(rewards[1:] - np.minimum.accumulate(costs)[:-1], initial=-np.inf)
+    reverse_spread = np.max(np.maximum.accumulate(rewards)[:-1] - costs[1:], initial=-np.inf)
+    if cycle_spread > 0.0:
+        return False
+    if final_condition:
+        condition = initial <= lower + tolerance or reverse_spread <= 0.0
+        return bool(condition)
+
+    condition = (initial <= lower + tolerance or np.max(rewards) <= 0.0) and (upper <= lower + tolerance or np.min(costs) >= 0.0)
+    return bool(condition)
+
+
+def _solve_idle(data: Box, parameters: Box) -> Box:
+    """
+    Returns the idle schedule, where the battery keeps its state of charge and renewables export whatever is available.
+
+    The net flows are zero, so positions matched in previous sessions are offset by the gross flows.
+    """
+    start_time = time.perf_counter()
+    values = _schedule_values(parameters, *np.zeros((3, len(parameters.market))))
+    solve_seconds = time.perf_counter() - start_time
+    # There is no model, so only the solve time and the outcome are known.
+    model_stats = Box(
+        build_seconds=None,
+        write_seconds=None,
+        solve_seconds=solve_seconds,
+        load_seconds=None,
+        variables=None,
+        binaries=None,
+        constraints=None,
+        nonzeros=None,
+        solver="spread_bound",
+        solver_version=None,
+        termination="optimal",
+        gap=0.0,
+        nodes=None,
+        iterations=None,
+    )
+    solution = Box(
+        optimal=True,
+        gap=model_stats.gap,
+        solve_seconds=solve_seconds,
+        model_stats=model_stats,
+        **_process_values(values, parameters, data),
+    )
+    return solution
+
+
+def _dynamic_programming_condition(data: Box) -> bool:
+    """
+    Checks whether the module reduces to single asset arbitrage, which dynamic programming solves exactly.
+
+    That is, no renewable topology, no fixed schedules and a non degenerate battery, so
+    that the state of charge is the only state and every period only depends on the previous one.
+    """
+    condition = (
+        data.model_dynamic_programming
+        and data.dim_ufi_bess_res_import is None
+        and data.dim_ufi_res_grid_export is None
+        and not data.bess_grid_import_net_fixed_megawatt
+        and not data.bess_res_import_fixed_megawatt
+        and not data.bess_grid_export_net_fixed_megawatt
+        and data.bess_energy_capacity_megawatt_hour > 0.0
+        and data.bess_charging_efficiency_percent > 0.0
+        and data.bess_discharging_efficiency_percent > 0.0
+        and data.bess_minimum_state_of_charge_percent
+        <= min(
+            data.bess_maximum_state_of_charge_percent,
+            data.bess_state_of_health_percent * data.bess_availability_percent / 100.0,
+        )
+    )
+    return condition
+
+
+def _solve_dynamic_programming(data: Box, parameters: Box) -> Box:
+    """
+    Solves a standalone module by dynamic programming over a discretized state of charge grid.
+
+    The grid has a step of model_dynamic_programming_step_percent of the energy capacity and goes
+    through the initial state of charge. Each period is one vectorized Bellman backward pass over
+    every pair of states, where infeasible transitions (power, export and state of charge limits)
+    are discarded. The cycle cap couples all periods, so it is priced into the discharge with a
+    Lagrange multiplier, found by bisection only when the unpriced schedule exceeds the cap.
+    The best schedule within the cap is compared against the Lagrangian bound, and it is only optimal
+    if the gap is within solver_gap_percent (or a tight default). Since whole cycles are not convex, a
+    binding cap often leaves a gap, which _solve_monolithic closes with the MIP. The result is relative
+    to the grid resolution, fixed and final states of charge are snapped to the grid, and the schedule
+    is not optimal if that moves any of them, since it would miss the state the model requires.
+    """
+    # fmt: off
+    start_time = time.perf_counter()
+    hours = parameters.market_time_unit_minute * (1.0 / 60.0)
+    health = parameters.bess_state_of_health_percent / 100.0 * parameters.bess_availability_percent / 100.0
+    capacity = parameters.bess_energy_capacity_megawatt_hour
+    charging_efficiency = parameters.bess_charging_efficiency_percent / 100.0
+    discharging_efficiency = parameters.bess_discharging_efficiency_percent / 100.0
+
+    lower = parameters.bess_minimum_state_of_charge_percent / 100.0 * capacity
+    upper = min(parameters.bess_maximum_state_of_charge_percent / 100.0, health) * capacity
+    initial = parameters.bess_initial_state_of_charge_percent / 100.0 * capacity
+    step = data.model_dynamic_programming_step_percent / 100.0 * capacity
+    states = initial + step * np.arange(np.ceil((lower - initial) / step - 1e-9), np.floor((upper - initial) / step + 1e-9) + 1.0)
+    start = int(np.argmin(np.abs(states - initial)))
+
+    # Transitions from every state (rows) to every state (columns).
+    delta = states[None, :] - states[:, None]
+    charge = np.maximum(delta, 0.0)
+    discharge = np.maximum(-delta, 0.0)
+    grid_import = charge / charging_efficiency
+    grid_export = discharge * discharging_efficiency
+
+    charge_limit = health * parameters.bess_charging_power_capacity_megawatt * hours if parameters.bess_grid_import_condition else 0.0
+    discharge_limits = (
+        np.minimum(health * parameters.bess_discharging_power_capacity_megawatt * hours, parameters.bess_grid_export_limits_megawatt * hours / discharging_efficiency)
+        if parameters.bess_grid_export_condition
+        else np.zeros(len(parameters.market))
+    )
+    export_rewards = parameters.market_discount_factor * (parameters.bess_grid_export_net_price_euro_per_megawatt_hour - parameters.bess_profit_threshold_euro_per_megawatt_hour)
+    import_costs = parameters.market_discount_factor * (parameters.bess_grid_import_net_price_euro_per_megawatt_hour + parameters.market_rate)
+
+    # Fixed (and final) states of charge only allow the closest state of the grid.
+    allowed = np.ones((len(parameters.market), len(states)), dtype=bool)
+    snapped = 0.0
+    for i, fixed in enumerate(parameters.bess_state_of_charge_fixed_megawatt_hour):
+        if not np.isnan(fixed):
+            allowed[i] = np.arange(len(states)) == np.argmin(np.abs(states - fixed))
+            snapped = max(snapped, np.abs(states - fixed).min())
+    if parameters.bess_final_state_of_charge_condition:
+        final = parameters.bess_final_state_of_charge_percent / 100.0 * capacity
+        allowed[-1] &= np.arange(len(states)) == np.argmin(np.abs(states - final))
+        snapped = max(snapped, np.abs(states - final).min())
+
+    def dynamic_programming(multiplier):
+        value = np.zeros(len(states))
+        policy = np.empty((len(parameters.market), len(states)), dtype=int)
+        for i in reversed(range(len(parameters.market))):
+            rewards = export_rewards[i] * grid_export - import_costs[i] * grid_import - multiplier * discharge + value[None, :]
+            feasible = (charge <= charge_limit + 1e-9) & (discharge <= discharge_limits[i] + 1e-9) & allowed[i][None, :]
+            rewards = np.where(feasible, rewards, -np.inf)
+            policy[i] = rewards.argmax(axis=1)
+            value = rewards[np.arange(len(states)), policy[i]]
+
+        if np.isneginf(value[start]):
+            return None, -np.inf
+
+        path = np.empty(len(parameters.market), dtype=int)
+        state = start
+        for i in range(len(parameters.market)):
+            state = policy[i, state]
+            path[i] = state
+        return path, value[start]
+
+    def cycles(path):
+        state_of_charge = np.concatenate(([initial], states[path]))
+        return np.maximum(-np.diff(state_of_charge), 0.0).sum() / capacity
+
+    def objective(path):
+        previous = np.concatenate(([start], path[:-1]))
+        return float((export_rewards * grid_export[previous, path] - import_costs * grid_import[previous, path]).sum())
+
+    # Every multiplier gives an upper bound of the grid problem (Lagrangian dual), so the gap of the best
+    # schedule within the cycle cap is known. The cap makes the problem non convex, so the gap might not close.
+    budget = parameters.bess_maximum_cycles_count * capacity
+    path, bound = dynamic_programming(0.0)
+    if path is not None and cycles(path) > parameters.bess_maximum_cycles_count + 1e-9:
+        # Above this multiplier discharging never pays off, so the battery stays idle.
+        low, high = 0.0, 1.0 + np.abs(export_rewards).max() * discharging_efficiency + np.abs(import_costs).max() / charging_efficiency
+        path, value = dynamic_programming(high)
+        bound = value + high * budget
+        for _ in range(data.model_dynamic_programming_bisection_count):
+            multiplier = (low + high) / 2.0
+            candidate, value = dynamic_programming(multiplier)
+            bound = min(bound, value + multiplier * budget)
+            if cycles(candidate) > parameters.bess_maximum_cycles_count + 1e-9:
+                low = multiplier
+            else:
+                high = multiplier
+                if path is None or objective(candidate) > objective(path):
+                    path = candidate
+
+    if path is not None:
+        primal = objective(path)
+        gap = max(bound - primal, 0.0) / max(abs(bound), abs(primal), 1e-10)
+    else:
+        gap = np.nan
+    tolerance = data.solver_gap_percent / 100.0 if data.solver_gap_percent is not None else 1e-6
+
+    if path is None:
+        values = _schedule_values(parameters, *np.zeros((3, len(parameters.market))))
+    else:
+        state_of_charge = np.concatenate(([initial], states[path]))
+        bess_charge_megawatt_hour = np.maximum(np.diff(state_of_charge), 0.0)
+        bess_discharge_megawatt_hour = np.maximum(-np.diff(state_of_charge), 0.0)
+        values = _schedule_values(
+            parameters,
+            bess_charge_megawatt_hour / charging_efficiency,
+            np.zeros(len(parameters.market)),
+            bess_discharge_megawatt_hour * discharging_efficiency,
+        )
+
+    # States of charge off the grid are missed by the snapped schedule, so it is not even feasible.
+    on_grid = snapped <= 1e-6
+    optimal = path is not None and on_grid and gap <= tolerance
+    solve_seconds = time.perf_counter() - start_time
+    # There is no model, so only the solve time and the outcome are known.
+    model_stats = Box(
+        build_seconds=None,
+        write_seconds=None,
+        solve_seconds=solve_seconds,
+        load_seconds=None,
+        variables=None,
+        binaries=None,
+        constraints=None,
+        nonzeros=None,
+        solver="dynamic_programming",
+        solver_version=None,
+        termination="optimal" if optimal else "infeasible" if path is None or not on_grid else "maxIterations",
+        gap=float(gap),
+        nodes=None,
+        iterations=None,
+    )
+    solution = Box(
+        optimal=optimal,
+        gap=model_stats.gap,
+        solve_seconds=solve_seconds,
+        model_stats=model_stats,
+        **_process_values(values, parameters, data),
+    )
+    return solution
+
+
+def _schedule_values(
+    parameters: Box,
+    bess_grid_import_net_megawatt_hour: np.ndarray,
+    bess_res_import_megawatt_hour: np.ndarray,
+    bess_grid_export_net_megawatt_hour: np.ndarray,
+) -> dict[str, float | np.ndarray]:
+    """
+    Derives every model variable from the net battery flows of a schedule, in the same order as the model.
+
+    Renewable imports are curtailed first, and renewables export whatever the battery does not import.
+    """
+    # fmt: off
+    bess_state_of_charge_initial_megawatt_hour = parameters.bess_initial_state_of_charge_percent / 100.0 * parameters.bess_energy_capacity_megawatt_hour
+    bess_res_import_curtailed_megawatt_hour = np.minimum(bess_res_import_megawatt_hour, parameters.bess_res_import_curtailed_limits_megawatt_hour)
+    bess_res_import_uncurtailed_megawatt_hour = bess_res_import_megawatt_hour - bess_res_import_curtailed_megawatt_hour
+    bess_charge_megawatt_hour = parameters.bess_charging_efficiency_percent / 100.0 * (bess_grid_import_net_megawatt_hour + bess_res_import_megawatt_hour)
+    bess_discharge_megawatt_hour = parameters.bess_discharging_efficiency_reciprocal * bess_grid_export_net_megawatt_hour
+    bess_state_of_charge_megawatt_hour = bess_state_of_charge_initial_megawatt_hour + np.cumsum(bess_charge_megawatt_hour - bess_discharge_megawatt_hour)
+    res_grid_export_net_megawatt_hour = (
+        np.nan_to_num(parameters.res_grid_export_available_megawatt_hour) - bess_res_import_uncurtailed_megawatt_hour
+        if parameters.res_grid_export_condition
+        else np.zeros(len(parameters.market))
+    )
+
+    values = {
+        "bess_grid_import_net_megawatt_hour": bess_grid_import_net_megawatt_hour,
+        "bess_grid_import_gross_megawatt_hour": bess_grid_import_net_megawatt_hour - np.nan_to_num(parameters.bess_grid_import_matched_megawatt_hour),
+        "bess_res_import_megawatt_hour": bess_res_import_megawatt_hour,
+        "bess_res_import_curtailed_megawatt_hour": bess_res_import_curtailed_megawatt_hour,
+        "bess_res_import_uncurtailed_megawatt_hour": bess_res_import_uncurtailed_megawatt_hour,
+        "bess_res_import_curtailed_uncurtailed_indicator": (bess_res_import_megawatt_hour > 0.0).astype(float),
+        "bess_res_import_priority_indicator": (res_grid_export_net_megawatt_hour > 0.0).astype(float),
+        "bess_grid_export_net_megawatt_hour": bess_grid_export_net_megawatt_hour,
+        "bess_grid_export_gross_megawatt_hour": bess_grid_export_net_megawatt_hour - np.nan_to_num(parameters.bess_grid_export_matched_megawatt_hour),
+        "bess_charge_megawatt_hour": bess_charge_megawatt_hour,
+        "bess_discharge_megawatt_hour": bess_discharge_megawatt_hour,
+        "bess_charge_discharge_indicator": (bess_charge_megawatt_hour > 0.0).astype(float),
+        "bess_state_of_charge_megawatt_hour": bess_state_of_charge_megawatt_hour,
+        "bess_previous_state_of_charge_megawatt_hour": np.concatenate(([bess_state_of_charge_initial_megawatt_hour], bess_state_of_charge_megawatt_hour[:-1])),
+        "res_grid_export_net_megawatt_hour": res_grid_export_net_megawatt_hour,
+        "res_grid_export_gross_megawatt_hour": res_grid_export_net_megawatt_hour - np.nan_to_num(parameters.res_grid_export_matched_megawatt_hour),
+    }
+    totals = _totals(values, parameters)
+    values = {
+        **{name: value for name, value in values.items() if not name.startswith("res_")},
+        "bess_cycles_count": totals["bess_cycles_count"],
+        "bess_profit_euro": totals["bess_profit_euro"],
+        **{name: value for name, value in values.items() if name.startswith("res_")},
+        "res_profit_euro": totals["res_profit_euro"],
+    }
+    return values
+
+
+def _process_values(values: dict[str, float | np.ndarray], parameters: Box, data: Box) -> dict[str, float | Series[float]]:
+    """
+    Aligns variable values computed outside a solver with the input index, in the same format as _process_results.
+    """
+    processed = {}
+    for name, value in values.items():
+        if np.ndim(value) == 0:
+            processed[name] = 0.0 if np.isclose(value, 0.0) else float(value)
+            continue
+
+        value = pd.Series(data=value, index=parameters.market, dtype=float)
+        value = value.mask(np.isclose(value, 0.0), other=0.0)
+        value = value.reindex(index=data.market_input.index)
+        processed[name] = value
+    return processed
+
+
+def _race_optimizers(data: Box) -> Box:
+    """
+    Solves the same model with every solver of the portfolio in parallel processes and
+    returns the first optimal solution, recording which solver won.
+
+    Solvers behave very differently depending on the day, so racing them gives the best
+    case latency of the portfolio instead of the worst case of a single fixed solver.
+    If no solver is optimal, the first solution that finished is returned instead.
+    """
+    # Uploaded files are not needed by the model and might not be picklable.
+    candidates = [data | Box(solver=solver, market_csv=None) for solver in data.solver]
+    solution = None
+    # Spawn, because that is the only start method in the XXXX_XXXX Windows servers anyway.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=len(candidates)) as pool:
+        for solver, candidate in pool.imap_unordered(_race_optimizer, candidates):
+            if candidate is None:
+                continue
+
+            if candidate.get("subproblems_optimal", candidate.optimal):
+                solution = candidate | Box(winning_solver=solver)
+                break
+
+            if solution is None:
+                solution = candidate | Box(winning_solver=solver)
+
+    # Leaving the pool terminates the losing workers. Shell solvers (glpsol, cbc) are
+    # their own processes, so they are left to finish on their own.
+    if solution is None:
+        raise ApplicationError(f"No solver could solve the model: {data.solver}")
+
+    return solution
+
+
+def _race_optimizer(data: Box) -> tuple[str, Box | None]:
+    """
+    Solves the model with a single solver of the portfolio, returning no solution if the solver fails.
+    """
+    try:
+        solution = _solve(data, _model_parameters(data))
+    # Missing or crashing solvers should not lose the race for the rest.
+    except ApplicationError:
+        solution = None
+    return data.solver, solution
 
 
 @contextmanager
-def _disable_index_checking() -> Iterator[None]:
+def _template_model(parameters: Box, presolve: Box) -> Iterator[ConcreteModel]:
     """
-    Context manager to temporarily disable Pyomo's index checking so that
-    intraday markets do not need to be manually modified for their starting
-    period during model construction.
+    Lends the model template for the topology of the provided parameters, updated with their values.
+
+    The model structure only depends on the module topology (see _topology_signature), so templates
+    are cached and later runs only update the mutable parameters and fixed variables, skipping the
+    construction phase entirely. Least recently used templates are evicted. Templates are taken out
+    of the cache while lent, so that concurrent runs (threads) never share one, the second run
+    with the same topology builds its own instead.
     """
-    index_checking_enabled = IndexedComponent._DEFAULT_INDEX_CHECKING_ENABLED
-    IndexedComponent._DEFAULT_INDEX_CHECKING_ENABLED = False
+    signature = _topology_signature(parameters)
+    with _templates_lock:
+        model = _templates.pop(signature, None)
+    if model is not None:
+        _update_model(model, parameters)
+    else:
+        model = _create_model(parameters, presolve)
     try:
-        yield
+        yield model
     finally:
-        # Remember to reenable index checking afterwards as it is a global resource.
-        IndexedComponent._DEFAULT_INDEX_CHECKING_ENABLED = index_checking_enabled
+        with _templates_lock:
+            _templates[signature] = model
+            while len(_templates) > _TEMPLATES_MAXSIZE:
+                _templates.popitem(last=False)
+
+
+# Every template keeps a whole model in memory, so only a few topologies are kept around.
+_TEMPLATES_MAXSIZE = 8
 
+_templates: OrderedDict[tuple, ConcreteModel] = OrderedDict()
 
-def _create_model(data: Box) -> ConcreteModel:
+_templates_lock = threading.Lock()
+
+
+def _topology_signature(parameters: Box) -> tuple:
     """
-    Constructs the optimization model using the provided data.
-    For more information, consult the equations in XXXX_XXXX.
+    Computes the values that determine the structure of the model, that is to say, which
+    components and constraints exist, as opposed to the values of its parameters.
     """
-    model = pyo.ConcreteModel()
+    # Periods are positions, so only their count is part of the structure, not their labels.
+    signature = (
+        len(parameters.market),
+        parameters.bess_grid_import_condition,
+        parameters.bess_res_import_condition,
+        parameters.bess_res_import_clipping_condition,
+        parameters.bess_res_import_priority_condition,
+        parameters.bess_grid_export_condition,
+        parameters.bess_fixed_condition,
+        parameters.bess_indicator_formulation,
+        parameters.bess_final_state_of_charge_condition,
+        parameters.res_grid_export_condition,
+    )
+    return signature
+
+
+def _model_parameters(data: Box) -> Box:
+    """
+    Computes every model parameter from the provided data, aligned to the optimized market periods.
+
+    Indexed parameters are float arrays and the keys match the Pyomo component names, so that the same
+    values feed both the Pyomo and the matrix backends. Values that used to select the form of a
+    constraint period by period (curtailment, clipping, reciprocals) are precomputed here, so that
+    the model structure does not depend on them.
+    """
+    # fmt: off
+    market = data.market_price_euro_per_megawatt_hour.dropna().index
+    hours = data.market_time_unit_minute * (1.0 / 60.0)
+
+    market_price_euro_per_megawatt_hour = _align(data.market_price_euro_per_megawatt_hour, market, fill_value=0.0)
+    res_grid_export_net_price_euro_per_megawatt_hour = _align(
+        data.market_price_euro_per_megawatt_hour.where(
+            data.market_price_euro_per_megawatt_hour
+            >= data.res_export_price_euro_per_megawatt_hour,
+            other=0.0,
+        ),
+        market,
+    )
+    grid_export_limits_megawatt = np.minimum(_align(data.grid_export_limits_megawatt, market), data.grid_export_limit_megawatt)
+    bess_grid_export_limits_megawatt = np.minimum(_align(data.bess_grid_export_limits_megawatt, market), grid_export_limits_megawatt)
+    res_grid_export_limits_megawatt = np.minimum(_align(data.res_grid_export_limits_megawatt, market), grid_export_limits_megawatt)
+    res_export_megawatt_hour = _align(data.res_export_megawatt_hour, market)
+    bess_res_import_clipping_threshold_megawatt_hour = data.bess_res_import_clipping_threshold_megawatt * hours
+    bess_res_import_curtailed_limits_megawatt_hour = np.where(
+        res_export_megawatt_hour <= res_grid_export_limits_megawatt * hours,
+        0.0,
+        res_export_megawatt_hour - res_grid_export_limits_megawatt * hours,
+    )
+    bess_res_import_uncurtailed_limits_megawatt_hour = np.where(
+        res_export_megawatt_hour > res_grid_export_limits_megawatt * hours,
+        res_grid_export_limits_megawatt * hours,
+        res_export_megawatt_hour,
+    )
+    res_grid_export_available_megawatt_hour = np.minimum(res_export_megawatt_hour, res_grid_export_limits_megawatt * hours)
+
+    # Big-M of every indicator rule, either the tightest bound implied by the other constraints
+    # period by period, or the capacity of the original formulation. NaN bounds are ignored.
+    bess_energy_capacity_megawatt_hour = np.full(len(market), float(data.bess_energy_capacity_megawatt_hour))
+    if data.model_tight_big_m:
+        bess_available_percent = (data.bess_state_of_health_percent / 100.0) * (data.bess_availability_percent / 100.0)
+        bess_charge_big_m_megawatt_hour = bess_available_percent * np.fmin(data.bess_power_capacity_megawatt * hours, bess_energy_capacity_megawatt_hour)
+        bess_discharge_big_m_megawatt_hour = bess_charge_big_m_megawatt_hour
+        # Every import is charged with the charging efficiency, so it is bounded by the charge.
+        bess_import_big_m_megawatt_hour = (
+            bess_charge_big_m_megawatt_hour / (data.bess_charging_efficiency_percent / 100.0)
+            if data.bess_charging_efficiency_percent != 0.0
+            else bess_energy_capacity_megawatt_hour
+        )
+        bess_res_import_curtailed_big_m_megawatt_hour = np.fmin(bess_res_import_curtailed_limits_megawatt_hour, bess_import_big_m_megawatt_hour)
+        bess_res_import_uncurtailed_big_m_megawatt_hour = np.fmin(bess_res_import_uncurtailed_limits_megawatt_hour, bess_import_big_m_megawatt_hour)
+        bess_res_import_priority_res_grid_export_big_m_megawatt_hour = np.nan_to_num(res_grid_export_available_megawatt_hour)
+        bess_res_import_priority_bess_grid_import_big_m_megawatt_hour = bess_import_big_m_megawatt_hour
+    else:
+        bess_charge_big_m_megawatt_hour = bess_energy_capacity_megawatt_hour
+        bess_discharge_big_m_megawatt_hour = bess_energy_capacity_megawatt_hour
+        bess_res_import_curtailed_big_m_megawatt_hour = res_export_megawatt_hour
+        bess_res_import_uncurtailed_big_m_megawatt_hour = res_export_megawatt_hour
+        bess_res_import_priority_res_grid_export_big_m_megawatt_hour = res_export_megawatt_hour
+        bess_res_import_priority_bess_grid_import_big_m_megawatt_hour = bess_energy_capacity_megawatt_hour
+
+    bess_fixed_condition = (
+        bool(data.bess_grid_import_net_fixed_megawatt)
+        or bool(data.bess_res_import_fixed_megawatt)
+        or bool(data.bess_grid_export_net_fixed_megawatt)
+    )
+
+    parameters = Box(
+        market=market,
+        market_rate=data.market_rate,
+        market_time_unit_minute=data.market_time_unit_minute,
+        market_discount_factor=np.exp(-data.market_rate * np.arange(1, len(market) + 1)),
+        bess_grid_import_net_fixed_megawatt_hour=_align(data.bess_grid_import_net_fixed_megawatt, market, fill_value=0.0) * hours,
+        bess_grid_import_net_price_euro_per_megawatt_hour=market_price_euro_per_megawatt_hour,
+        bess_grid_import_matched_megawatt_hour=_align(data.bess_grid_import_matched_megawatt_hour, market),
+        bess_grid_import_condition=data.dim_ufi_bess_grid_import is not None,
+        bess_res_import_fixed_megawatt_hour=_align(data.bess_res_import_fixed_megawatt, market, fill_value=0.0) * hours,
+        bess_res_import_curtailed_price_euro_per_megawatt_hour=np.zeros(len(market)),
+        bess_res_import_uncurtailed_price_euro_per_megawatt_hour=(
+            res_grid_export_net_price_euro_per_megawatt_hour
+            if data.bess_res_import_clipping_percent != 100.0
+            else np.zeros(len(market))
+        ),
+        bess_res_import_curtailed_limits_megawatt_hour=bess_res_import_curtailed_limits_megawatt_hour,
+        bess_res_import_uncurtailed_limits_megawatt_hour=bess_res_import_uncurtailed_limits_megawatt_hour,
+        bess_res_import_curtailed_big_m_megawatt_hour=bess_res_import_curtailed_big_m_megawatt_hour,
+        bess_res_import_uncurtailed_big_m_megawatt_hour=bess_res_import_uncurtailed_big_m_megawatt_hour,
+        bess_res_import_clipping_percent=data.bess_res_import_clipping_percent,
+        bess_res_import_clipping_threshold_megawatt=data.bess_res_import_clipping_threshold_megawatt,
+        bess_res_import_clipping_limits_megawatt_hour=np.where(
+            res_export_megawatt_hour <= bess_res_import_clipping_threshold_megawatt_hour,
+            0.0,
+            (data.bess_res_import_clipping_percent / 100.0)
+            * (res_export_megawatt_hour - bess_res_import_clipping_threshold_megawatt_hour),
+        ),
+        bess_res_import_clipping_condition=data.bess_res_import_clipping_percent != 100.0,
+        bess_res_import_priority_res_grid_export_big_m_megawatt_hour=bess_res_import_priority_res_grid_export_big_m_megawatt_hour,
+        bess_res_import_priority_bess_grid_import_big_m_megawatt_hour=bess_res_import_priority_bess_grid_import_big_m_megawatt_hour,
+        bess_res_import_priority_condition=data.bess_res_import_priority,
+        bess_res_import_condition=data.dim_ufi_bess_res_import is not None,
+        bess_grid_export_net_fixed_megawatt_hour=_align(data.bess_grid_export_net_fixed_megawatt, market, fill_value=0.0) * hours,
+        bess_grid_export_net_price_euro_per_megawatt_hour=market_price_euro_per_megawatt_hour,
+        bess_grid_export_matched_megawatt_hour=_align(data.bess_grid_export_matched_megawatt_hour, market),
+        bess_grid_export_limits_megawatt=bess_grid_export_limits_megawatt,
+        bess_grid_export_condition=data.dim_ufi_bess_grid_export is not None,
+        bess_fixed_condition=bess_fixed_condition,
+        bess_charging_power_capacity_megawatt=data.bess_power_capacity_megawatt,
+        bess_discharging_power_capacity_megawatt=data.bess_power_capacity_megawatt,
+        bess_energy_capacity_megawatt_hour=data.bess_energy_capacity_megawatt_hour,
+        bess_energy_capacity_reciprocal_per_megawatt_hour=(
+            1.0 / data.bess_energy_capacity_megawatt_hour
+            if data.bess_energy_capacity_megawatt_hour != 0.0
+            else 0.0
+        ),
+        bess_charging_efficiency_percent=data.bess_charging_efficiency_percent,
+        bess_discharging_efficiency_percent=data.bess_discharging_efficiency_percent,
+        bess_discharging_efficiency_reciprocal=(
+            1.0 / (data.bess_discharging_efficiency_percent / 100.0)
+            if data.bess_discharging_efficiency_percent != 0.0
+            else 0.0
+        ),
+        bess_charge_big_m_megawatt_hour=bess_charge_big_m_megawatt_hour,
+        bess_discharge_big_m_megawatt_hour=bess_discharge_big_m_megawatt_hour,
+        bess_indicator_formulation=_indicator_formulation(data),
+        bess_maximum_cycles_count=data.market_horizon_day * data.bess_maximum_cycles_count_per_day,
+        bess_profit_threshold_euro_per_megawatt_hour=data.bess_profit_threshold_euro_per_megawatt_hour,
+        bess_minimum_state_of_charge_percent=data.bess_minimum_state_of_charge_percent,
+        bess_maximum_state_of_charge_percent=data.bess_maximum_state_of_charge_percent,
+        bess_initial_state_of_charge_percent=float(
+            np.clip(
+                data.bess_initial_state_of_charge_percent,
+                a_min=data.bess_minimum_state_of_charge_percent,
+                a_max=min(
+                    data.bess_maximum_state_of_charge_percent,
+                    data.bess_state_of_health_percent * data.bess_availability_percent,
+                ),
+            )
+        ),
+        bess_final_state_of_charge_percent=data.bess_final_state_of_charge_percent,
+        bess_final_state_of_charge_condition=data.bess_final_state_of_charge_percent is not None,
+        bess_state_of_charge_fixed_megawatt_hour=(
+            _align(data.bess_state_of_charge_fixed_percent, market) / 100.0
+            * data.bess_energy_capacity_megawatt_hour
+        ),
+        bess_state_of_health_percent=data.bess_state_of_health_percent,
+        bess_availability_percent=data.bess_availability_percent,
+        res_export_megawatt_hour=res_export_megawatt_hour,
+        res_grid_export_available_megawatt_hour=res_grid_export_available_megawatt_hour,
+        res_grid_export_net_price_euro_per_megawatt_hour=res_grid_export_net_price_euro_per_megawatt_hour,
+        res_grid_export_matched_megawatt_hour=_align(data.res_grid_export_matched_megawatt_hour, market),
+        res_grid_export_limits_megawatt=res_grid_export_limits_megawatt,
+        res_grid_export_condition=data.dim_ufi_res_grid_export is not None,
+        grid_export_limits_megawatt=grid_export_limits_megawatt,
+    )
+    return parameters
+
+
+# Solvers that support special ordered sets, by name without interface prefix or suffix (see _solver_options).
+_SOS_SOLVERS = ("cbc", "gurobi", "cplex")
+
+
+def _sos_capable(solver: str | list[str]) -> bool:
+    """
+    Checks whether a solver supports special ordered sets. Portfolios are checked solver by solver when raced.
+    """
+    capable = isinstance(solver, str) and solver.removeprefix("appsi_").removesuffix("_direct").removesuffix("_persistent") in _SOS_SOLVERS  # fmt: off
+    return capable
+
+
+def _indicator_formulation(data: Box) -> str:
+    """
+    Returns the configured indicator formulation, or big_m with a warning if the solver does not support the sos1 one.
+
+    HiGHS (appsi_highs and the scipy matrix backend) and glpk have no special ordered sets.
+    """
+    if data.model_indicator_formulation == "sos1" and not _sos_capable(data.solver):
+        warnings.warn(f"{data.solver} does not support special ordered sets, using the big_m formulation instead", stacklevel=2)
+        return "big_m"
+    return data.model_indicator_formulation
+
+
+def _align(value: Series[float] | np.ndarray | dict[str, float] | float | None, index: pd.Index, fill_value: float = np.nan) -> np.ndarray:
+    """
+    Aligns a Series, a dictionary keyed by market period or a scalar to the given index as a float array.
+    Arrays are assumed to be already aligned.
+    """
+    if value is None:
+        value = np.full(len(index), fill_value, dtype=float)
+        return value
+
+    if isinstance(value, np.ndarray):
+        value = value.astype(float)
+        return value
+
+    if isinstance(value, dict):
+        value = pd.Series(data=value, dtype=float)
+
+    if not isinstance(value, Series):
+        value = np.full(len(index), value, dtype=float)
+        return value
+
+    value = value.reindex(index=index).to_numpy(dtype=float, na_value=fill_value)
+    return value
+
+
+def _indexed(parameters: Box, name: str) -> dict[str, float]:
+    """
+    Returns an indexed parameter keyed by market period position, as Pyomo expects it.
+    """
+    values = dict(enumerate(parameters[name].tolist()))
+    return values
+
+
+# Fixed schedule of every battery flow, substituted as a parameter when any schedule is fixed.
+_FIXED_SCHEDULES = {
+    "bess_grid_import_net_megawatt_hour": "bess_grid_import_net_fixed_megawatt_hour",
+    "bess_res_import_megawatt_hour": "bess_res_import_fixed_megawatt_hour",
+    "bess_grid_export_net_megawatt_hour": "bess_grid_export_net_fixed_megawatt_hour",
+}
 
-    model.market = pyo.Set(
-        initialize=data.market_price_euro_per_megawatt_hour.dropna().index,
+# Net and matched positions of every gross position, which is an expression when the net position is substituted.
+_GROSS_POSITIONS = {
+    "bess_grid_import_gross_megawatt_hour": ("bess_grid_import_net_megawatt_hour", "bess_grid_import_matched_megawatt_hour"),
+    "bess_grid_export_gross_megawatt_hour": ("bess_grid_export_net_megawatt_hour", "bess_grid_export_matched_megawatt_hour"),
+    "res_grid_export_gross_megawatt_hour": ("res_grid_export_net_megawatt_hour", "res_grid_export_matched_megawatt_hour"),
+}
+
+
+def _presolve(parameters: Box) -> Box:
+    """
+    Decides which variable and constraint families are left out of the model for the module topology (structural presolve).
+
+    Variables of disabled topologies are substituted by zero parameters and fixed schedules by mutable parameters,
+    gross positions of substituted flows become expressions, indicators of the sos1 formulation are derived from
+    the flows after solving, and constraint families that become trivial or are replaced are not
+    created at all, instead of creating fixed variables and skipping constraints period by period. Fixed states of
+    charge are still fixed variables, because the fixed periods change between runs of the same template, but
+    writers already emit them as constants. Returns the substitutions, the removed constraint families and how
+    many variables (zero and fixed substitutions) and constraints are removed per run.
+    """
+    # fmt: off
+    n = len(parameters.market)
+
+    substitutions = {}
+    for name, condition in (
+        ("bess_grid_import_net_megawatt_hour", parameters.bess_grid_import_condition),
+        ("bess_res_import_megawatt_hour", parameters.bess_res_import_condition),
+        ("bess_grid_export_net_megawatt_hour", parameters.bess_grid_export_condition),
+    ):
+        # Disabled topologies take precedence over fixed schedules.
+        if not condition:
+            substitutions[name] = "zero"
+        elif parameters.bess_fixed_condition:
+            substitutions[name] = "fixed"
+
+    if not parameters.bess_res_import_condition:
+        substitutions["bess_res_import_curtailed_megawatt_hour"] = "zero"
+        substitutions["bess_res_import_uncurtailed_megawatt_hour"] = "zero"
+        substitutions["bess_res_import_curtailed_uncurtailed_indicator"] = "zero"
+
+    if not parameters.bess_res_import_priority_condition:
+        substitutions["bess_res_import_priority_indicator"] = "zero"
+
+    if not parameters.res_grid_export_condition:
+        substitutions["res_grid_export_net_megawatt_hour"] = "zero"
+
+    # The renewable import indicator does not exclude any flow, so it needs no special ordered set. Special
+    # ordered sets only take variables, so the priority keeps its indicator if either flow is substituted.
+    sos1 = parameters.bess_indicator_formulation == "sos1"
+    if sos1:
+        substitutions["bess_charge_discharge_indicator"] = "derived"
+        substitutions.setdefault("bess_res_import_curtailed_uncurtailed_indicator", "derived")
+        if (
+            "bess_res_import_priority_indicator" not in substitutions
+            and "bess_grid_import_net_megawatt_hour" not in substitutions
+            and "res_grid_export_net_megawatt_hour" not in substitutions
+        ):
+            substitutions["bess_res_import_priority_indicator"] = "derived"
+
+    for gross, (net, _) in _GROSS_POSITIONS.items():
+        if net in substitutions:
+            substitutions[gross] = "expression"
+
+    def zero(name):
+        return substitutions.get(name) == "zero"
+
+    def derived(name):
+        return substitutions.get(name) == "derived"
+
+    priority = parameters.bess_res_import_priority_condition
+    clipping = parameters.bess_res_import_clipping_condition
+
+    # Removed constraint families and how many constraints they had (some were already skipped period by period).
+    families = {
+        "bess_grid_import_rule": ("bess_grid_import_net_megawatt_hour" in substitutions, n),
+        "bess_res_import_rule": (zero("bess_res_import_megawatt_hour"), n),
+        "bess_res_import_curtailed_rule": (zero("bess_res_import_megawatt_hour"), n),
+        "bess_res_import_uncurtailed_rule": (zero("bess_res_import_megawatt_hour"), n),
+        "bess_res_import_curtailed_indicator_rule": (zero("bess_res_import_megawatt_hour") or sos1, n),
+        "bess_res_import_uncurtailed_indicator_rule": (zero("bess_res_import_megawatt_hour") or sos1, n),
+        "bess_res_import_clipping_rule": (not clipping or zero("bess_res_import_megawatt_hour"), n if clipping else 0),
+        "bess_res_import_priority_res_grid_export_indicator_rule": (not priority or zero("res_grid_export_net_megawatt_hour") or derived("bess_res_import_priority_indicator"), n if priority else 0),
+        "bess_res_import_priority_bess_grid_import_indicator_rule": (not priority or zero("bess_grid_import_net_megawatt_hour") or derived("bess_res_import_priority_indicator"), n if priority else 0),
+        "bess_grid_export_rule": ("bess_grid_export_net_megawatt_hour" in substitutions, n),
+        "bess_grid_export_limit_rule": (zero("bess_grid_export_net_megawatt_hour"), n),
+        "res_grid_export_rule": (zero("res_grid_export_net_megawatt_hour"), n),
+        "res_grid_export_limit_rule": (zero("res_grid_export_net_megawatt_hour"), n),
+        "grid_export_limit_rule": (zero("res_grid_export_net_megawatt_hour") and zero("bess_grid_export_net_megawatt_hour"), n),
+        "bess_charge_indicator_rule": (sos1, n),
+        "bess_discharge_indicator_rule": (sos1, n),
+    }
+    constraints = [name for name, (removed, _) in families.items() if removed]
+    # Gross positions are still computed from the net flows and derived indicators still enforced by the
+    # special ordered sets, only zero and fixed variables are actually taken out of the problem.
+    removed = [name for name, substitution in substitutions.items() if substitution in ("zero", "fixed")]
+
+    presolve = Box(
+        substitutions=substitutions,
+        constraints=constraints,
+        variables_removed=n * len(removed),
+        constraints_removed=sum(count for removed, count in families.values() if removed),
     )
+    return presolve
+
+
+def _variable(presolve: Box, parameters: Box, name: str, *args, **kwargs) -> pyo.Var | pyo.Param | pyo.Expression:
+    """
+    Declares a variable, or the parameter or expression that substitutes it according to the presolve.
+    """
+    match presolve.substitutions.get(name):
+        case None:
+            return pyo.Var(*args, **kwargs)
+        case "zero":
+            return pyo.Param(*args, initialize=0.0, domain=pyo.Reals)
+        case "fixed":
+            return pyo.Param(*args, initialize=_indexed(parameters, _FIXED_SCHEDULES[name]), domain=pyo.Reals, mutable=True)  # fmt: off
+        case "expression":
+            net, matched = _GROSS_POSITIONS[name]
+            return pyo.Expression(*args, rule=lambda model, i: model.component(net)[i] - model.component(matched)[i])  # fmt: off
+        case "derived":
+            return pyo.Param(*args, initialize=0.0, domain=pyo.Reals, mutable=True)
+        case _:
+            assert_never()
+
+
+def _constraint(presolve: Box, decorator: Callable[[Callable], Callable]) -> Callable[[Callable], Callable]:
+    """
+    Applies a constraint decorator to a rule, unless the presolve removes its family.
+    """
+    def constraint(rule):
+        return rule if rule.__name__ in presolve.constraints else decorator(rule)
+
+    return constraint
+
+
+def _create_model(parameters: Box, presolve: Box) -> ConcreteModel:
+    """
+    Constructs the optimization model using the provided parameters and presolve.
+    """
+    model = pyo.ConcreteModel()
+    _build_model(model, parameters, presolve)
+    return model
+
+
+def _build_model(model: BlockData, parameters: Box, presolve: Box) -> None:
+    """
+    Adds every component of the optimization model to a block, using the provided parameters.
+
+    Every price, limit, matched position and state of charge parameter is mutable, so that the
+    model can be reused as a template for later runs with the same topology (see _update_model).
+    Any block works, so that several scenarios can live in the same model (see run_scenarios).
+    Families left out by the topology are not created at all (see _presolve).
+    For more information, consult the equations in XXXX_XXXX.
+    """
+    # Periods are dense integer positions, their labels are only mapped back when processing results.
+    model.market = pyo.RangeSet(0, len(parameters.market) - 1)
+    model.market_label = parameters.market
 
     model.market_rate = pyo.Param(
-        initialize=data.market_rate,
+        initialize=parameters.market_rate,
         domain=pyo.Reals,
+        mutable=True,
     )
 
     model.market_time_unit_minute = pyo.Param(
-        initialize=data.market_time_unit_minute,
+        initialize=parameters.market_time_unit_minute,
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.bess_grid_import_net_megawatt_hour = pyo.Var(
+    model.market_discount_factor = pyo.Param(
         model.market,
-        initialize=0.0,
+        initialize=_indexed(parameters, "market_discount_factor"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.bess_grid_import_net_fixed_megawatt = pyo.Param(
+    model.bess_grid_import_net_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_grid_import_net_megawatt_hour",
         model.market,
-        initialize=data.bess_grid_import_net_fixed_megawatt,
+        initialize=0.0,
         domain=pyo.NonNegativeReals,
     )
 
     model.bess_grid_import_net_price_euro_per_megawatt_hour = pyo.Param(
         model.market,
-        initialize=data.market_price_euro_per_megawatt_hour.fillna(value=0.0),
+        initialize=_indexed(parameters, "bess_grid_import_net_price_euro_per_megawatt_hour"),
         domain=pyo.Reals,
+        mutable=True,
     )
 
-    model.bess_grid_import_gross_megawatt_hour = pyo.Var(
+    model.bess_grid_import_matched_megawatt_hour = pyo.Param(
         model.market,
-        initialize=0.0,
-        domain=pyo.Reals,
+        initialize=_indexed(parameters, "bess_grid_import_matched_megawatt_hour"),
+        domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.bess_grid_import_matched_megawatt_hour = pyo.Param(
+    model.bess_grid_import_gross_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_grid_import_gross_megawatt_hour",
         model.market,
-        initialize=data.bess_grid_import_matched_megawatt_hour,
-        domain=pyo.NonNegativeReals,
+        initialize=0.0,
+        domain=pyo.Reals,
     )
 
     model.bess_grid_import_condition = pyo.Param(
-        initialize=data.dim_ufi_bess_grid_import is not None,
+        initialize=parameters.bess_grid_import_condition,
         domain=pyo.Boolean,
     )
 
-    model.bess_res_import_megawatt_hour = pyo.Var(
+    model.bess_res_import_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_res_import_megawatt_hour",
         model.market,
         initialize=0.0,
         domain=pyo.NonNegativeReals,
     )
 
-    model.bess_res_import_fixed_megawatt = pyo.Param(
+    model.bess_res_import_curtailed_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_res_import_curtailed_megawatt_hour",
         model.market,
-        initialize=data.bess_res_import_fixed_megawatt,
+        initialize=0.0,
         domain=pyo.NonNegativeReals,
     )
 
-    model.bess_res_import_curtailed_megawatt_hour = pyo.Var(
+    model.bess_res_import_curtailed_price_euro_per_megawatt_hour = pyo.Param(
         model.market,
-        initialize=0.0,
+        initialize=_indexed(parameters, "bess_res_import_curtailed_price_euro_per_megawatt_hour"),
+        domain=pyo.Reals,
+        mutable=True,
+    )
+
+    model.bess_res_import_curtailed_limits_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_res_import_curtailed_limits_megawatt_hour"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.bess_res_import_curtailed_price_euro_per_megawatt_hour = pyo.Param(
+    model.bess_res_import_uncurtailed_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_res_import_uncurtailed_megawatt_hour",
         model.market,
         initialize=0.0,
+        domain=pyo.NonNegativeReals,
+    )
+
+    model.bess_res_import_uncurtailed_price_euro_per_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_res_import_uncurtailed_price_euro_per_megawatt_hour"),
         domain=pyo.Reals,
+        mutable=True,
     )
 
-    model.bess_res_import_uncurtailed_megawatt_hour = pyo.Var(
+    model.bess_res_import_uncurtailed_limits_megawatt_hour = pyo.Param(
         model.market,
-        initialize=0.0,
+        initialize=_indexed(parameters, "bess_res_import_uncurtailed_limits_megawatt_hour"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.bess_res_import_uncurtailed_price_euro_per_megawatt_hour = pyo.Param(
+    model.bess_res_import_curtailed_big_m_megawatt_hour = pyo.Param(
         model.market,
-        initialize=(
-            data.market_price_euro_per_megawatt_hour.where(
-                data.market_price_euro_per_megawatt_hour
-                >= data.res_export_price_euro_per_megawatt_hour,
-                other=0.0,
-            )
-            if data.bess_res_import_clipping_percent != 100.0
-            else 0.0
-        ),
+        initialize=_indexed(parameters, "bess_res_import_curtailed_big_m_megawatt_hour"),
         domain=pyo.Reals,
+        mutable=True,
     )
 
-    model.bess_res_import_curtailed_uncurtailed_indicator = pyo.Var(
+    model.bess_res_import_uncurtailed_big_m_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_res_import_uncurtailed_big_m_megawatt_hour"),
+        domain=pyo.Reals,
+        mutable=True,
+    )
+
+    model.bess_res_import_curtailed_uncurtailed_indicator = _variable(
+        presolve,
+        parameters,
+        "bess_res_import_curtailed_uncurtailed_indicator",
         model.market,
         initialize=0.0,
         domain=pyo.Binary,
     )
 
     model.bess_res_import_clipping_percent = pyo.Param(
-        initialize=data.bess_res_import_clipping_percent,
+        initialize=parameters.bess_res_import_clipping_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_res_import_clipping_percent: (
             0.0 <= bess_res_import_clipping_percent <= 100.0
         ),
+        mutable=True,
     )
 
     model.bess_res_import_clipping_threshold_megawatt = pyo.Param(
-        initialize=data.bess_res_import_clipping_threshold_megawatt,
+        initialize=parameters.bess_res_import_clipping_threshold_megawatt,
+        domain=pyo.NonNegativeReals,
+        mutable=True,
+    )
+
+    model.bess_res_import_clipping_limits_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_res_import_clipping_limits_megawatt_hour"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_res_import_clipping_condition = pyo.Param(
-        initialize=data.bess_res_import_clipping_percent != 100.0,
+        initialize=parameters.bess_res_import_clipping_condition,
         domain=pyo.Boolean,
     )
 
-    model.bess_res_import_priority_indicator = pyo.Var(
+    model.bess_res_import_priority_res_grid_export_big_m_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_res_import_priority_res_grid_export_big_m_megawatt_hour"),
+        domain=pyo.Reals,
+        mutable=True,
+    )
+
+    model.bess_res_import_priority_bess_grid_import_big_m_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_res_import_priority_bess_grid_import_big_m_megawatt_hour"),
+        domain=pyo.Reals,
+        mutable=True,
+    )
+
+    model.bess_res_import_priority_indicator = _variable(
+        presolve,
+        parameters,
+        "bess_res_import_priority_indicator",
         model.market,
         initialize=0.0,
         domain=pyo.Binary,
     )
 
     model.bess_res_import_priority_condition = pyo.Param(
-        initialize=data.bess_res_import_priority,
+        initialize=parameters.bess_res_import_priority_condition,
         domain=pyo.Boolean,
     )
 
     model.bess_res_import_condition = pyo.Param(
-        initialize=data.dim_ufi_bess_res_import is not None,
+        initialize=parameters.bess_res_import_condition,
         domain=pyo.Boolean,
     )
 
-    model.bess_grid_export_net_megawatt_hour = pyo.Var(
+    model.bess_grid_export_net_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_grid_export_net_megawatt_hour",
         model.market,
         initialize=0.0,
         domain=pyo.NonNegativeReals,
     )
 
-    model.bess_grid_export_net_fixed_megawatt = pyo.Param(
-        model.market,
-        initialize=data.bess_grid_export_net_fixed_megawatt,
-        domain=pyo.NonNegativeReals,
-    )
-
     model.bess_grid_export_net_price_euro_per_megawatt_hour = pyo.Param(
         model.market,
-        initialize=data.market_price_euro_per_megawatt_hour.fillna(value=0.0),
+        initialize=_indexed(parameters, "bess_grid_export_net_price_euro_per_megawatt_hour"),
         domain=pyo.Reals,
+        mutable=True,
     )
 
-    model.bess_grid_export_gross_megawatt_hour = pyo.Var(
+    model.bess_grid_export_matched_megawatt_hour = pyo.Param(
         model.market,
-        initialize=0.0,
-        domain=pyo.Reals,
+        initialize=_indexed(parameters, "bess_grid_export_matched_megawatt_hour"),
+        domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.bess_grid_export_matched_megawatt_hour = pyo.Param(
+    model.bess_grid_export_gross_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "bess_grid_export_gross_megawatt_hour",
         model.market,
-        initialize=data.bess_grid_export_matched_megawatt_hour,
-        domain=pyo.NonNegativeReals,
+        initialize=0.0,
+        domain=pyo.Reals,
     )
 
     model.bess_grid_export_limits_megawatt = pyo.Param(
         model.market,
-        initialize=(
-            pd.Series(
-                np.minimum.reduce(
-                    [
-                        data.bess_grid_export_limits_megawatt,
-                        data.grid_export_limits_megawatt,
-                        pd.Series(
-                            data.grid_export_limit_megawatt,
-                            index=data.market_input.index,
-                            dtype=float,
-                        ),
-                    ],
-                ),
-                index=data.market_input.index,
-                dtype=float,
-            )
-        ),
+        initialize=_indexed(parameters, "bess_grid_export_limits_megawatt"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_grid_export_condition = pyo.Param(
-        initialize=data.dim_ufi_bess_grid_export is not None,
-        domain=pyo.Boolean,
-    )
-
-    model.bess_fixed_condition = pyo.Param(
-        initialize=(
-            bool(model.bess_grid_import_net_fixed_megawatt.extract_values())
-            or bool(model.bess_res_import_fixed_megawatt.extract_values())
-            or bool(model.bess_grid_export_net_fixed_megawatt.extract_values())
-        ),
+        initialize=parameters.bess_grid_export_condition,
         domain=pyo.Boolean,
     )
 
     model.bess_charging_power_capacity_megawatt = pyo.Param(
-        initialize=data.bess_power_capacity_megawatt,
+        initialize=parameters.bess_charging_power_capacity_megawatt,
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_discharging_power_capacity_megawatt = pyo.Param(
-        initialize=data.bess_power_capacity_megawatt,
+        initialize=parameters.bess_discharging_power_capacity_megawatt,
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_energy_capacity_megawatt_hour = pyo.Param(
-        initialize=data.bess_energy_capacity_megawatt_hour,
+        initialize=parameters.bess_energy_capacity_megawatt_hour,
+        domain=pyo.NonNegativeReals,
+        mutable=True,
+    )
+
+    model.bess_energy_capacity_reciprocal_per_megawatt_hour = pyo.Param(
+        initialize=parameters.bess_energy_capacity_reciprocal_per_megawatt_hour,
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_charging_efficiency_percent = pyo.Param(
-        initialize=data.bess_charging_efficiency_percent,
+        initialize=parameters.bess_charging_efficiency_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_charging_efficiency_percent: (
             0.0 <= bess_charging_efficiency_percent <= 100.0
         ),
+        mutable=True,
     )
 
     model.bess_discharging_efficiency_percent = pyo.Param(
-        initialize=data.bess_discharging_efficiency_percent,
+        initialize=parameters.bess_discharging_efficiency_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_discharging_efficiency_percent: (
             0.0 <= bess_discharging_efficiency_percent <= 100.0
         ),
+        mutable=True,
+    )
+
+    model.bess_discharging_efficiency_reciprocal = pyo.Param(
+        initialize=parameters.bess_discharging_efficiency_reciprocal,
+        domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_charge_megawatt_hour = pyo.Var(
@@ -315,73 +2482,88 @@ def _create_model(data: Box) -> ConcreteModel:
         domain=pyo.NonNegativeReals,
     )
 
-    model.bess_charge_discharge_indicator = pyo.Var(
+    model.bess_charge_big_m_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_charge_big_m_megawatt_hour"),
+        domain=pyo.Reals,
+        mutable=True,
+    )
+
+    model.bess_discharge_big_m_megawatt_hour = pyo.Param(
+        model.market,
+        initialize=_indexed(parameters, "bess_discharge_big_m_megawatt_hour"),
+        domain=pyo.Reals,
+        mutable=True,
+    )
+
+    model.bess_charge_discharge_indicator = _variable(
+        presolve,
+        parameters,
+        "bess_charge_discharge_indicator",
         model.market,
         initialize=0.0,
         domain=pyo.Binary,
     )
 
     model.bess_maximum_cycles_count = pyo.Param(
-        initialize=data.market_horizon_day * data.bess_maximum_cycles_count_per_day,
+        initialize=parameters.bess_maximum_cycles_count,
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_profit_threshold_euro_per_megawatt_hour = pyo.Param(
-        initialize=data.bess_profit_threshold_euro_per_megawatt_hour,
+        initialize=parameters.bess_profit_threshold_euro_per_megawatt_hour,
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.bess_minimum_state_of_charge_percent = pyo.Param(
-        initialize=data.bess_minimum_state_of_charge_percent,
+        initialize=parameters.bess_minimum_state_of_charge_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_minimum_state_of_charge_percent: (
             0.0 <= bess_minimum_state_of_charge_percent <= 100.0
         ),
+        mutable=True,
     )
 
     model.bess_maximum_state_of_charge_percent = pyo.Param(
-        initialize=data.bess_maximum_state_of_charge_percent,
+        initialize=parameters.bess_maximum_state_of_charge_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_maximum_state_of_charge_percent: (
             0.0 <= bess_maximum_state_of_charge_percent <= 100.0
         ),
+        mutable=True,
     )
 
+    # Mutable parameters are not constants, so compare against their current values.
     model.bess_initial_state_of_charge_percent = pyo.Param(
-        initialize=(
-            np.clip(
-                data.bess_initial_state_of_charge_percent,
-                a_min=data.bess_minimum_state_of_charge_percent,
-                a_max=min(
-                    data.bess_maximum_state_of_charge_percent,
-                    data.bess_state_of_health_percent * data.bess_availability_percent,
-                ),
-            )
-        ),
+        initialize=parameters.bess_initial_state_of_charge_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_initial_state_of_charge_percent: (
             0.0 <= bess_initial_state_of_charge_percent <= 100.0
-            and model.bess_minimum_state_of_charge_percent
+            and pyo.value(model.bess_minimum_state_of_charge_percent)
             <= bess_initial_state_of_charge_percent
-            <= model.bess_maximum_state_of_charge_percent
+            <= pyo.value(model.bess_maximum_state_of_charge_percent)
         ),
+        mutable=True,
     )
 
     model.bess_final_state_of_charge_percent = pyo.Param(
-        initialize=data.bess_final_state_of_charge_percent
-        if data.bess_final_state_of_charge_percent is not None
+        initialize=parameters.bess_final_state_of_charge_percent
+        if parameters.bess_final_state_of_charge_condition
         else NOTSET,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_final_state_of_charge_percent: (
             0.0 <= bess_final_state_of_charge_percent <= 100.0
-            and model.bess_minimum_state_of_charge_percent
+            and pyo.value(model.bess_minimum_state_of_charge_percent)
             <= bess_final_state_of_charge_percent
-            <= model.bess_maximum_state_of_charge_percent
+            <= pyo.value(model.bess_maximum_state_of_charge_percent)
         ),
+        mutable=True,
     )
 
     model.bess_final_state_of_charge_condition = pyo.Param(
-        initialize=data.bess_final_state_of_charge_percent is not None,
+        initialize=parameters.bess_final_state_of_charge_condition,
     )
 
     model.bess_state_of_charge_megawatt_hour = pyo.Var(
@@ -390,12 +2572,6 @@ def _create_model(data: Box) -> ConcreteModel:
         domain=pyo.NonNegativeReals,
     )
 
-    model.bess_state_of_charge_fixed_percent = pyo.Param(
-        model.market,
-        initialize=data.bess_state_of_charge_fixed_percent,
-        domain=pyo.NonNegativeReals,
-    )
-
     model.bess_previous_state_of_charge_megawatt_hour = pyo.Var(
         model.market,
         initialize=0.0,
@@ -403,19 +2579,21 @@ def _create_model(data: Box) -> ConcreteModel:
     )
 
     model.bess_state_of_health_percent = pyo.Param(
-        initialize=data.bess_state_of_health_percent,
+        initialize=parameters.bess_state_of_health_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_state_of_health_percent: (
             0.0 <= bess_state_of_health_percent <= 100.0
         ),
+        mutable=True,
     )
 
     model.bess_availability_percent = pyo.Param(
-        initialize=data.bess_availability_percent,
+        initialize=parameters.bess_availability_percent,
         domain=pyo.NonNegativeReals,
         validate=lambda model, bess_availability_percent: (
             0.0 <= bess_availability_percent <= 100.0
         ),
+        mutable=True,
     )
 
     model.bess_cycles_count = pyo.Var(
@@ -430,64 +2608,59 @@ def _create_model(data: Box) -> ConcreteModel:
 
     model.res_export_megawatt_hour = pyo.Param(
         model.market,
-        initialize=data.res_export_megawatt_hour,
+        initialize=_indexed(parameters, "res_export_megawatt_hour"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.res_grid_export_net_megawatt_hour = pyo.Var(
+    model.res_grid_export_available_megawatt_hour = pyo.Param(
         model.market,
-        initialize=0.0,
+        initialize=_indexed(parameters, "res_grid_export_available_megawatt_hour"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
-    model.res_grid_export_net_price_euro_per_megawatt_hour = pyo.Param(
+    model.res_grid_export_net_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "res_grid_export_net_megawatt_hour",
         model.market,
-        initialize=(
-            data.market_price_euro_per_megawatt_hour.where(
-                data.market_price_euro_per_megawatt_hour
-                >= data.res_export_price_euro_per_megawatt_hour,
-                other=0.0,
-            )
-        ),
-        domain=pyo.Reals,
+        initialize=0.0,
+        domain=pyo.NonNegativeReals,
     )
 
-    model.res_grid_export_gross_megawatt_hour = pyo.Var(
+    model.res_grid_export_net_price_euro_per_megawatt_hour = pyo.Param(
         model.market,
-        initialize=0.0,
+        initialize=_indexed(parameters, "res_grid_export_net_price_euro_per_megawatt_hour"),
         domain=pyo.Reals,
+        mutable=True,
     )
 
     model.res_grid_export_matched_megawatt_hour = pyo.Param(
         model.market,
-        initialize=data.res_grid_export_matched_megawatt_hour,
+        initialize=_indexed(parameters, "res_grid_export_matched_megawatt_hour"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
+    )
+
+    model.res_grid_export_gross_megawatt_hour = _variable(
+        presolve,
+        parameters,
+        "res_grid_export_gross_megawatt_hour",
+        model.market,
+        initialize=0.0,
+        domain=pyo.Reals,
     )
 
     model.res_grid_export_limits_megawatt = pyo.Param(
         model.market,
-        initialize=(
-            pd.Series(
-                np.minimum.reduce(
-                    [
-                        data.res_grid_export_limits_megawatt,
-                        data.grid_export_limits_megawatt,
-                        pd.Series(
-                            data.grid_export_limit_megawatt,
-                            index=data.market_input.index,
-                            dtype=float,
-                        ),
-                    ],
-                ),
-                index=data.market_input.index,
-                dtype=float,
-            )
-        ),
+        initialize=_indexed(parameters, "res_grid_export_limits_megawatt"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     model.res_grid_export_condition = pyo.Param(
-        initialize=data.dim_ufi_res_grid_export is not None,
+        initialize=parameters.res_grid_export_condition,
         domain=pyo.Boolean,
     )
 
@@ -498,30 +2671,16 @@ def _create_model(data: Box) -> ConcreteModel:
 
     model.grid_export_limits_megawatt = pyo.Param(
         model.market,
-        initialize=(
-            pd.Series(
-                np.minimum.reduce(
-                    [
-                        data.grid_export_limits_megawatt,
-                        pd.Series(
-                            data.grid_export_limit_megawatt,
-                            index=data.market_input.index,
-                            dtype=float,
-                        ),
-                    ],
-                ),
-                index=data.market_input.index,
-                dtype=float,
-            )
-        ),
+        initialize=_indexed(parameters, "grid_export_limits_megawatt"),
         domain=pyo.NonNegativeReals,
+        mutable=True,
     )
 
     @model.Objective(sense=pyo.maximize)
     def market_rule(model):
         # fmt: off
         return sum(
-            math.exp(-model.market_rate * model.market.ord(i))
+            model.market_discount_factor[i]
             * (
                 (model.bess_grid_export_net_price_euro_per_megawatt_hour[i] - model.bess_profit_threshold_euro_per_megawatt_hour)
                 * model.bess_grid_export_net_megawatt_hour[i]
@@ -537,34 +2696,15 @@ def _create_model(data: Box) -> ConcreteModel:
             for i in model.market
         )
 
-    @model.Constraint(model.market)
-    def bess_grid_import_rule(model, i):
-        return (
-            model.bess_grid_import_net_megawatt_hour[i]
-            == model.bess_grid_import_gross_megawatt_hour[i]
-            + model.bess_grid_import_matched_megawatt_hour[i]
-        )
-
-    @model.BuildAction(model.market)
-    def bess_grid_import_fixed_rule(model, i):
-        if not model.bess_fixed_condition:
-            return pyo.BuildAction.Skip
-
-        model.bess_grid_import_net_megawatt_hour[i].fix(
-            value=model.bess_grid_import_net_fixed_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-            if i in model.bess_grid_import_net_fixed_megawatt
-            else 0.0
-        )
-
-    @model.BuildAction()
-    def bess_grid_import_condition_rule(model):
-        if model.bess_grid_import_condition:
-            return pyo.BuildAction.Skip
-
-        model.bess_grid_import_net_megawatt_hour.fix(value=0.0)
+    @_constraint(presolve, model.Constraint(model.market))
+    def bess_grid_import_rule(model, i):
+        return (
+            model.bess_grid_import_net_megawatt_hour[i]
+            == model.bess_grid_import_gross_megawatt_hour[i]
+            + model.bess_grid_import_matched_megawatt_hour[i]
+        )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_rule(model, i):
         return (
             model.bess_res_import_megawatt_hour[i]
@@ -572,112 +2712,64 @@ def _create_model(data: Box) -> ConcreteModel:
             + model.bess_res_import_uncurtailed_megawatt_hour[i]
         )
 
-    @model.BuildAction(model.market)
-    def bess_res_import_fixed_rule(model, i):
-        if not model.bess_fixed_condition:
-            return pyo.BuildAction.Skip
-
-        model.bess_res_import_megawatt_hour[i].fix(
-            value=model.bess_res_import_fixed_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-            if i in model.bess_res_import_fixed_megawatt
-            else 0.0
-        )
-
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_curtailed_rule(model, i):
-        if model.res_export_megawatt_hour[i] <= (
-            model.res_grid_export_limits_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-        ):
-            return model.bess_res_import_curtailed_megawatt_hour[i] <= 0.0
-
         return model.bess_res_import_curtailed_megawatt_hour[i] <= (
-            model.res_export_megawatt_hour[i]
-            - model.res_grid_export_limits_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
+            model.bess_res_import_curtailed_limits_megawatt_hour[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_uncurtailed_rule(model, i):
-        if model.res_export_megawatt_hour[i] > (
-            model.res_grid_export_limits_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-        ):
-            return model.bess_res_import_uncurtailed_megawatt_hour[i] <= (
-                model.res_grid_export_limits_megawatt[i]
-                * (model.market_time_unit_minute * (1.0 / 60.0))
-            )
-
-        # fmt: off
         return model.bess_res_import_uncurtailed_megawatt_hour[i] <= (
-            model.res_export_megawatt_hour[i]
+            model.bess_res_import_uncurtailed_limits_megawatt_hour[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_curtailed_indicator_rule(model, i):
         return (
             model.bess_res_import_curtailed_megawatt_hour[i]
-            <= model.res_export_megawatt_hour[i]
+            <= model.bess_res_import_curtailed_big_m_megawatt_hour[i]
             * model.bess_res_import_curtailed_uncurtailed_indicator[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_uncurtailed_indicator_rule(model, i):
         return (
             model.bess_res_import_uncurtailed_megawatt_hour[i]
-            <= model.res_export_megawatt_hour[i]
+            <= model.bess_res_import_uncurtailed_big_m_megawatt_hour[i]
             * model.bess_res_import_curtailed_uncurtailed_indicator[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_clipping_rule(model, i):
         if not model.bess_res_import_clipping_condition:
             return pyo.Constraint.Skip
 
-        if model.res_export_megawatt_hour[i] <= (
-            model.bess_res_import_clipping_threshold_megawatt
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-        ):
-            return model.bess_res_import_megawatt_hour[i] <= 0.0
-
         return model.bess_res_import_megawatt_hour[i] <= (
-            (model.bess_res_import_clipping_percent / 100.0)
-            * (
-                model.res_export_megawatt_hour[i]
-                - model.bess_res_import_clipping_threshold_megawatt
-                * (model.market_time_unit_minute * (1.0 / 60.0))
-            )
+            model.bess_res_import_clipping_limits_megawatt_hour[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_priority_res_grid_export_indicator_rule(model, i):
         if not model.bess_res_import_priority_condition:
             return pyo.Constraint.Skip
 
         return model.res_grid_export_net_megawatt_hour[i] <= (
-            model.res_export_megawatt_hour[i]
+            model.bess_res_import_priority_res_grid_export_big_m_megawatt_hour[i]
             * model.bess_res_import_priority_indicator[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_res_import_priority_bess_grid_import_indicator_rule(model, i):
         if not model.bess_res_import_priority_condition:
             return pyo.Constraint.Skip
 
         return model.bess_grid_import_net_megawatt_hour[i] <= (
-            model.bess_energy_capacity_megawatt_hour
+            model.bess_res_import_priority_bess_grid_import_big_m_megawatt_hour[i]
             * (1 - model.bess_res_import_priority_indicator[i])
         )
 
-    @model.BuildAction()
-    def bess_res_import_condition_rule(model):
-        if model.bess_res_import_condition:
-            return pyo.BuildAction.Skip
-
-        model.bess_res_import_megawatt_hour.fix(value=0.0)
-
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_grid_export_rule(model, i):
         return (
             model.bess_grid_export_net_megawatt_hour[i]
@@ -685,32 +2777,13 @@ def _create_model(data: Box) -> ConcreteModel:
             + model.bess_grid_export_matched_megawatt_hour[i]
         )
 
-    @model.BuildAction(model.market)
-    def bess_grid_export_fixed_rule(model, i):
-        if not model.bess_fixed_condition:
-            return pyo.BuildAction.Skip
-
-        model.bess_grid_export_net_megawatt_hour[i].fix(
-            value=model.bess_grid_export_net_fixed_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-            if i in model.bess_grid_export_net_fixed_megawatt
-            else 0.0
-        )
-
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_grid_export_limit_rule(model, i):
         return model.bess_grid_export_net_megawatt_hour[i] <= (
             model.bess_grid_export_limits_megawatt[i]
             * (model.market_time_unit_minute * (1.0 / 60.0))
         )
 
-    @model.BuildAction()
-    def bess_grid_export_condition_rule(model):
-        if model.bess_grid_export_condition:
-            return pyo.BuildAction.Skip
-
-        model.bess_grid_export_net_megawatt_hour.fix(value=0.0)
-
     @model.Constraint(model.market)
     def bess_charging_power_capacity_rule(model, i):
         return model.bess_charge_megawatt_hour[i] <= (
@@ -748,26 +2821,39 @@ def _create_model(data: Box) -> ConcreteModel:
     @model.Constraint(model.market)
     def bess_discharging_efficiency_rule(model, i):
         return model.bess_discharge_megawatt_hour[i] == (
-            (1.0 / (model.bess_discharging_efficiency_percent / 100.0))
+            model.bess_discharging_efficiency_reciprocal
             * model.bess_grid_export_net_megawatt_hour[i]
-            if model.bess_discharging_efficiency_percent != 0.0
-            else 0.0
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_charge_indicator_rule(model, i):
         return model.bess_charge_megawatt_hour[i] <= (
-            model.bess_energy_capacity_megawatt_hour
+            model.bess_charge_big_m_megawatt_hour[i]
             * model.bess_charge_discharge_indicator[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def bess_discharge_indicator_rule(model, i):
         return model.bess_discharge_megawatt_hour[i] <= (
-            model.bess_energy_capacity_megawatt_hour
+            model.bess_discharge_big_m_megawatt_hour[i]
             * (1 - model.bess_charge_discharge_indicator[i])
         )
 
+    # Special ordered sets of type 1 replace the indicator rules of derived indicators, see _presolve.
+    if presolve.substitutions.get("bess_charge_discharge_indicator") == "derived":
+        model.bess_charge_discharge_sos = pyo.SOSConstraint(
+            model.market,
+            rule=lambda model, i: [model.bess_charge_megawatt_hour[i], model.bess_discharge_megawatt_hour[i]],
+            sos=1,
+        )
+
+    if presolve.substitutions.get("bess_res_import_priority_indicator") == "derived":
+        model.bess_res_import_priority_sos = pyo.SOSConstraint(
+            model.market,
+            rule=lambda model, i: [model.res_grid_export_net_megawatt_hour[i], model.bess_grid_import_net_megawatt_hour[i]],
+            sos=1,
+        )
+
     @model.Constraint()
     def bess_maximum_cycles_rule(model):
         return model.bess_cycles_count <= model.bess_maximum_cycles_count
@@ -816,16 +2902,6 @@ def _create_model(data: Box) -> ConcreteModel:
             - model.bess_discharge_megawatt_hour[i]
         )
 
-    @model.BuildAction(model.market)
-    def bess_state_of_charge_fixed_rule(model, i):
-        if i not in model.bess_state_of_charge_fixed_percent:
-            return pyo.BuildAction.Skip
-
-        model.bess_state_of_charge_megawatt_hour[i].fix(
-            value=(model.bess_state_of_charge_fixed_percent[i] / 100.0)
-            * model.bess_energy_capacity_megawatt_hour
-        )
-
     @model.Constraint(model.market)
     def bess_previous_state_of_charge_rule(model, i):
         if i == model.market.first():
@@ -841,9 +2917,7 @@ def _create_model(data: Box) -> ConcreteModel:
         return model.bess_cycles_count == (
             sum(
                 model.bess_discharge_megawatt_hour[i]
-                * (1.0 / model.bess_energy_capacity_megawatt_hour)
-                if model.bess_energy_capacity_megawatt_hour != 0.0
-                else 0.0
+                * model.bess_energy_capacity_reciprocal_per_megawatt_hour
                 for i in model.market
             )
         )
@@ -866,24 +2940,13 @@ def _create_model(data: Box) -> ConcreteModel:
 
     @model.Constraint(model.market)
     def res_export_rule(model, i):
-        if model.res_export_megawatt_hour[i] > (
-            model.res_grid_export_limits_megawatt[i]
-            * (model.market_time_unit_minute * (1.0 / 60.0))
-        ):
-            return (
-                model.res_grid_export_net_megawatt_hour[i]
-                == model.res_grid_export_limits_megawatt[i]
-                * (model.market_time_unit_minute * (1.0 / 60.0))
-                - model.bess_res_import_uncurtailed_megawatt_hour[i]
-            )
-
         return (
             model.res_grid_export_net_megawatt_hour[i]
-            == model.res_export_megawatt_hour[i]
+            == model.res_grid_export_available_megawatt_hour[i]
             - model.bess_res_import_uncurtailed_megawatt_hour[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def res_grid_export_rule(model, i):
         return (
             model.res_grid_export_net_megawatt_hour[i]
@@ -891,20 +2954,13 @@ def _create_model(data: Box) -> ConcreteModel:
             + model.res_grid_export_matched_megawatt_hour[i]
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def res_grid_export_limit_rule(model, i):
         return model.res_grid_export_net_megawatt_hour[i] <= (
             model.res_grid_export_limits_megawatt[i]
             * (model.market_time_unit_minute * (1.0 / 60.0))
         )
 
-    @model.BuildAction()
-    def res_grid_export_condition_rule(model):
-        if model.res_grid_export_condition:
-            return pyo.BuildAction.Skip
-
-        model.res_grid_export_net_megawatt_hour.fix(value=0.0)
-
     @model.Constraint()
     def res_profit_rule(model):
         return model.res_profit_euro == (
@@ -915,7 +2971,7 @@ def _create_model(data: Box) -> ConcreteModel:
             )
         )
 
-    @model.Constraint(model.market)
+    @_constraint(presolve, model.Constraint(model.market))
     def grid_export_limit_rule(model, i):
         return (
             model.res_grid_export_net_megawatt_hour[i]
@@ -925,20 +2981,545 @@ def _create_model(data: Box) -> ConcreteModel:
             * (model.market_time_unit_minute * (1.0 / 60.0))
         )
 
-    return model
+    _fix_model(model, parameters)
+
+
+def _update_model(model: Model, parameters: Box) -> None:
+    """
+    Updates every mutable parameter and fixed variable of a model template with new values.
+
+    Parameters are updated in declaration order, so that validations that depend on other
+    parameters (state of charge bounds) are checked against the new values.
+    """
+    model.market_label = parameters.market
+
+    for component in model.component_objects(ctype=pyo.Param):
+        # Fixed schedules substituted by the presolve are not parameters of the data, see _fix_model.
+        if not component.mutable or component.local_name not in parameters or parameters[component.local_name] is None:
+            continue
+
+        if component.is_indexed():
+            component.store_values(_indexed(parameters, component.local_name))
+        else:
+            component.set_value(parameters[component.local_name])
+
+    _fix_model(model, parameters)
+
+
+def _fix_model(model: BlockData, parameters: Box) -> None:
+    """
+    Updates the fixed schedules substituted by the presolve and fixes the fixed states of charge, releasing any previous fix.
+    """
+    # Periods without a fixed value are fixed to 0 as soon as any schedule is fixed.
+    for name, fixed_name in _FIXED_SCHEDULES.items():
+        component = model.component(name)
+        if component.ctype is pyo.Param and component.mutable:
+            component.store_values(_indexed(parameters, fixed_name))
+
+    model.bess_state_of_charge_megawatt_hour.unfix()
+    for i in np.flatnonzero(~np.isnan(parameters.bess_state_of_charge_fixed_megawatt_hour)).tolist():
+        model.bess_state_of_charge_megawatt_hour[i].fix(value=parameters.bess_state_of_charge_fixed_megawatt_hour[i])
 
 
-def _apply_optimizer(model: Model, data: Box) -> bool:
+def _apply_optimizer(model: Model, data: Box, parameters: Box) -> Box:
     """
-    Solves the model using the specified solver. Returns whether optimal termination is achieved.
+    Solves the model using the specified solver. Returns whether optimal termination is achieved and the gap (see _termination).
+
+    Persistent solvers (appsi_*) are kept alive for the whole process, so that repeated runs
+    for the same module (for example every MIC session) do not start over. Every run is warm
+    started from a greedy heuristic schedule, or from the last incumbent found for that module
+    if the heuristic is disabled or fails.
     """
+    key = _session_key(data)
+    heuristic = _heuristic_schedule(parameters) if data.model_heuristic else None
+    # The heuristic schedule is feasible for the current data, unlike the last incumbent.
+    incumbent = _last_incumbent(key) if heuristic is None else _heuristic_incumbent(heuristic, model)
+    _warm_start(model, incumbent)
+
+    options = _solver_options(data)
+
+    if data.solver.startswith("appsi_"):
+        opt = _persistent_solver(data)
+        results, stage_seconds = _lexisolve(opt, model, scaling=data.model_scaling, options=options)
+        status = _termination(results) | Box(stage_seconds=stage_seconds)
+        if status.optimal:
+            _store_incumbent(key, _incumbent(model))
+        return status
+
     with pyo.SolverFactory(data.solver) as opt:
-        results = _lexisolve(opt, model)
-        optimal = pyo.check_optimal_termination(results)
-        return optimal
+        # Shell solvers like cbc read the initial values as a MIP start, glpk ignores them.
+        results, stage_seconds = _lexisolve(opt, model, scaling=data.model_scaling, options=options, warmstart=True) if opt.warm_start_capable() else _lexisolve(opt, model, scaling=data.model_scaling, options=options)  # fmt: off
+        status = _termination(results) | Box(stage_seconds=stage_seconds)
+        if status.optimal:
+            _store_incumbent(key, _incumbent(model))
+        return status
+
+
+def _solver_options(data: Box) -> dict[str, float]:
+    """
+    Translates the solve deadline and relative gap settings into the options of each solver.
+
+    When a limit is reached, solvers still report their best incumbent, so a near optimal
+    schedule can be bid on time instead of nothing. Unknown solvers get no options. Persistent
+    solvers (appsi_*) keep the options of their previous run, so unset limits are reset to their defaults.
+    """
+    names = {
+        "glpk": ("tmlim", "mipgap"),
+        "cbc": ("sec", "ratio"),
+        "highs": ("time_limit", "mip_rel_gap"),
+        "gurobi": ("TimeLimit", "MIPGap"),
+        "cplex": ("timelimit", "mip_tolerances_mipgap"),
+    }
+    solver = data.solver.removeprefix("appsi_").removesuffix("_direct")
+    time_limit_name, gap_name = names.get(solver, (None, None))
+
+    options = {}
+    if data.solver.startswith("appsi_") and solver in _SOLVER_DEFAULTS:
+        options[time_limit_name], options[gap_name] = _SOLVER_DEFAULTS[solver]
+    if time_limit_name is not None and data.solver_time_limit_second is not None:
+        # glpk only takes whole seconds.
+        options[time_limit_name] = int(np.ceil(data.solver_time_limit_second)) if time_limit_name == "tmlim" else data.solver_time_limit_second  # fmt: off
+    if gap_name is not None and data.solver_gap_percent is not None:
+        options[gap_name] = data.solver_gap_percent / 100.0
+    return options
+
+
+# Default time limit and relative gap of the solvers that keep their options between persistent runs.
+_SOLVER_DEFAULTS = {
+    "highs": (float("inf"), 1e-4),
+    "gurobi": (float("inf"), 1e-4),
+    "cplex": (1e75, 1e-4),
+}
+
+
+def _termination(results: SolverResults) -> Box:
+    """
+    Summarizes a solve as whether it is optimal, the relative gap between the loaded incumbent and the best bound,
+    the number of branch and bound nodes and simplex iterations, the termination condition and the time reported
+    by the solver itself.
+
+    If a limit stops the solver, the best incumbent found is still loaded into the model. The gap is
+    NaN if the solver does not report both bounds, which usually means that there is no incumbent.
+    The nodes, iterations and solver seconds are None if the solver does not report them.
+    """
+    optimal = pyo.check_optimal_termination(results)
+    lower_bound = results.problem.lower_bound
+    upper_bound = results.problem.upper_bound
+    if lower_bound is not None and upper_bound is not None and np.isfinite(lower_bound) and np.isfinite(upper_bound):
+        gap = abs(upper_bound - lower_bound) / max(abs(lower_bound), abs(upper_bound), 1e-10)
+    else:
+        gap = 0.0 if optimal else np.nan
+
+    nodes = results.solver.statistics.branch_and_bound.number_of_created_subproblems
+    nodes = nodes if isinstance(nodes, int) else None
+    iterations = results.solver.statistics.black_box.number_of_iterations
+    iterations = iterations if isinstance(iterations, int) else None
+
+    status = Box(
+        optimal=optimal,
+        gap=float(gap),
+        nodes=nodes,
+        iterations=iterations,
+        termination=str(results.solver.termination_condition),
+        solver_seconds=_solver_seconds(results),
+    )
+    return status
+
+
+def _solver_seconds(results: SolverResults) -> float | None:
+    """
+    Returns the solve time reported by the solver itself, which excludes writing the problem and reading the solution.
+    """
+    # Each solver reports a different one, if any.
+    for name in ("wallclock_time", "user_time", "system_time"):
+        seconds = getattr(results.solver, name, None)
+        if isinstance(seconds, (int, float)) and seconds >= 0.0:
+            return float(seconds)
+    return None
+
+
+def _apply_relaxed_optimizer(model: Model, data: Box) -> Box:
+    """
+    Solves the LP relaxation of the model. Returns whether it is optimal for the MIP too and the gap.
+
+    With non negative prices and efficiencies below 100%, simultaneous charge and discharge (or
+    grid import and renewable export) is never optimal, so the relaxed indicators are usually not
+    binding. If no flow pair gated by an indicator is active at the same time, the indicators are
+    rounded to the integral values implied by the flows, which is feasible for the MIP and as good
+    as the relaxation, hence optimal. Otherwise, the caller falls back to the MIP. Special ordered sets
+    are relaxed too, since the rounding checks the same pairs of flows.
+    """
+    indicators = tuple(
+        component
+        for component in model.component_objects(ctype=pyo.Var)
+        if all(var.is_binary() for var in component.values())
+    )
+    sets = tuple(model.component_data_objects(ctype=pyo.SOSConstraint, active=True))
+
+    for component in indicators:
+        component.domain = pyo.UnitInterval
+    for sos in sets:
+        sos.deactivate()
+
+    options = _solver_options(data)
+
+    try:
+        if data.solver.startswith("appsi_"):
+            opt = _persistent_solver(data)
+            results, stage_seconds = _lexisolve(opt, model, scaling=data.model_scaling, options=options)
+        else:
+            with pyo.SolverFactory(data.solver) as opt:
+                results, stage_seconds = _lexisolve(opt, model, scaling=data.model_scaling, options=options)
+    finally:
+        for component in indicators:
+            component.domain = pyo.Binary
+        for sos in sets:
+            sos.activate()
+
+    if not pyo.check_optimal_termination(results):
+        status = _termination(results) | Box(optimal=False, gap=np.nan, nodes=None, stage_seconds=stage_seconds)
+        return status
+
+    values = {
+        name: np.fromiter(
+            (pyo.value(component_data) for component_data in model.component(name).values()),
+            dtype=float,
+            count=len(model.market),
+        )
+        for name in _VARIABLES
+        if model.component(name).is_indexed()
+    }
+    rounded = _round_indicators(values, pyo.value(model.bess_res_import_priority_condition))
+    if rounded is None:
+        status = _termination(results) | Box(optimal=False, gap=np.nan, nodes=None, stage_seconds=stage_seconds)
+        return status
+
+    for name, value in rounded.items():
+        if model.component(name).ctype is pyo.Var:
+            model.component(name).set_values(dict(zip(model.market, value.tolist())))
+    _store_incumbent(_session_key(data), _incumbent(model))
+    status = _termination(results) | Box(optimal=True, gap=0.0, nodes=0, stage_seconds=stage_seconds)
+    return status
+
+
+def _round_indicators(values: dict[str, np.ndarray], bess_res_import_priority_condition: bool) -> dict[str, np.ndarray] | None:
+    """
+    Rounds the indicators of a relaxed solution to the integral values implied by the flows they gate.
+    Returns None if any pair of mutually exclusive flows is active at the same time.
+    """
+    tolerance = 1e-6
+
+    bess_charge_discharge = np.minimum(values["bess_charge_megawatt_hour"], values["bess_discharge_megawatt_hour"])  # fmt: off
+    if (bess_charge_discharge > tolerance).any():
+        return None
+
+    res_grid_export_bess_grid_import = np.minimum(values["res_grid_export_net_megawatt_hour"], values["bess_grid_import_net_megawatt_hour"])  # fmt: off
+    if bess_res_import_priority_condition and (res_grid_export_bess_grid_import > tolerance).any():
+        return None
+
+    rounded = {
+        "bess_res_import_curtailed_uncurtailed_indicator": (
+            (values["bess_res_import_curtailed_megawatt_hour"] > tolerance)
+            | (values["bess_res_import_uncurtailed_megawatt_hour"] > tolerance)
+        ).astype(float),
+        "bess_res_import_priority_indicator": (values["res_grid_export_net_megawatt_hour"] > tolerance).astype(float),
+        "bess_charge_discharge_indicator": (values["bess_charge_megawatt_hour"] > tolerance).astype(float),
+    }
+    return rounded
+
+
+# Shadow prices of the solved schedule, as the suffix (dual or reduced cost) of a constraint or variable.
+_SHADOW_PRICES = {
+    "bess_state_of_charge_shadow_price_euro_per_megawatt_hour": ("dual", "bess_state_of_charge_rule"),
+    "bess_charging_power_shadow_price_euro_per_megawatt_hour": ("dual", "bess_charging_power_capacity_rule"),
+    "bess_discharging_power_shadow_price_euro_per_megawatt_hour": ("dual", "bess_discharging_power_capacity_rule"),
+    "bess_state_of_charge_reduced_cost_euro_per_megawatt_hour": ("rc", "bess_state_of_charge_megawatt_hour"),
+}
+
+
+def _apply_shadow_prices(model: Model, data: Box) -> dict[str, Series[float]]:
+    """
+    Solves the LP of the solved model with its indicators fixed and returns the duals and reduced costs in _SHADOW_PRICES.
+
+    Special ordered sets are replaced by fixing their flows at zero, like the indicators that
+    would gate them. Prices are undiscounted, in euros per megawatt hour of the constrained energy,
+    and are the change of the objective per unit of constraint bound (Pyomo convention). That is,
+    the shadow price of the state of charge balance is the value of storing one more megawatt hour.
+    Returns an empty dictionary if the LP is not optimal.
+    """
+    indicators = tuple(
+        component
+        for component in model.component_objects(ctype=pyo.Var)
+        if all(var.is_binary() for var in component.values())
+    )
+    sets = tuple(model.component_data_objects(ctype=pyo.SOSConstraint, active=True))
+    fixed = [(var, round(pyo.value(var))) for component in indicators for var in component.values() if not var.fixed]
+    fixed += [(var, 0.0) for sos in sets for var in sos.get_variables() if not var.fixed and np.isclose(pyo.value(var), 0.0)]
+
+    # Fixed binaries are still integral for some solvers, which then do not report duals.
+    for component in indicators:
+        component.domain = pyo.UnitInterval
+    for var, value in fixed:
+        var.fix(value)
+    for sos in sets:
+        sos.deactivate()
+    model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+    model.rc = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+
+    options = _solver_options(data)
+
+    try:
+        if data.solver.startswith("appsi_"):
+            opt = _persistent_solver(data)
+            results, _ = _lexisolve(opt, model, scaling=data.model_scaling, options=options)
+        else:
+            with pyo.SolverFactory(data.solver) as opt:
+                results, _ = _lexisolve(opt, model, scaling=data.model_scaling, options=options)
+
+        if not pyo.check_optimal_termination(results):
+            return {}
+
+        suffixes = {
+            name: np.fromiter(
+                (model.component(suffix).get(component_data, np.nan) for component_data in model.component(component).values()),
+                dtype=float,
+                count=len(model.market),
+            )
+            for name, (suffix, component) in _SHADOW_PRICES.items()
+        }
+    finally:
+        for var, _ in fixed:
+            var.unfix()
+        for component in indicators:
+            component.domain = pyo.Binary
+        for sos in sets:
+            sos.activate()
+        model.del_component(model.dual)
+        model.del_component(model.rc)
+
+    names = list(suffixes)
+    discount_factor = np.fromiter((pyo.value(value) for value in model.market_discount_factor.values()), dtype=float, count=len(model.market))
+    shadow_prices = _aligned_values(names, np.stack([suffixes[name] for name in names]) / discount_factor, model.market_label, data.market_input.index)  # fmt: off
+    return shadow_prices
+
+
+# Long lived persistent solver instances by name (instances), for every thread. They are never closed,
+# because the whole point is to keep the problem loaded in process between runs.
+_solvers = threading.local()
+
+# Pyomo solver interfaces redirect the process output and keep a process wide stack of temporary
+# files while solving, so concurrent solves would deadlock or remove each other files.
+_solver_lock = threading.Lock()
+
+# Every session the process ever optimized would keep its incumbent otherwise, like a long lived control panel.
+_INCUMBENTS_MAXSIZE = 32
+
+# Last optimal variable values by session, used to warm start the next run, least recently used first.
+_incumbents: OrderedDict[tuple[str | None, ...], dict[str, dict[str, float]]] = OrderedDict()
+
+_incumbents_lock = threading.Lock()
+
+
+def _last_incumbent(key: tuple[str | None, ...]) -> dict[str, dict[str, float]]:
+    """
+    Returns the last optimal variable values of the session, or no values if there are none.
+    """
+    with _incumbents_lock:
+        incumbent = _incumbents.get(key, {})
+        if key in _incumbents:
+            _incumbents.move_to_end(key)
+    return incumbent
+
+
+def _store_incumbent(key: tuple[str | None, ...], incumbent: dict[str, dict[str, float]]) -> None:
+    """
+    Stores the last optimal variable values of the session, evicting the least recently used ones.
+    """
+    with _incumbents_lock:
+        _incumbents[key] = incumbent
+        _incumbents.move_to_end(key)
+        while len(_incumbents) > _INCUMBENTS_MAXSIZE:
+            _incumbents.popitem(last=False)
+
+
+def _session_key(data: Box) -> tuple[str | None, ...]:
+    """
+    Identifies the module being optimized, so that runs for different modules do not share state.
+    """
+    key = (
+        data.solver,
+        data.dim_ufi_bess_grid_import,
+        data.dim_ufi_bess_res_import,
+        data.dim_ufi_bess_grid_export,
+        data.dim_ufi_res_grid_export,
+        data.dim_up_grid_export,
+    )
+    return key
+
+
+def _persistent_solver(data: Box) -> OptSolver:
+    """
+    Returns the long lived persistent solver instance, creating it on first use.
+
+    Persistent solvers only push the coefficients that changed when the same model is solved
+    again and keep their last basis, so only the first solve pays the full load. A solver instance
+    holds a single problem, so every thread gets its own, which is released with the thread.
+    """
+    if not hasattr(_solvers, "instances"):
+        _solvers.instances = {}
+    if data.solver not in _solvers.instances:
+        _solvers.instances[data.solver] = pyo.SolverFactory(data.solver)
+    opt = _solvers.instances[data.solver]
+    return opt
+
+
+def _incumbent(model: Model) -> dict[str, dict[str, float]]:
+    """
+    Extracts the values of every indexed variable by market period label.
+    """
+    incumbent = {
+        component.local_name: dict(zip(model.market_label, component.extract_values().values()))
+        for component in model.component_objects(ctype=pyo.Var)
+        if component.is_indexed()
+    }
+    return incumbent
+
+
+def _warm_start(model: Model, incumbent: dict[str, dict[str, float]]) -> None:
+    """
+    Initializes the free variables with the values of a previous incumbent or a heuristic schedule.
+
+    Periods are matched by label, so a MIC session reuses the schedule of the previous
+    session for every delivery period still in the horizon.
+    """
+    positions = dict(zip(model.market_label, model.market))
+    for name, values in incumbent.items():
+        component = model.find_component(name)
+        if component is None or component.ctype is not pyo.Var:
+            continue
+
+        for label, value in values.items():
+            index = positions.get(label) if label is not None else None
+            if index not in component or component[index].fixed or value is None:
+                continue
+
+            component[index].set_value(value, skip_validation=True)
+
+
+def _heuristic_schedule(parameters: Box) -> dict[str, float | np.ndarray] | None:
+    """
+    Builds a feasible schedule greedily, so that the MIP solver starts with an incumbent.
+
+    Inside each day, the cheapest periods are paired with the most expensive ones while the spread pays
+    for the losses, the profit threshold and the rate, much like the semicycles of _quote_bess_price.
+    The pairs are then simulated chronologically at full power, clipped by the state of charge bounds,
+    the power and export limits and the remaining cycles. Fixed schedules are taken as they are, and
+    renewables are exported rather than stored. Returns None if the result misses a fixed or final
+    state of charge, because then it is not feasible.
+    """
+    # fmt: off
+    n = len(parameters.market)
+    hours = parameters.market_time_unit_minute * (1.0 / 60.0)
+    health = parameters.bess_state_of_health_percent / 100.0 * parameters.bess_availability_percent / 100.0
+    capacity = parameters.bess_energy_capacity_megawatt_hour
+    charging_efficiency = parameters.bess_charging_efficiency_percent / 100.0
+    discharging_efficiency = parameters.bess_discharging_efficiency_percent / 100.0
+    lower = parameters.bess_minimum_state_of_charge_percent / 100.0 * capacity
+    upper = min(parameters.bess_maximum_state_of_charge_percent / 100.0, health) * capacity
+    initial = parameters.bess_initial_state_of_charge_percent / 100.0 * capacity
+    tolerance = 1e-6
+
+    res_grid_export_net_megawatt_hour = (
+        np.nan_to_num(parameters.res_grid_export_available_megawatt_hour)
+        if parameters.res_grid_export_condition
+        else np.zeros(n)
+    )
+
+    bess_grid_import_net_megawatt_hour = np.zeros(n)
+    bess_res_import_megawatt_hour = np.zeros(n)
+    bess_grid_export_net_megawatt_hour = np.zeros(n)
+    if parameters.bess_fixed_condition:
+        bess_grid_import_net_megawatt_hour = parameters.bess_grid_import_net_fixed_megawatt_hour * parameters.bess_grid_import_condition
+        bess_res_import_megawatt_hour = parameters.bess_res_import_fixed_megawatt_hour * parameters.bess_res_import_condition
+        bess_grid_export_net_megawatt_hour = parameters.bess_grid_export_net_fixed_megawatt_hour * parameters.bess_grid_export_condition
+    elif charging_efficiency > 0.0 and discharging_efficiency > 0.0:
+        # Grid imports are not allowed while renewables export with priority.
+        chargeable = parameters.bess_grid_import_condition & ~(parameters.bess_res_import_priority_condition & (res_grid_export_net_megawatt_hour > 0.0))
+        charge_limit = health * parameters.bess_charging_power_capacity_megawatt * hours
+        discharge_limits = (
+            np.minimum(
+                health * parameters.bess_discharging_power_capacity_megawatt * hours,
+                np.maximum(
+                    np.minimum(parameters.bess_grid_export_limits_megawatt * hours, parameters.grid_export_limits_megawatt * hours - res_grid_export_net_megawatt_hour),
+                    0.0,
+                ) / discharging_efficiency,
+            )
+            if parameters.bess_grid_export_condition
+            else np.zeros(n)
+        )
+
+        # Pairs of cheapest and most expensive periods of each day, enough to fill the battery once.
+        price = parameters.bess_grid_import_net_price_euro_per_megawatt_hour
+        action = np.zeros(n)
+        periods_per_day = round(24 * 60 / parameters.market_time_unit_minute)
+        pairs = int(np.ceil((upper - lower) / charge_limit)) if charge_limit > 0.0 else 0
+        for day in range(0, n, periods_per_day):
+            periods = np.arange(day, min(day + periods_per_day, n))
+            cheap = periods[np.argsort(price[periods], kind="stable")][:min(pairs, len(periods) // 2)]
+            expensive = periods[np.argsort(-price[periods], kind="stable")][:len(cheap)]
+            profitable = (
+                (price[expensive] - parameters.bess_profit_threshold_euro_per_megawatt_hour) * charging_efficiency * discharging_efficiency
+                > price[cheap] + parameters.market_rate
+            )
+            action[cheap[profitable]] = 1.0
+            action[expensive[profitable]] = -1.0
+
+        state_of_charge = initial
+        cycles = parameters.bess_maximum_cycles_count * capacity
+        for i in range(n):
+            if action[i] > 0.0 and chargeable[i]:
+                charge = max(min(charge_limit, upper - state_of_charge), 0.0)
+                bess_grid_import_net_megawatt_hour[i] = charge / charging_efficiency
+                state_of_charge += charge
+            elif action[i] < 0.0:
+                discharge = max(min(discharge_limits[i], state_of_charge - lower, cycles), 0.0)
+                bess_grid_export_net_megawatt_hour[i] = discharge * discharging_efficiency
+                state_of_charge -= discharge
+                cycles -= discharge
+
+    values = _schedule_values(parameters, bess_grid_import_net_megawatt_hour, bess_res_import_megawatt_hour, bess_grid_export_net_megawatt_hour)
+
+    bess_state_of_charge_megawatt_hour = values["bess_state_of_charge_megawatt_hour"]
+    bess_state_of_charge_fixed_megawatt_hour = parameters.bess_state_of_charge_fixed_megawatt_hour
+    fixed = ~np.isnan(bess_state_of_charge_fixed_megawatt_hour)
+    feasible = (
+        (bess_state_of_charge_megawatt_hour >= lower - tolerance).all()
+        and (bess_state_of_charge_megawatt_hour <= upper + tolerance).all()
+        and np.allclose(bess_state_of_charge_megawatt_hour[fixed], bess_state_of_charge_fixed_megawatt_hour[fixed])
+        and (
+            not parameters.bess_final_state_of_charge_condition
+            or np.isclose(bess_state_of_charge_megawatt_hour[-1], parameters.bess_final_state_of_charge_percent / 100.0 * capacity)
+        )
+        and values["bess_cycles_count"] <= parameters.bess_maximum_cycles_count + tolerance
+    )
+    if not feasible:
+        return None
+
+    return values
+
 
+def _heuristic_incumbent(values: dict[str, float | np.ndarray], model: Model) -> dict[str, dict[str, float]]:
+    """
+    Converts a schedule into an incumbent keyed by market period label (None for scalar variables).
+    """
+    incumbent = {
+        name: dict(zip(model.market_label, value.tolist())) if np.ndim(value) != 0 else {None: value}
+        for name, value in values.items()
+    }
+    return incumbent
 
-def _lexisolve(opt: OptSolver, model: BlockData) -> SolverResults:
+
+def _lexisolve(opt: OptSolver, model: BlockData, scaling: bool = False, **kwargs) -> tuple[SolverResults, list[float]]:
     """
     Sequentially solves multiple objectives in lexicographic order (lexicographic optimization).
 
@@ -951,22 +3532,45 @@ def _lexisolve(opt: OptSolver, model: BlockData) -> SolverResults:
     3. Reactivates all objectives and removes temporary constraints.
 
     This ensures that the first objective is optimized, then the second is optimized without degrading the first, and so on.
-    Returns the final solver results.
+    Solver calls are serialized between threads (see _solver_lock).
+    The same solver instance is used for every stage. Persistent solvers (appsi_*) only receive the new objective and
+    bound constraint, and keep the previous stage loaded, while other solvers are warm started from the previous stage
+    solution, which is feasible for the next stage by construction. Extra keyword arguments are passed to every solve.
+    If scaling, every stage is solved on a scaled copy of the model instead (see _scaled_copy), whose solution is
+    mapped back at the end. Returns the final solver results, with the simplex iterations of every stage added up,
+    and the seconds spent in each stage.
     """
+    if scaling:
+        scaled = _scaled_copy(model)
+        results, seconds = _lexisolve(opt, scaled, **kwargs)
+        _unscale_solution(scaled, model)
+        return results, seconds
+
     objectives = tuple(model.component_objects(ctype=pyo.Objective, active=True))
     if not objectives:
         results = SolverResults()
-        return results
+        return results, []
 
     constraints = []
+    seconds = []
+    iterations = []
+    warm_start_capable = not isinstance(opt, LegacySolverInterface) and opt.warm_start_capable()
 
     for objective in objectives:
         objective.deactivate()
 
-    for objective in objectives:
+    for stage, objective in enumerate(objectives):
         objective.activate()
 
-        results = opt.solve(model)
+        start = time.perf_counter()
+        with _solver_lock:
+            if isinstance(opt, LegacySolverInterface):
+                results = opt.solve(model, load_solutions=False, **kwargs)
+                _load_incumbent(opt, model, results)
+            else:
+                results = opt.solve(model, **(kwargs | {"warmstart": True} if stage > 0 and warm_start_capable else kwargs))
+            iterations.append(_solver_iterations(opt, results))
+        seconds.append(time.perf_counter() - start)
         if not pyo.check_optimal_termination(results):
             break
 
@@ -990,17 +3594,560 @@ def _lexisolve(opt: OptSolver, model: BlockData) -> SolverResults:
         block = constraint.parent_block()
         block.del_component(constraint)
 
-    return results
+    results.solver.statistics.black_box.number_of_iterations = sum(iterations) if None not in iterations else None
+    return results, seconds
+
+
+def _load_incumbent(opt: LegacySolverInterface, model: BlockData, results: SolverResults) -> None:
+    """
+    Loads the best incumbent of a persistent solver (appsi_*) into the model, if it found one.
+
+    Persistent solvers raise instead of returning when a limit stops them without an incumbent, so they
+    solve without loading anything and the incumbent is loaded here. Duals and reduced costs are only
+    loaded if optimal and imported by the model. Without an incumbent, the variables keep their values.
+    """
+    # The results only carry a solution if the solver found a feasible one.
+    if len(results.solution) == 0:
+        return
+
+    opt.load_vars()
+    if not pyo.check_optimal_termination(results):
+        return
+
+    dual = model.component("dual")
+    if isinstance(dual, pyo.Suffix) and dual.import_enabled():
+        dual.update(opt.get_duals())
+    rc = model.component("rc")
+    if isinstance(rc, pyo.Suffix) and rc.import_enabled():
+        rc.update(opt.get_reduced_costs())
 
 
-def _process_results(model: Model, data: Box) -> dict[str, float | Series[float]]:
+def _solver_iterations(opt: OptSolver, results: SolverResults) -> int | None:
+    """
+    Returns the simplex iterations of the last solve, or None if the solver does not report them.
+    """
+    iterations = results.solver.statistics.black_box.number_of_iterations
+    if isinstance(iterations, int):
+        return iterations
+    # HiGHS only reports them through its own model, which the persistent interface keeps loaded.
+    highs = getattr(opt, "_solver_model", None)
+    if highs is not None and hasattr(highs, "getInfo"):
+        return int(highs.getInfo().simplex_iteration_count)
+    return None
+
+
+# Passes of geometric mean scaling, which barely improves after a few of them.
+_SCALING_PASSES = 4
+
+# Smallest coefficient taken into account, the default zero tolerance of HiGHS.
+_SCALING_TOLERANCE = 1e-9
+
+
+def _scaling_factors(A: sparse.sparray, scalable: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the row and column scaling factors that bring the nonzeros of A close to one (geometric mean scaling).
+
+    Each coefficient is scaled as A[i, j] * row_factors[i] / column_factors[j], the convention of Pyomo's scaling
+    transformation, so a scaled column is the variable times its factor. Factors are rounded to powers of two, which
+    scale the floating point exponent only and do not round the coefficients. Columns that are not scalable keep 1.
+    """
+    A = sparse.coo_array(A)
+    # Smaller coefficients, like the rounding noise of some big-M values, are dropped by solvers anyway.
+    nonzero = np.abs(A.data) > _SCALING_TOLERANCE
+    rows, columns = A.row[nonzero], A.col[nonzero]
+    logs = np.log2(np.abs(A.data[nonzero]))
+    row_counts = np.maximum(np.bincount(rows, minlength=A.shape[0]), 1)
+    column_counts = np.maximum(np.bincount(columns, minlength=A.shape[1]), 1)
+
+    # Alternately centers the logarithm of every column and row around zero.
+    row_exponents = np.zeros(A.shape[0])
+    column_exponents = np.zeros(A.shape[1])
+    for _ in range(_SCALING_PASSES):
+        column_exponents = np.where(scalable, np.bincount(columns, logs + row_exponents[rows], minlength=A.shape[1]) / column_counts, 0.0)  # fmt: off
+        row_exponents = -np.bincount(rows, logs - column_exponents[columns], minlength=A.shape[0]) / row_counts
+
+    row_factors = np.exp2(np.round(row_exponents))
+    column_factors = np.exp2(np.round(column_exponents))
+    return row_factors, column_factors
+
+
+def _scaled_model(model: BlockData) -> BlockData:
+    """
+    Returns a copy of the model with its rows and columns scaled by _scaling_factors, through Pyomo's scaling transformation.
+
+    Only real variables are scaled, since the bounds of any other domain (binaries, or indicators relaxed to the
+    unit interval) would clash with the scaled ones. Objectives are not scaled, so that their values and the bounds
+    of lexicographic stages stay in euros (see _lexisolve). Names are kept, so the copy is written like the model.
+    """
+    constraints = list(model.component_data_objects(ctype=pyo.Constraint, active=True))
+    columns = ComponentMap()
+    rows, cols, values = [], [], []
+    for row, constraint in enumerate(constraints):
+        repn = generate_standard_repn(constraint.body, compute_values=True)
+        for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+            rows.append(row)
+            cols.append(columns.setdefault(var, len(columns)))
+            values.append(coef)
+
+    A = sparse.coo_array((values, (rows, cols)), shape=(len(constraints), len(columns)))
+    scalable = np.fromiter((var.domain in (pyo.Reals, pyo.NonNegativeReals) for var in columns), dtype=bool, count=len(columns))
+    row_factors, column_factors = _scaling_factors(A, scalable)
+
+    model.scaling_factor = pyo.Suffix(direction=pyo.Suffix.EXPORT)
+    try:
+        for constraint, factor in zip(constraints, row_factors.tolist()):
+            model.scaling_factor[constraint] = factor
+        for var, factor in zip(columns, column_factors.tolist()):
+            model.scaling_factor[var] = factor
+        scaled = pyo.TransformationFactory("core.scale_model").create_using(model, rename=False)
+    finally:
+        model.del_component(model.scaling_factor)
+    return scaled
+
+
+def _scaled_copy(model: BlockData) -> BlockData:
+    """
+    Returns the scaled copy of the model (see _scaled_model), updated with the current values of the model.
+
+    Copies are kept for as long as their model, so that a reused template (see _template_model) is solved through the
+    same copy every time, which persistent solvers (appsi_*) only update instead of loading anew. Scaling factors are
+    fitted to the coefficients of the first solve and then kept, later coefficients are still scaled exactly, if less
+    evenly. Copies are built again whenever the components of the model change (for example, added suffixes).
+    """
+    structure = tuple(component.name for component in model.component_objects(descend_into=True))
+    with _scaled_models_lock:
+        cached = _scaled_models.get(model)
+    if cached is not None and cached[0] == structure:
+        scaled = cached[1]
+        _update_scaled_model(model, scaled)
+        return scaled
+
+    scaled = _scaled_model(model)
+    with _scaled_models_lock:
+        _scaled_models[model] = (structure, scaled)
+    return scaled
+
+
+# Scaled copies, dropped along with their model.
+_scaled_models: weakref.WeakKeyDictionary[BlockData, tuple[tuple[str, ...], BlockData]] = weakref.WeakKeyDictionary()
+
+_scaled_models_lock = threading.Lock()
+
+
+def _update_scaled_model(model: BlockData, scaled: BlockData) -> None:
+    """
+    Updates a scaled copy of the model with its mutable parameters, variable bounds, domains, fixes and values, and
+    the active state of its constraints and objectives, scaled by the factors of the copy.
+    """
+    factors = scaled.component_scaling_factor_map
+
+    # The copy has the same components in the same order.
+    for param, scaled_param in zip(model.component_objects(ctype=pyo.Param), scaled.component_objects(ctype=pyo.Param)):  # fmt: off
+        if param.mutable:
+            scaled_param.store_values(param.extract_values())
+
+    for var, scaled_var in zip(model.component_data_objects(ctype=pyo.Var), scaled.component_data_objects(ctype=pyo.Var)):  # fmt: off
+        factor = factors[scaled_var]
+        scaled_var.domain = var.domain
+        scaled_var.setlb(var.lb * factor if var.lb is not None else None)
+        scaled_var.setub(var.ub * factor if var.ub is not None else None)
+        scaled_var.set_value(var.value * factor if var.value is not None else None, skip_validation=True)
+        if var.fixed:
+            scaled_var.fix()
+        else:
+            scaled_var.unfix()
+
+    for ctype in (pyo.Constraint, pyo.Objective):
+        for component, scaled_component in zip(model.component_data_objects(ctype=ctype), scaled.component_data_objects(ctype=ctype)):  # fmt: off
+            if component.active:
+                scaled_component.activate()
+            else:
+                scaled_component.deactivate()
+
+
+def _unscale_solution(scaled: BlockData, model: BlockData) -> None:
+    """
+    Loads the solution of a copy scaled by _scaled_model into the model, with its duals and reduced costs if imported.
+
+    Unlike ScaleModel.propagate_solution, it does not need a single active objective, since objectives are not scaled.
+    """
+    factors = scaled.component_scaling_factor_map
+    dual = model.component("dual")
+    rc = model.component("rc")
+
+    # The copy has the same components in the same order.
+    for scaled_var, var in zip(scaled.component_data_objects(ctype=pyo.Var), model.component_data_objects(ctype=pyo.Var)):
+        if scaled_var.value is not None:
+            var.set_value(scaled_var.value / factors[scaled_var], skip_validation=True)
+        if rc is not None and scaled_var in scaled.rc:
+            rc[var] = scaled.rc[scaled_var] * factors[scaled_var]
+
+    if dual is not None:
+        for scaled_constraint, constraint in zip(scaled.component_data_objects(ctype=pyo.Constraint), model.component_data_objects(ctype=pyo.Constraint)):  # fmt: off
+            if scaled_constraint in scaled.dual:
+                dual[constraint] = scaled.dual[scaled_constraint] * factors[scaled_constraint]
+
+
+def _process_results(model: BlockData, data: Box) -> dict[str, float | Series[float]]:
     """
     Extracts variable values from the solved model, aligns them with the input index and returns them in the correct format.
+
+    Every indexed variable is read once into a row of a single preallocated array (see _aligned_values).
     """
+    # Variables substituted by the presolve are parameters or expressions, see _presolve.
+    names = [name for name in _VARIABLES if model.component(name).is_indexed()]
+    solved = np.empty((len(names), len(model.market)))
+    for row, name in zip(solved, names):
+        # Uninitialized values are None, which NumPy stores as NaN.
+        row[:] = [pyo.value(component_data, exception=False) for component_data in model.component(name).values()]
+
+    # Indicators of the sos1 formulation are derived from the flows they gate.
+    derived = [name for name in names if model.component(name).ctype is pyo.Param and name.endswith("_indicator") and model.component(name).mutable]  # fmt: off
+    if derived:
+        rounded = _round_indicators(dict(zip(names, solved)), pyo.value(model.bess_res_import_priority_condition)) or {}  # fmt: off
+        for name in derived:
+            if name in rounded:
+                solved[names.index(name)] = rounded[name]
+
+    indexed = _aligned_values(names, solved, model.market_label, data.market_input.index)
     values = {}
-    for component in model.component_objects(ctype=pyo.Var):
-        value = pd.Series(data=component.extract_values(), dtype=float)
-        value = value.mask(np.isclose(value, 0.0), other=0.0)
-        value = value.item() if not component.is_indexed() else value.reindex(index=data.market_input.index)  # fmt: off
-        values[component.local_name] = value
+    for name in _VARIABLES:
+        if name in indexed:
+            values[name] = indexed[name]
+            continue
+
+        value = pyo.value(model.component(name), exception=False)
+        value = float(value) if value is not None else np.nan
+        values[name] = 0.0 if np.isclose(value, 0.0) else value
+    return values
+
+
+def _aligned_values(names: list[str], solved: np.ndarray, market: pd.Index, index: pd.Index) -> dict[str, Series[float]]:
+    """
+    Aligns the solved values of indexed variables (one row per variable) with the input index, zeroing near zero values.
+
+    Every row is cleaned in a single vectorized operation and returned as a view of the same array, instead
+    of allocating a dictionary, a Series and a reindexed copy per variable. Periods not optimized are NaN.
+    """
+    positions = index.get_indexer(market)
+    found = positions >= 0
+    aligned = np.full((len(names), len(index)), np.nan)
+    aligned[:, positions[found]] = solved[:, found]
+    aligned[np.isclose(aligned, 0.0)] = 0.0
+
+    values = {name: pd.Series(data=row, index=index, copy=False) for name, row in zip(names, aligned)}
+    return values
+
+
+# Every variable of the model in declaration order, including those substituted by the presolve.
+_VARIABLES = (
+    "bess_grid_import_net_megawatt_hour",
+    "bess_grid_import_gross_megawatt_hour",
+    "bess_res_import_megawatt_hour",
+    "bess_res_import_curtailed_megawatt_hour",
+    "bess_res_import_uncurtailed_megawatt_hour",
+    "bess_res_import_curtailed_uncurtailed_indicator",
+    "bess_res_import_priority_indicator",
+    "bess_grid_export_net_megawatt_hour",
+    "bess_grid_export_gross_megawatt_hour",
+    "bess_charge_megawatt_hour",
+    "bess_discharge_megawatt_hour",
+    "bess_charge_discharge_indicator",
+    "bess_state_of_charge_megawatt_hour",
+    "bess_previous_state_of_charge_megawatt_hour",
+    "bess_cycles_count",
+    "bess_profit_euro",
+    "res_grid_export_net_megawatt_hour",
+    "res_grid_export_gross_megawatt_hour",
+    "res_profit_euro",
+)
+
+
+def _create_matrix(parameters: Box) -> Box:
+    """
+    Assembles the same formulation as _create_model directly as sparse arrays (A, b, c, bounds, integrality).
+
+    Every indexed variable is laid out as a contiguous block of columns and every constraint family as a
+    contiguous block of rows, so the whole model is built with a handful of vectorized NumPy operations
+    instead of one Python rule call per market period. Indicators are always big-M rules, since SciPy has no
+    special ordered sets. For more information, consult the equations in XXXX_XXXX.
+    """
+    # fmt: off
+    market = parameters.market
+    n = len(market)
+    hours = parameters.market_time_unit_minute * (1.0 / 60.0)
+
+    # Same order as the Pyomo components, so that both backends return identical results.
+    variables = {
+        "bess_grid_import_net_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_grid_import_gross_megawatt_hour": (n, -np.inf, np.inf, 0),
+        "bess_res_import_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_res_import_curtailed_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_res_import_uncurtailed_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_res_import_curtailed_uncurtailed_indicator": (n, 0.0, 1.0, 1),
+        "bess_res_import_priority_indicator": (n, 0.0, 1.0, 1),
+        "bess_grid_export_net_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_grid_export_gross_megawatt_hour": (n, -np.inf, np.inf, 0),
+        "bess_charge_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_discharge_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_charge_discharge_indicator": (n, 0.0, 1.0, 1),
+        "bess_state_of_charge_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_previous_state_of_charge_megawatt_hour": (n, 0.0, np.inf, 0),
+        "bess_cycles_count": (None, 0.0, np.inf, 0),
+        "bess_profit_euro": (None, -np.inf, np.inf, 0),
+        "res_grid_export_net_megawatt_hour": (n, 0.0, np.inf, 0),
+        "res_grid_export_gross_megawatt_hour": (n, -np.inf, np.inf, 0),
+        "res_profit_euro": (None, -np.inf, np.inf, 0),
+    }
+
+    columns = {}
+    indexed = {}
+    lower_bounds = []
+    upper_bounds = []
+    integrality = []
+    offset = 0
+    for name, (size, lower_bound, upper_bound, integral) in variables.items():
+        columns[name] = offset + np.arange(size if size is not None else 1)
+        indexed[name] = size is not None
+        lower_bounds.append(np.full(len(columns[name]), lower_bound, dtype=float))
+        upper_bounds.append(np.full(len(columns[name]), upper_bound, dtype=float))
+        integrality.append(np.full(len(columns[name]), integral, dtype=int))
+        offset += len(columns[name])
+
+    lower_bounds = np.concatenate(lower_bounds)
+    upper_bounds = np.concatenate(upper_bounds)
+    integrality = np.concatenate(integrality)
+
+    column = Box(columns)
+
+    def fix(columns, value):
+        lower_bounds[columns] = value
+        upper_bounds[columns] = value
+
+    # Same precedence as _fix_model, disabled topologies are fixed last.
+    if parameters.bess_fixed_condition:
+        fix(column.bess_grid_import_net_megawatt_hour, parameters.bess_grid_import_net_fixed_megawatt_hour)
+        fix(column.bess_res_import_megawatt_hour, parameters.bess_res_import_fixed_megawatt_hour)
+        fix(column.bess_grid_export_net_megawatt_hour, parameters.bess_grid_export_net_fixed_megawatt_hour)
+
+    bess_state_of_charge_fixed = ~np.isnan(parameters.bess_state_of_charge_fixed_megawatt_hour)
+    fix(column.bess_state_of_charge_megawatt_hour[bess_state_of_charge_fixed], parameters.bess_state_of_charge_fixed_megawatt_hour[bess_state_of_charge_fixed])
+
+    if not parameters.bess_grid_import_condition:
+        fix(column.bess_grid_import_net_megawatt_hour, 0.0)
+
+    if not parameters.bess_res_import_condition:
+        fix(column.bess_res_import_megawatt_hour, 0.0)
+
+    if not parameters.bess_grid_export_condition:
+        fix(column.bess_grid_export_net_megawatt_hour, 0.0)
+
+    if not parameters.res_grid_export_condition:
+        fix(column.res_grid_export_net_megawatt_hour, 0.0)
+
+    c = np.zeros(len(lower_bounds))
+    c[column.bess_grid_export_net_megawatt_hour] = parameters.market_discount_factor * (parameters.bess_grid_export_net_price_euro_per_megawatt_hour - parameters.bess_profit_threshold_euro_per_megawatt_hour)
+    c[column.bess_grid_import_net_megawatt_hour] = -parameters.market_discount_factor * (parameters.bess_grid_import_net_price_euro_per_megawatt_hour + parameters.market_rate)
+    c[column.bess_res_import_curtailed_megawatt_hour] = -parameters.market_discount_factor * parameters.bess_res_import_curtailed_price_euro_per_megawatt_hour
+    c[column.bess_res_import_uncurtailed_megawatt_hour] = -parameters.market_discount_factor * parameters.bess_res_import_uncurtailed_price_euro_per_megawatt_hour
+    c[column.res_grid_export_net_megawatt_hour] = parameters.market_discount_factor * parameters.res_grid_export_net_price_euro_per_megawatt_hour
+
+    rows = []
+    cols = []
+    vals = []
+    constraint_lower_bounds = []
+    constraint_upper_bounds = []
+
+    def add(lower_bound, upper_bound, *terms):
+        # Each term is a pair of column indices and coefficients, one row per leading entry.
+        m = len(terms[0][0])
+        if m == 0:
+            return
+        start = sum(map(len, constraint_lower_bounds))
+        for term_cols, term_vals in terms:
+            term_cols = np.asarray(term_cols).reshape(m, -1)
+            term_vals = np.broadcast_to(np.asarray(term_vals, dtype=float).reshape(m, -1) if np.ndim(term_vals) else term_vals, term_cols.shape)
+            rows.append(np.broadcast_to((start + np.arange(m))[:, None], term_cols.shape).ravel())
+            cols.append(term_cols.ravel())
+            vals.append(term_vals.ravel())
+        constraint_lower_bounds.append(np.broadcast_to(np.asarray(lower_bound, dtype=float), m))
+        constraint_upper_bounds.append(np.broadcast_to(np.asarray(upper_bound, dtype=float), m))
+
+    bess_energy_capacity = parameters.bess_energy_capacity_megawatt_hour
+    bess_available_percent = parameters.bess_state_of_health_percent / 100.0 * parameters.bess_availability_percent / 100.0
+    bess_initial_state_of_charge = (parameters.bess_initial_state_of_charge_percent / 100.0) * bess_energy_capacity
+
+    # bess_grid_import_rule
+    add(parameters.bess_grid_import_matched_megawatt_hour, parameters.bess_grid_import_matched_megawatt_hour, (column.bess_grid_import_net_megawatt_hour, 1.0), (column.bess_grid_import_gross_megawatt_hour, -1.0))
+    # bess_res_import_rule
+    add(0.0, 0.0, (column.bess_res_import_megawatt_hour, 1.0), (column.bess_res_import_curtailed_megawatt_hour, -1.0), (column.bess_res_import_uncurtailed_megawatt_hour, -1.0))
+    # bess_res_import_curtailed_rule
+    add(-np.inf, parameters.bess_res_import_curtailed_limits_megawatt_hour, (column.bess_res_import_curtailed_megawatt_hour, 1.0))
+    # bess_res_import_uncurtailed_rule
+    add(-np.inf, parameters.bess_res_import_uncurtailed_limits_megawatt_hour, (column.bess_res_import_uncurtailed_megawatt_hour, 1.0))
+    # bess_res_import_curtailed_indicator_rule
+    add(-np.inf, 0.0, (column.bess_res_import_curtailed_megawatt_hour, 1.0), (column.bess_res_import_curtailed_uncurtailed_indicator, -parameters.bess_res_import_curtailed_big_m_megawatt_hour))
+    # bess_res_import_uncurtailed_indicator_rule
+    add(-np.inf, 0.0, (column.bess_res_import_uncurtailed_megawatt_hour, 1.0), (column.bess_res_import_curtailed_uncurtailed_indicator, -parameters.bess_res_import_uncurtailed_big_m_megawatt_hour))
+
+    # bess_res_import_clipping_rule
+    if parameters.bess_res_import_clipping_condition:
+        add(-np.inf, parameters.bess_res_import_clipping_limits_megawatt_hour, (column.bess_res_import_megawatt_hour, 1.0))
+
+    if parameters.bess_res_import_priority_condition:
+        # bess_res_import_priority_res_grid_export_indicator_rule
+        add(-np.inf, 0.0, (column.res_grid_export_net_megawatt_hour, 1.0), (column.bess_res_import_priority_indicator, -parameters.bess_res_import_priority_res_grid_export_big_m_megawatt_hour))
+        # bess_res_import_priority_bess_grid_import_indicator_rule
+        add(-np.inf, parameters.bess_res_import_priority_bess_grid_import_big_m_megawatt_hour, (column.bess_grid_import_net_megawatt_hour, 1.0), (column.bess_res_import_priority_indicator, parameters.bess_res_import_priority_bess_grid_import_big_m_megawatt_hour))
+
+    # bess_grid_export_rule
+    add(parameters.bess_grid_export_matched_megawatt_hour, parameters.bess_grid_export_matched_megawatt_hour, (column.bess_grid_export_net_megawatt_hour, 1.0), (column.bess_grid_export_gross_megawatt_hour, -1.0))
+    # bess_grid_export_limit_rule
+    add(-np.inf, parameters.bess_grid_export_limits_megawatt * hours, (column.bess_grid_export_net_megawatt_hour, 1.0))
+    # bess_charging_power_capacity_rule
+    add(-np.inf, bess_available_percent * parameters.bess_charging_power_capacity_megawatt * hours, (column.bess_charge_megawatt_hour, 1.0))
+    # bess_discharging_power_capacity_rule
+    add(-np.inf, bess_available_percent * parameters.bess_discharging_power_capacity_megawatt * hours, (column.bess_discharge_megawatt_hour, 1.0))
+    # bess_energy_capacity_rule
+    add(-np.inf, bess_available_percent * bess_energy_capacity, (column.bess_state_of_charge_megawatt_hour, 1.0))
+    # bess_charging_efficiency_rule
+    add(0.0, 0.0, (column.bess_charge_megawatt_hour, 1.0), (column.bess_grid_import_net_megawatt_hour, -(parameters.bess_charging_efficiency_percent / 100.0)), (column.bess_res_import_megawatt_hour, -(parameters.bess_charging_efficiency_percent / 100.0)))
+    # bess_discharging_efficiency_rule
+    add(0.0, 0.0, (column.bess_discharge_megawatt_hour, 1.0), (column.bess_grid_export_net_megawatt_hour, -parameters.bess_discharging_efficiency_reciprocal))
+    # bess_charge_indicator_rule
+    add(-np.inf, 0.0, (column.bess_charge_megawatt_hour, 1.0), (column.bess_charge_discharge_indicator, -parameters.bess_charge_big_m_megawatt_hour))
+    # bess_discharge_indicator_rule
+    add(-np.inf, parameters.bess_discharge_big_m_megawatt_hour, (column.bess_discharge_megawatt_hour, 1.0), (column.bess_charge_discharge_indicator, parameters.bess_discharge_big_m_megawatt_hour))
+    # bess_maximum_cycles_rule
+    add(-np.inf, parameters.bess_maximum_cycles_count, (column.bess_cycles_count, 1.0))
+    # bess_minimum_state_of_charge_rule
+    add((parameters.bess_minimum_state_of_charge_percent / 100.0) * bess_energy_capacity, np.inf, (column.bess_state_of_charge_megawatt_hour, 1.0))
+    # bess_maximum_state_of_charge_rule
+    add(-np.inf, (parameters.bess_maximum_state_of_charge_percent / 100.0) * bess_energy_capacity, (column.bess_state_of_charge_megawatt_hour, 1.0))
+    # bess_initial_state_of_charge_rule
+    add(bess_initial_state_of_charge, bess_initial_state_of_charge, (column.bess_previous_state_of_charge_megawatt_hour[:1], 1.0))
+
+    # bess_final_state_of_charge_rule
+    if parameters.bess_final_state_of_charge_condition:
+        bess_final_state_of_charge = (parameters.bess_final_state_of_charge_percent / 100.0) * bess_energy_capacity
+        add(bess_final_state_of_charge, bess_final_state_of_charge, (column.bess_state_of_charge_megawatt_hour[-1:], 1.0))
+
+    # bess_state_of_charge_rule
+    add(0.0, 0.0, (column.bess_state_of_charge_megawatt_hour, 1.0), (column.bess_previous_state_of_charge_megawatt_hour, -1.0), (column.bess_charge_megawatt_hour, -1.0), (column.bess_discharge_megawatt_hour, 1.0))
+    # bess_previous_state_of_charge_rule
+    add(0.0, 0.0, (column.bess_previous_state_of_charge_megawatt_hour[1:], 1.0), (column.bess_state_of_charge_megawatt_hour[:-1], -1.0))
+    # bess_cycles_rule
+    add(0.0, 0.0, (column.bess_cycles_count, 1.0), (column.bess_discharge_megawatt_hour[None, :], -parameters.bess_energy_capacity_reciprocal_per_megawatt_hour))
+    # bess_profit_rule
+    add(0.0, 0.0, (column.bess_profit_euro, 1.0), (column.bess_grid_export_net_megawatt_hour[None, :], -parameters.bess_grid_export_net_price_euro_per_megawatt_hour[None, :]), (column.bess_grid_import_net_megawatt_hour[None, :], parameters.bess_grid_import_net_price_euro_per_megawatt_hour[None, :]), (column.bess_res_import_curtailed_megawatt_hour[None, :], parameters.bess_res_import_curtailed_price_euro_per_megawatt_hour[None, :]), (column.bess_res_import_uncurtailed_megawatt_hour[None, :], parameters.bess_res_import_uncurtailed_price_euro_per_megawatt_hour[None, :]))
+    # res_export_rule
+    add(parameters.res_grid_export_available_megawatt_hour, parameters.res_grid_export_available_megawatt_hour, (column.res_grid_export_net_megawatt_hour, 1.0), (column.bess_res_import_uncurtailed_megawatt_hour, 1.0))
+    # res_grid_export_rule
+    add(parameters.res_grid_export_matched_megawatt_hour, parameters.res_grid_export_matched_megawatt_hour, (column.res_grid_export_net_megawatt_hour, 1.0), (column.res_grid_export_gross_megawatt_hour, -1.0))
+    # res_grid_export_limit_rule
+    add(-np.inf, parameters.res_grid_export_limits_megawatt * hours, (column.res_grid_export_net_megawatt_hour, 1.0))
+    # res_profit_rule
+    add(0.0, 0.0, (column.res_profit_euro, 1.0), (column.res_grid_export_net_megawatt_hour[None, :], -parameters.res_grid_export_net_price_euro_per_megawatt_hour[None, :]))
+    # grid_export_limit_rule
+    add(-np.inf, parameters.grid_export_limits_megawatt * hours, (column.res_grid_export_net_megawatt_hour, 1.0), (column.bess_grid_export_net_megawatt_hour, 1.0))
+
+    A = sparse.csr_array(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(sum(map(len, constraint_lower_bounds)), len(c)),
+    )
+
+    matrix = Box(
+        market=market,
+        columns=columns,
+        indexed=indexed,
+        A=A,
+        b_l=np.concatenate(constraint_lower_bounds),
+        b_u=np.concatenate(constraint_upper_bounds),
+        c=c,
+        lower_bounds=lower_bounds,
+        upper_bounds=upper_bounds,
+        integrality=integrality,
+        bess_res_import_priority_condition=parameters.bess_res_import_priority_condition,
+        x=np.clip(np.zeros(len(c)), lower_bounds, upper_bounds),
+    )
+    return matrix
+
+
+def _apply_matrix_optimizer(matrix: Box, data: Box, relaxed: bool = False) -> Box:
+    """
+    Solves the matrix model with the SciPy MIP interface (HiGHS). Returns whether optimal termination is achieved and the gap.
+
+    If relaxed, solves the LP relaxation instead and is only optimal if it is optimal for the MIP too (see _apply_relaxed_optimizer).
+    If model_scaling, solves the arrays scaled by _scaling_factors instead and unscales the solution.
+    Simplex iterations are None, since SciPy does not report them.
+    """
+    A, b_l, b_u, c = matrix.A, matrix.b_l, matrix.b_u, matrix.c
+    lower_bounds, upper_bounds = matrix.lower_bounds, matrix.upper_bounds
+    column_factors = np.ones(len(c))
+    if data.model_scaling:
+        # The scaled columns are the variables times their factors, so bounds are multiplied and costs divided.
+        row_factors, column_factors = _scaling_factors(A, matrix.integrality == 0)
+        A = sparse.csr_array(sparse.diags_array(row_factors) @ A @ sparse.diags_array(1.0 / column_factors))
+        b_l, b_u, c = b_l * row_factors, b_u * row_factors, c / column_factors
+        lower_bounds, upper_bounds = lower_bounds * column_factors, upper_bounds * column_factors
+
+    # SciPy only minimizes, so flip the objective sense.
+    results = milp(
+        -c,
+        integrality=matrix.integrality if not relaxed else np.zeros_like(matrix.integrality),
+        bounds=Bounds(lower_bounds, upper_bounds),
+        constraints=LinearConstraint(A, b_l, b_u),
+        options={"disp": False, **_solver_options(data | Box(solver="highs"))},
+    )
+    # If the time limit is reached, x is the best incumbent (if any).
+    if results.x is not None:
+        matrix.x = results.x / column_factors
+    optimal = results.status == 0
+    gap = results.get("mip_gap")
+    gap = gap if gap is not None else 0.0 if optimal else np.nan
+    nodes = results.get("mip_node_count")
+    termination = _MATRIX_TERMINATIONS.get(results.status, "other")
+    if not relaxed or not optimal:
+        status = Box(optimal=optimal, gap=float(gap), nodes=nodes, iterations=None, termination=termination)
+        return status
+
+    values = {name: matrix.x[columns] for name, columns in matrix.columns.items() if matrix.indexed[name]}
+    rounded = _round_indicators(values, matrix.bess_res_import_priority_condition)
+    if rounded is None:
+        status = Box(optimal=False, gap=np.nan, nodes=None, iterations=None, termination=termination)
+        return status
+
+    for name, value in rounded.items():
+        matrix.x[matrix.columns[name]] = value
+    status = Box(optimal=True, gap=0.0, nodes=0, iterations=None, termination=termination)
+    return status
+
+
+# Termination conditions of the SciPy MIP interface by status code, named as in Pyomo.
+_MATRIX_TERMINATIONS = {
+    0: "optimal",
+    1: "maxTimeLimit",
+    2: "infeasible",
+    3: "unbounded",
+}
+
+
+def _process_matrix_results(matrix: Box, data: Box) -> dict[str, float | Series[float]]:
+    """
+    Extracts variable values from the solved matrix model in the same format as _process_results.
+    """
+    names = [name for name in matrix.columns if matrix.indexed[name]]
+    solved = np.empty((len(names), len(matrix.market)))
+    for row, name in zip(solved, names):
+        row[:] = matrix.x[matrix.columns[name]]
+
+    indexed = _aligned_values(names, solved, matrix.market, data.market_input.index)
+    values = {}
+    for name, columns in matrix.columns.items():
+        if name in indexed:
+            values[name] = indexed[name]
+            continue
+
+        value = matrix.x[columns].item()
+        values[name] = 0.0 if np.isclose(value, 0.0) else value
     return values
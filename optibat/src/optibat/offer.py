@@ -10,6 +10,8 @@ Author: Josu Gomez Arana (XXXX_XXXX)
 
 from __future__ import annotations
 
+from typing import assert_never
+
 import numpy as np
 import pandas as pd
 from box import Box
@@ -21,7 +23,8 @@ def quote_price(data: Box) -> Box:
     Generate price offers for battery and renewable energy sources.
 
     This function computes the offer prices for both the battery energy storage system (BESS)
-    and renewable export (RES). Prices are only set for market horizon.
+    and renewable export (RES). Prices are only set for market horizon. BESS prices are either
+    based on charging semicycles or on the shadow prices of the solved model (bess_pricing).
 
     Args:
         data (Box): Input data and configuration, including market and module state.
@@ -29,7 +32,13 @@ def quote_price(data: Box) -> Box:
     Returns:
         Box: The merged data and offer price information.
     """
-    bess_price_euro_per_megawatt_hour = _quote_bess_price(data)
+    match data.bess_pricing:
+        case "shadow_price":
+            bess_price_euro_per_megawatt_hour = _quote_bess_shadow_price(data)
+        case "semicycle":
+            bess_price_euro_per_megawatt_hour = _quote_bess_price(data)
+        case _:
+            assert_never()
     res_price_euro_per_megawatt_hour = _quote_res_price(data)
     offer = Box(
         bess_price_euro_per_megawatt_hour=bess_price_euro_per_megawatt_hour,
@@ -132,6 +141,71 @@ def _quote_bess_price(data: Box) -> Series[float]:
     return bess_price_euro_per_megawatt_hour
 
 
+def _quote_bess_shadow_price(data: Box) -> Series[float]:
+    """
+    Calculate the BESS offer price series from the shadow prices of the solved model.
+
+    The shadow price of the state of charge balance is the value of one more megawatt hour stored,
+    so the battery should buy whenever the stored energy is worth more than its cost, and sell
+    whenever the energy sold pays for the stored energy it takes. Both bounds account for the
+    efficiencies, the profit threshold and the market rate, like the model, and are adjusted with the
+    configured tolerances. Periods without shadow price (solvers that do not report duals) fall back
+    to the semicycle prices (see _quote_bess_price).
+    """
+    bess_state_of_charge_shadow_price_euro_per_megawatt_hour = data.get("bess_state_of_charge_shadow_price_euro_per_megawatt_hour")  # fmt: off
+    if bess_state_of_charge_shadow_price_euro_per_megawatt_hour is None:
+        bess_price_euro_per_megawatt_hour = _quote_bess_price(data)
+        return bess_price_euro_per_megawatt_hour
+
+    bess_state_of_charge_signed_diff = np.sign(
+        data.bess_state_of_charge_megawatt_hour
+        - data.bess_previous_state_of_charge_megawatt_hour
+    )
+
+    # Buying one megawatt hour stores the charging efficiency of it.
+    bess_purchase_price_euro_per_megawatt_hour = (
+        bess_state_of_charge_shadow_price_euro_per_megawatt_hour
+        * (data.bess_charging_efficiency_percent / 100.0)
+        - data.market_rate
+        + data.bess_purchase_tolerance_euro_per_megawatt_hour
+    )
+
+    # Selling one megawatt hour takes the reciprocal of the discharging efficiency of it.
+    bess_sale_price_euro_per_megawatt_hour = (
+        bess_state_of_charge_shadow_price_euro_per_megawatt_hour
+        / (data.bess_discharging_efficiency_percent / 100.0)
+        + data.bess_profit_threshold_euro_per_megawatt_hour
+        - data.bess_sale_tolerance_euro_per_megawatt_hour
+    )
+
+    bess_shadow_price_euro_per_megawatt_hour = pd.Series(
+        data=np.select(
+            [bess_state_of_charge_signed_diff > 0.0, bess_state_of_charge_signed_diff < 0.0],
+            [bess_purchase_price_euro_per_megawatt_hour, bess_sale_price_euro_per_megawatt_hour],
+            default=0.0,
+        ),
+        index=data.market_input.index,
+        dtype=float,
+    )
+
+    # The semicycle prices are only quoted if some market period has no shadow price.
+    bess_shadow_price_missing = (
+        bess_state_of_charge_shadow_price_euro_per_megawatt_hour.isna()
+        & data.market_price_euro_per_megawatt_hour.notna()
+    )
+    if bess_shadow_price_missing.any():
+        bess_shadow_price_euro_per_megawatt_hour = bess_shadow_price_euro_per_megawatt_hour.where(
+            ~bess_shadow_price_missing,
+            other=_quote_bess_price(data),
+        )
+
+    bess_price_euro_per_megawatt_hour = bess_shadow_price_euro_per_megawatt_hour.where(
+        data.market_price_euro_per_megawatt_hour.notna(),
+    )
+
+    return bess_price_euro_per_megawatt_hour
+
+
 def _quote_res_price(data: Box) -> Series[float]:
     """
     Calculate the renewable export offer price series.
@@ -0,0 +1,164 @@
+"""
+Shared fixtures for the model tests.
+
+Every alternative solve path (matrix backend, dynamic programming, relaxation, scaling, decompositions,
+receding horizon, cache and shadow prices) is checked against the reference MIP, which is the monolithic
+solve with every approximate strategy and formulation improvement disabled (see _BENCHMARK_REFERENCE).
+"""
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+import pytest
+from box import Box
+
+from optibat import model
+
+
+@pytest.fixture(scope="session")
+def solver() -> str:
+    """
+    The first Pyomo MIP solver available, since the tests only need one of them.
+    """
+    for solver in ("appsi_highs", "cbc", "glpk"):
+        if pyo.SolverFactory(solver).available(exception_flag=False):
+            return solver
+    pytest.skip("No Pyomo MIP solver available")
+
+
+@pytest.fixture
+def make_data(solver):
+    """
+    Builds the input data of a module with a daily price cycle, optionally with renewables behind the battery.
+
+    Every alternative strategy is disabled, tests enable the one they check.
+    """
+
+    def make_data(days: int = 2, minute: int = 60, res: bool = True, seed: int = 0, **settings) -> Box:
+        rng = np.random.default_rng(seed)
+        periods_per_hour = 60 // minute
+        n = days * 24 * periods_per_hour
+        day = np.arange(n) // (24 * periods_per_hour)
+        hour = np.arange(n) // periods_per_hour % 24
+        quarter = np.arange(n) % periods_per_hour
+        index = pd.Index([f"D{d + 1}H{h + 1:02d}Q{q + 1}" for d, h, q in zip(day, hour, quarter)])
+        market_input = pd.DataFrame(
+            {
+                "market_dates": pd.Timestamp("2026-10-17") + pd.to_timedelta(day, unit="D"),
+                "market_periods": np.arange(n) % (24 * periods_per_hour) + 1,
+            },
+            index=index,
+        )
+        price = 50.0 + 30.0 * np.sin(hour / 24.0 * 2.0 * np.pi) + rng.normal(0.0, 5.0, n)
+        res_export = np.clip(6.0 * np.sin((hour - 6.0) / 12.0 * np.pi), 0.0, None) / periods_per_hour * res
+
+        data = Box(
+            market_input=market_input,
+            market_price_euro_per_megawatt_hour=pd.Series(price, index=index),
+            market_time_unit_minute=minute,
+            market_timezone="Europe/Madrid",
+            market_rate=0.0,
+            market_horizon_day=days,
+            bess_actual_state_of_charge_megawatt_hour=pd.Series(np.nan, index=index),
+            bess_availability_percent=100.0,
+            bess_charging_efficiency_percent=95.0,
+            bess_discharging_efficiency_percent=95.0,
+            bess_energy_capacity_megawatt_hour=20.0,
+            bess_final_state_of_charge_percent=None,
+            bess_grid_export_limits_megawatt=8.0,
+            bess_grid_export_matched_megawatt_hour=0.0,
+            bess_grid_export_net_fixed_megawatt=None,
+            bess_grid_import_matched_megawatt_hour=0.0,
+            bess_grid_import_net_fixed_megawatt=None,
+            bess_initial_state_of_charge_percent=50.0,
+            bess_maximum_cycles_count_per_day=1.0,
+            bess_maximum_state_of_charge_percent=100.0,
+            bess_minimum_state_of_charge_percent=0.0,
+            bess_power_capacity_megawatt=5.0,
+            bess_profit_threshold_euro_per_megawatt_hour=0.0,
+            bess_purchase_tolerance_euro_per_megawatt_hour=1.0,
+            bess_sale_tolerance_euro_per_megawatt_hour=1.0,
+            bess_state_of_charge_tolerance_percent=5.0,
+            bess_res_import_clipping_percent=100.0,
+            bess_res_import_clipping_threshold_megawatt=0.0,
+            bess_res_import_fixed_megawatt=None,
+            bess_res_import_priority=True,
+            bess_state_of_charge_fixed_percent=None,
+            bess_state_of_health_percent=100.0,
+            bess_pricing="semicycle",
+            dim_ufi_bess_grid_export="bess_grid_export",
+            dim_ufi_bess_grid_import="bess_grid_import",
+            dim_ufi_bess_res_import="bess_res_import" if res else None,
+            dim_ufi_res_grid_export="res_grid_export" if res else None,
+            dim_up_grid_export="grid_export",
+            grid_export_limit_megawatt=8.0,
+            grid_export_limits_megawatt=8.0,
+            grid_connection_export_limit_megawatt=float("inf"),
+            res_export_megawatt_hour=pd.Series(res_export, index=index),
+            res_export_price_euro_per_megawatt_hour=0.0,
+            res_grid_export_limits_megawatt=8.0,
+            res_grid_export_matched_megawatt_hour=0.0,
+            model_benchmark=False,
+            model_cache_path=None,
+            model_cache_size=0,
+            model_coarse_minute=60,
+            model_corpus_path=None,
+            model_decomposition=None,
+            model_dynamic_programming=False,
+            model_dynamic_programming_bisection_count=20,
+            model_dynamic_programming_step_percent=1.0,
+            model_heuristic=False,
+            model_indicator_formulation="big_m",
+            model_lookahead_day=1,
+            model_receding_horizon=False,
+            model_relaxation=False,
+            model_scaling=False,
+            model_shadow_prices=False,
+            model_spread_bound=False,
+            model_tight_big_m=False,
+            model_window_day=1,
+            solver=solver,
+            solver_gap_percent=None,
+            solver_time_limit_second=None,
+        )
+        return data | Box(settings)
+
+    return make_data
+
+
+@pytest.fixture
+def objective():
+    """
+    Evaluates the market objective of a solution for the data, as the model would.
+    """
+
+    def objective(solution: Box, data: Box) -> float:
+        return model._objective(solution, model._model_parameters(data))
+
+    return objective
+
+
+@pytest.fixture
+def approx():
+    """
+    Compares objectives within the default relative MIP gap of HiGHS and cbc.
+    """
+
+    def approx(expected: float):
+        return pytest.approx(expected, rel=1e-4, abs=1e-6)
+
+    return approx
+
+
+@pytest.fixture
+def reference(objective):
+    """
+    Solves the reference MIP of the data and returns its solution and objective.
+    """
+
+    def reference(data: Box) -> tuple[Box, float]:
+        solution = model.run_model(data | model._BENCHMARK_REFERENCE | Box(model_decomposition=None, model_receding_horizon=False, model_cache_size=0))  # fmt: off
+        assert solution.optimal
+        return solution, objective(solution, data)
+
+    return reference
@@ -0,0 +1,102 @@
+"""
+Tests of the solution cache by input fingerprint, in memory and on disk.
+"""
+
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+from box import Box
+
+from optibat import model
+
+
+@pytest.fixture(autouse=True)
+def solutions(monkeypatch):
+    """
+    Isolates the memory cache of every test.
+    """
+    solutions = OrderedDict()
+    monkeypatch.setattr(model, "_solutions", solutions)
+    return solutions
+
+
+def assert_same_solution(cached, solution):
+    assert cached.optimal == solution.optimal
+    assert cached.bess_profit_euro == solution.bess_profit_euro
+    for name, value in solution.items():
+        if isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(cached[name], value)
+
+
+def test_memory_cache_matches_reference(make_data, reference, objective, approx):
+    data = make_data(model_cache_size=4)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+    cached = model.run_model(data)
+
+    assert not solution.cached
+    assert cached.cached
+    assert objective(cached, data) == approx(reference_objective)
+    assert_same_solution(cached, solution)
+
+
+def test_disk_cache_is_json(make_data, solutions, tmp_path):
+    data = make_data(model_cache_size=4, model_cache_path=str(tmp_path))
+
+    solution = model.run_model(data)
+    solutions.clear()
+    cached = model.run_model(data)
+
+    assert cached.cached
+    assert_same_solution(cached, solution)
+    (path,) = tmp_path.glob("*.json")
+    assert json.loads(path.read_text())["optimal"]
+
+
+def test_cache_misses_changed_inputs(make_data):
+    data = make_data(model_cache_size=4)
+
+    model.run_model(data)
+    solution = model.run_model(data | {"bess_profit_threshold_euro_per_megawatt_hour": 1.0})
+
+    assert not solution.cached
+
+
+def test_cache_evicts_least_recently_used(make_data, solutions):
+    data = make_data(model_cache_size=1)
+
+    model.run_model(data)
+    model.run_model(data | {"bess_profit_threshold_euro_per_megawatt_hour": 1.0})
+
+    assert len(solutions) == 1
+    assert not model.run_model(data).cached
+
+
+def test_cache_misses_other_versions(make_data, monkeypatch):
+    data = make_data(model_cache_size=4)
+
+    model.run_model(data)
+    monkeypatch.setattr(model, "_CACHE_VERSION", model._CACHE_VERSION + 1)
+    solution = model.run_model(data)
+
+    assert not solution.cached
+
+
+@pytest.mark.parametrize(
+    "index",
+    [
+        pd.Index(["D1H01Q1", "D1H02Q1", "D1H03Q1"]),
+        pd.Index([1, 2, 3]),
+        pd.DatetimeIndex(["2026-10-17 01:00", "2026-10-17 02:00", "2026-10-17 03:00"]).tz_localize("Europe/Madrid"),
+    ],
+)
+def test_encoding_keeps_index_type(index):
+    solution = Box(optimal=True, values=pd.Series([1.0, np.nan, 3.0], index=index))
+
+    decoded = model._decode_solution(model._encode_solution(solution))
+
+    pd.testing.assert_series_equal(decoded["values"], solution["values"])
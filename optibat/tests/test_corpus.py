@@ -0,0 +1,43 @@
+"""
+Tests of the model corpus, captured by run_model and replayed by run_benchmark.
+"""
+
+import json
+import shutil
+
+import pytest
+
+from optibat import model
+
+
+def test_export_only_on_solve(make_data, tmp_path):
+    data = make_data(days=1, model_corpus_path=str(tmp_path), model_cache_size=4)
+    model.run_model(data)
+    (directory,) = tmp_path.iterdir()
+    assert {path.name for path in directory.iterdir()} == {model._CORPUS_INPUTS_FILE, "model.lp", "model.mps"}
+
+    # Cache hits do not export the instance again.
+    shutil.rmtree(directory)
+    assert model.run_model(data).cached
+    assert not any(tmp_path.iterdir())
+
+
+def test_read_instance_round_trip(make_data, tmp_path):
+    data = make_data(days=1, model_corpus_path=str(tmp_path))
+    model.run_model(data)
+    (path,) = tmp_path.glob(f"*/{model._CORPUS_INPUTS_FILE}")
+    instance = model._read_instance(path)
+    assert list(instance.market_input.index) == list(data.market_input.index)
+    assert instance.market_price_euro_per_megawatt_hour.tolist() == pytest.approx(data.market_price_euro_per_megawatt_hour.tolist())
+
+
+@pytest.mark.parametrize("version", [None, 0, model._CORPUS_VERSION + 1, "1"])
+def test_read_instance_rejects_unknown_versions(make_data, tmp_path, version):
+    data = make_data(days=1, model_corpus_path=str(tmp_path))
+    model.run_model(data)
+    (path,) = tmp_path.glob(f"*/{model._CORPUS_INPUTS_FILE}")
+    instance = json.loads(path.read_text(encoding="utf-8"))
+    instance["version"] = version
+    path.write_text(json.dumps(instance), encoding="utf-8")
+    with pytest.raises(ValueError, match="corpus format version"):
+        model._read_instance(path)
@@ -0,0 +1,75 @@
+"""
+Tests of the dynamic programming engine for standalone modules against the reference MIP.
+
+Dynamic programming alone is relative to its state of charge grid and only prices the cycle cap, so it
+may fall short of the reference (a known gap). It must then report the gap against its Lagrangian bound
+and not be optimal, so that run_model falls back to the MIP and still matches the reference.
+"""
+
+import numpy as np
+import pytest
+
+from optibat import model
+
+
+@pytest.mark.parametrize("seed", [0, 1, 3])
+@pytest.mark.parametrize("cycles", [0.5, 1.5])
+@pytest.mark.parametrize("power", [5.0, 20.0])
+def test_dynamic_programming_matches_reference(make_data, reference, objective, approx, seed, cycles, power):
+    data = make_data(
+        days=3,
+        res=False,
+        seed=seed,
+        bess_initial_state_of_charge_percent=0.0,
+        bess_maximum_cycles_count_per_day=cycles,
+        bess_power_capacity_megawatt=power,
+        bess_grid_export_limits_megawatt=power,
+        grid_export_limit_megawatt=power,
+        grid_export_limits_megawatt=power,
+        model_dynamic_programming=True,
+    )
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+
+
+@pytest.mark.parametrize("cycles", [0.5, 1.5])
+def test_dynamic_programming_reports_its_gap(make_data, reference, objective, approx, cycles):
+    data = make_data(days=3, res=False, bess_maximum_cycles_count_per_day=cycles, model_dynamic_programming=True)
+    _, reference_objective = reference(data)
+
+    solution = model._solve_dynamic_programming(data, model._model_parameters(data))
+    dynamic_programming_objective = objective(solution, data)
+
+    assert dynamic_programming_objective <= reference_objective or dynamic_programming_objective == approx(reference_objective)
+    assert solution.bess_cycles_count <= 3 * cycles + 1e-6
+    if solution.optimal:
+        assert dynamic_programming_objective == approx(reference_objective)
+    else:
+        assert not np.isnan(solution.gap)
+        assert solution.gap > 0.0
+
+
+def test_dynamic_programming_skips_renewables(make_data):
+    data = make_data(res=True, model_dynamic_programming=True)
+
+    solution = model.run_model(data)
+
+    assert "dynamic_programming" not in solution.model_stats.solver
+
+
+def test_dynamic_programming_off_grid_final_state_falls_back(make_data, reference, objective, approx):
+    data = make_data(res=False, bess_final_state_of_charge_percent=33.3, solver_gap_percent=0.0, model_dynamic_programming=True)
+    _, reference_objective = reference(data)
+
+    dynamic_programming_solution = model._solve_dynamic_programming(data, model._model_parameters(data))
+    solution = model.run_model(data)
+
+    assert not dynamic_programming_solution.optimal
+    assert solution.optimal
+    assert "dynamic_programming" not in solution.model_stats.solver
+    assert solution.bess_state_of_charge_megawatt_hour.iloc[-1] == pytest.approx(0.333 * data.bess_energy_capacity_megawatt_hour)
+    assert objective(solution, data) == approx(reference_objective)
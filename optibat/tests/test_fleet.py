@@ -0,0 +1,53 @@
+"""
+Tests of the fleet model, where modules sharing a grid connection are blocks of a single model.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from optibat import model
+
+
+def test_fleet_without_shared_limit_matches_modules(make_data, reference, objective, approx):
+    modules = [make_data(seed=seed) for seed in range(3)]
+
+    solutions = model.run_fleet(modules)
+
+    for data, solution in zip(modules, solutions):
+        _, reference_objective = reference(data)
+        assert solution.optimal
+        assert objective(solution, data) == approx(reference_objective)
+        assert solution.model_stats.variables > 0
+
+
+def test_fleet_shares_the_connection(make_data):
+    modules = [make_data(seed=seed, grid_connection_export_limit_megawatt=6.0) for seed in range(3)]
+
+    solutions = model.run_fleet(modules)
+
+    export = sum(solution.bess_grid_export_net_megawatt_hour + solution.res_grid_export_net_megawatt_hour for solution in solutions)
+    assert (export <= 6.0 + 1e-6).all()
+
+
+def test_fleet_rejects_different_periods(make_data):
+    data = make_data()
+    shifted = data | {"market_input": data.market_input.set_index(pd.Index([f"X{i}" for i in range(len(data.market_input))]))}
+
+    with pytest.raises(ValueError):
+        model.run_fleet([data, shifted])
+
+
+def test_fleet_rejects_matrix_backend(make_data):
+    data = make_data(solver="scipy")
+
+    with pytest.raises(ValueError):
+        model.run_fleet([data, data])
+
+
+def test_fleet_rejects_different_priced_periods(make_data):
+    data = make_data()
+    unpriced = data | {"market_price_euro_per_megawatt_hour": data.market_price_euro_per_megawatt_hour.where(np.arange(48) > 0)}
+
+    with pytest.raises(ValueError):
+        model.run_fleet([data, unpriced])
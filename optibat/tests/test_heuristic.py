@@ -0,0 +1,45 @@
+"""
+Tests of the greedy heuristic schedule, which warm starts the MIP solver.
+"""
+
+import pyomo.environ as pyo
+import pytest
+
+from optibat import model
+
+TOLERANCE = 1e-6
+
+
+@pytest.mark.parametrize("res", [True, False])
+@pytest.mark.parametrize("minute", [60, 15])
+@pytest.mark.parametrize("cycles", [1.0, 0.5])
+def test_heuristic_incumbent_is_feasible(make_data, res, minute, cycles):
+    data = make_data(res=res, minute=minute, bess_maximum_cycles_count_per_day=cycles)
+    parameters = model._model_parameters(data)
+    schedule = model._heuristic_schedule(parameters)
+    assert schedule is not None
+    # Not just the idle schedule, which is trivially feasible.
+    assert schedule["bess_grid_export_net_megawatt_hour"].sum() > 0.0
+
+    instance = model._create_model(parameters, model._presolve(parameters))
+    model._warm_start(instance, model._heuristic_incumbent(schedule, instance))
+
+    for var in instance.component_data_objects(ctype=pyo.Var, active=True):
+        assert var.value is not None, var.name
+        assert var.lb is None or var.value >= var.lb - TOLERANCE, var.name
+        assert var.ub is None or var.value <= var.ub + TOLERANCE, var.name
+        assert not var.is_integer() or abs(var.value - round(var.value)) <= TOLERANCE, var.name
+    for constraint in instance.component_data_objects(ctype=pyo.Constraint, active=True):
+        body = pyo.value(constraint.body)
+        assert constraint.lower is None or body >= pyo.value(constraint.lower) - TOLERANCE, constraint.name
+        assert constraint.upper is None or body <= pyo.value(constraint.upper) + TOLERANCE, constraint.name
+
+
+def test_heuristic_warm_start_matches_reference(make_data, reference, objective, approx):
+    data = make_data(model_heuristic=True)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
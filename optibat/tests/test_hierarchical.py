@@ -0,0 +1,51 @@
+"""
+Tests of the coarse to fine hierarchical decomposition against the reference MIP.
+
+Only the first window is solved at full resolution, so the hierarchical objective is only a lower
+bound of the reference objective (a known gap), and it is not reported as optimal.
+"""
+
+import numpy as np
+import pytest
+
+from optibat import model
+
+
+def test_hierarchical_is_bounded_by_reference(make_data, reference, objective, approx):
+    data = make_data(days=3, minute=15, model_decomposition="hierarchical", model_coarse_minute=60, model_window_day=1)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert not solution.optimal
+    assert np.isnan(solution.gap)
+    assert solution.subproblems_optimal
+    hierarchical_objective = objective(solution, data)
+    assert hierarchical_objective <= reference_objective or hierarchical_objective == approx(reference_objective)
+    assert solution.hierarchical.objective_euro == approx(hierarchical_objective)
+    assert np.isnan(solution.hierarchical.objective_delta_euro)
+
+
+def test_hierarchical_delta_is_against_full_resolution(make_data, reference, objective, approx):
+    data = make_data(days=3, minute=15, model_decomposition="hierarchical", model_coarse_minute=60, model_window_day=1, model_benchmark=True)  # fmt: off
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    # Both reference solves are within the MIP gap of the reference objective.
+    delta = objective(solution, data) - reference_objective
+    assert solution.hierarchical.objective_delta_euro == pytest.approx(delta, abs=1e-4 * abs(reference_objective))
+    assert solution.hierarchical.coarse_objective_delta_euro == approx(
+        solution.hierarchical.objective_euro - solution.hierarchical.coarse_objective_euro
+    )
+
+
+def test_hierarchical_without_coarser_periods_matches_reference(make_data, reference, objective, approx):
+    data = make_data(days=3, model_decomposition="hierarchical", model_coarse_minute=60, model_window_day=1)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert "hierarchical" not in solution
+    assert objective(solution, data) == approx(reference_objective)
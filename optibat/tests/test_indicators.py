@@ -0,0 +1,56 @@
+"""
+Tests of the indicator formulations (big-M, tightened big-M and special ordered sets) against the reference MIP.
+"""
+
+import pyomo.environ as pyo
+import pytest
+
+from optibat import model
+
+
+@pytest.fixture(scope="module")
+def sos_solver() -> str:
+    """
+    The first Pyomo solver available that supports special ordered sets.
+    """
+    for solver in model._SOS_SOLVERS:
+        if pyo.SolverFactory(solver).available(exception_flag=False):
+            return solver
+    pytest.skip("No Pyomo solver with special ordered sets available")
+
+
+@pytest.mark.parametrize("res", [True, False])
+def test_tight_big_m_matches_reference(make_data, reference, objective, approx, res):
+    data = make_data(res=res, model_tight_big_m=True)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+
+
+@pytest.mark.parametrize("res", [True, False])
+@pytest.mark.parametrize("tight_big_m", [True, False])
+def test_sos1_matches_big_m(make_data, objective, approx, sos_solver, res, tight_big_m):
+    data = make_data(res=res, solver=sos_solver, model_tight_big_m=tight_big_m)
+    big_m = model.run_model(data | {"model_indicator_formulation": "big_m"})
+    sos1 = model.run_model(data | {"model_indicator_formulation": "sos1"})
+
+    assert big_m.optimal and sos1.optimal
+    assert objective(sos1, data) == approx(objective(big_m, data))
+    # Derived indicators are consistent with the flows they exclude.
+    assert not ((sos1.bess_charge_megawatt_hour > 1e-6) & (sos1.bess_discharge_megawatt_hour > 1e-6)).any()
+
+
+def test_sos1_falls_back_to_big_m(make_data, reference, objective, approx, solver):
+    if model._sos_capable(solver):
+        pytest.skip("The solver supports special ordered sets")
+    data = make_data()
+    _, reference_objective = reference(data)
+
+    with pytest.warns(UserWarning, match="special ordered sets"):
+        solution = model.run_model(data | {"model_indicator_formulation": "sos1"})
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
@@ -0,0 +1,21 @@
+"""
+Tests of the sparse matrix backend (solver: scipy) against the reference MIP.
+"""
+
+import pytest
+
+from optibat import model
+
+
+@pytest.mark.parametrize("res", [True, False])
+@pytest.mark.parametrize("relaxation", [True, False])
+def test_matrix_matches_reference(make_data, reference, objective, approx, res, relaxation):
+    data = make_data(res=res, solver="scipy", model_relaxation=relaxation)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert solution.model_stats.solver == "scipy"
+    assert objective(solution, data) == approx(reference_objective)
+
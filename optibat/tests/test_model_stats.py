@@ -0,0 +1,73 @@
+"""
+Tests of the model statistics (model_stats) reported by every solve path.
+"""
+
+import pandas as pd
+import pytest
+
+from optibat import model
+
+KEYS = {
+    "build_seconds",
+    "write_seconds",
+    "solve_seconds",
+    "load_seconds",
+    "variables",
+    "binaries",
+    "constraints",
+    "nonzeros",
+    "solver",
+    "solver_version",
+    "termination",
+    "gap",
+    "nodes",
+    "iterations",
+}
+
+
+def check(model_stats, sized):
+    assert set(model_stats) == KEYS
+    for name in ("build_seconds", "write_seconds", "solve_seconds", "load_seconds"):
+        assert model_stats[name] is None or model_stats[name] >= 0.0, name
+    for name in ("variables", "binaries", "constraints", "nonzeros"):
+        assert (model_stats[name] > 0) if sized else (model_stats[name] is None), name
+    assert model_stats.termination == "optimal"
+    assert model_stats.gap >= 0.0
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {},
+        {"solver": "scipy"},
+        {"model_relaxation": True},
+        {"model_decomposition": "rolling"},
+        {"model_decomposition": "hierarchical", "minute": 15},
+    ],
+    ids=["pyomo", "scipy", "relaxation", "rolling", "hierarchical"],
+)
+def test_model_stats_of_models(make_data, settings):
+    solution = model.run_model(make_data(**settings))
+
+    check(solution.model_stats, sized=True)
+    assert solution.model_stats.solver == solution.solver
+
+
+def test_model_stats_without_models(make_data):
+    dynamic_programming = model.run_model(make_data(res=False, model_dynamic_programming=True))
+    assert dynamic_programming.model_stats.solver == "dynamic_programming"
+    check(dynamic_programming.model_stats, sized=False)
+
+    # Flat prices never pay for the losses of a cycle, nor for selling the initial energy it must end with.
+    data = make_data(res=False, model_spread_bound=True, bess_final_state_of_charge_percent=50.0)
+    flat = data | {"market_price_euro_per_megawatt_hour": pd.Series(50.0, index=data.market_input.index)}
+    idle = model.run_model(flat)
+    assert idle.model_stats.solver == "spread_bound"
+    check(idle.model_stats, sized=False)
+
+
+def test_model_stats_of_fleet(make_data):
+    solutions = model.run_fleet([make_data(seed=0), make_data(seed=1)])
+
+    for solution in solutions:
+        check(solution.model_stats, sized=True)
@@ -0,0 +1,46 @@
+"""
+Tests of offer pricing from the shadow prices of the solved model.
+"""
+
+import numpy as np
+import pandas as pd
+
+from optibat import model, offer
+
+
+def test_shadow_prices_match_reference(make_data, reference, objective, approx):
+    data = make_data(model_shadow_prices=True)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+    assert solution.bess_state_of_charge_shadow_price_euro_per_megawatt_hour.index.equals(data.market_input.index)
+
+
+def test_shadow_price_offer_skips_semicycle_prices(make_data, monkeypatch):
+    data = model.run_model(make_data(model_shadow_prices=True, bess_pricing="shadow_price"))
+    shadow_prices = data.bess_state_of_charge_shadow_price_euro_per_megawatt_hour
+    data.bess_state_of_charge_shadow_price_euro_per_megawatt_hour = shadow_prices.fillna(0.0)
+
+    def quote_bess_price(data):
+        raise AssertionError("Semicycle prices quoted with every shadow price available")
+
+    monkeypatch.setattr(offer, "_quote_bess_price", quote_bess_price)
+    prices = offer.quote_price(data).bess_price_euro_per_megawatt_hour
+
+    assert prices.notna().all()
+
+
+def test_shadow_price_offer_falls_back_to_semicycle_prices(make_data):
+    data = model.run_model(make_data(model_shadow_prices=True, bess_pricing="shadow_price"))
+    missing = np.arange(len(data.market_input.index)) % 7 == 0
+    data.bess_state_of_charge_shadow_price_euro_per_megawatt_hour = data.bess_state_of_charge_shadow_price_euro_per_megawatt_hour.fillna(0.0).mask(missing)  # fmt: off
+
+    prices = offer.quote_price(data).bess_price_euro_per_megawatt_hour
+    semicycle_prices = offer._quote_bess_price(data)
+
+    pd.testing.assert_series_equal(prices[missing], semicycle_prices[missing], check_names=False)
+    del data.bess_state_of_charge_shadow_price_euro_per_megawatt_hour
+    pd.testing.assert_series_equal(offer.quote_price(data).bess_price_euro_per_megawatt_hour, semicycle_prices, check_names=False)  # fmt: off
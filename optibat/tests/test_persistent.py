@@ -0,0 +1,30 @@
+"""
+Tests of the persistent solver sessions, kept alive between runs of the same module.
+"""
+
+import pytest
+
+from optibat import model
+
+
+def test_persistent_session_resolves_changed_parameters(make_data, reference, objective, approx, solver):
+    if not solver.startswith("appsi_"):
+        pytest.skip("No persistent solver available")
+
+    # Same topology, with the prices, matched positions and initial state of charge of a later session.
+    datas = [
+        make_data(seed=0),
+        make_data(seed=1, bess_initial_state_of_charge_percent=30.0, bess_grid_export_matched_megawatt_hour=1.0),
+    ]
+    # The references are solved first, since they load their own model into the same solver.
+    reference_objectives = [reference(data)[1] for data in datas]
+
+    loaded = []
+    for data, reference_objective in zip(datas, reference_objectives):
+        solution = model.run_model(data)
+        assert solution.optimal
+        assert objective(solution, data) == approx(reference_objective)
+        loaded.append(model._persistent_solver(data)._model)
+
+    # The second session only pushed the changes to the model the solver already held.
+    assert loaded[0] is loaded[1]
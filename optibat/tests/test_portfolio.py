@@ -0,0 +1,17 @@
+"""
+Tests of the solver portfolio, raced in parallel processes.
+"""
+
+from optibat import model
+
+
+def test_portfolio_race_matches_reference(make_data, reference, objective, approx, solver):
+    data = make_data(solver=[solver, "scipy"])
+    _, reference_objective = reference(make_data())
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert solution.winning_solver in (solver, "scipy")
+    assert solution.model_stats.solver == solution.winning_solver
+    assert objective(solution, data) == approx(reference_objective)
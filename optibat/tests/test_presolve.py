@@ -0,0 +1,24 @@
+"""
+Tests of the structural presolve.
+"""
+
+import pytest
+
+from optibat import model
+
+
+@pytest.mark.parametrize("res", [True, False])
+def test_variables_removed_counts_zero_and_fixed_only(make_data, res):
+    # Presolve only, so any solver that supports special ordered sets will do.
+    presolves = {
+        formulation: model._presolve(model._model_parameters(make_data(res=res, model_indicator_formulation=formulation, solver="cbc")))
+        for formulation in ("big_m", "sos1")
+    }
+    n = len(make_data(res=res).market_input)
+
+    for presolve in presolves.values():
+        removed = [name for name, substitution in presolve.substitutions.items() if substitution in ("zero", "fixed")]
+        assert presolve.variables_removed == n * len(removed)
+    # Derived indicators are still enforced by special ordered sets, so they are not removed.
+    assert "derived" in presolves["sos1"].substitutions.values()
+    assert presolves["sos1"].variables_removed == presolves["big_m"].variables_removed
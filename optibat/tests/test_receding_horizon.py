@@ -0,0 +1,75 @@
+"""
+Tests of the receding horizon mode against the reference MIP.
+
+Freezing the start of the reference schedule as matched positions leaves its tail optimal for the
+remaining periods, so the receding horizon solve must reach the reference objective.
+"""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from box import Box
+
+from optibat import model
+
+
+def frozen_data(data, solution, hour):
+    """
+    Freezes the periods before the hour (from the start of the horizon) to the solution, as matched positions and measured states of charge.
+    """
+    index = data.market_input.index
+    frozen = np.arange(len(index)) < hour
+
+    def freeze(value, other):
+        return pd.Series(np.where(frozen, value, other), index=index)
+
+    return data | Box(
+        model_receding_horizon=True,
+        market_datetime=datetime(2026, 10, 17, tzinfo=ZoneInfo(data.market_timezone)) + timedelta(hours=hour),
+        bess_grid_export_matched_megawatt_hour=freeze(solution.bess_grid_export_net_megawatt_hour, 0.0),
+        bess_grid_import_matched_megawatt_hour=freeze(solution.bess_grid_import_net_megawatt_hour, 0.0),
+        res_grid_export_matched_megawatt_hour=freeze(solution.res_grid_export_net_megawatt_hour, 0.0),
+        bess_actual_state_of_charge_megawatt_hour=freeze(solution.bess_previous_state_of_charge_megawatt_hour, np.nan),
+    )
+
+
+def test_receding_horizon_matches_reference(make_data, reference, objective, approx):
+    data = make_data()
+    reference_solution, reference_objective = reference(data)
+
+    solution = model.run_model(frozen_data(data, reference_solution, 8))
+
+    assert solution.optimal
+    assert solution.frozen_periods == 8
+    assert objective(solution, data) == approx(reference_objective)
+    pd.testing.assert_series_equal(
+        solution.bess_grid_export_net_megawatt_hour.iloc[:8],
+        reference_solution.bess_grid_export_net_megawatt_hour.iloc[:8],
+        check_names=False,
+    )
+
+
+def test_receding_horizon_without_frozen_periods_matches_reference(make_data, reference, objective, approx):
+    data = make_data(model_receding_horizon=True)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+
+
+def test_receding_horizon_fully_delivered(make_data, reference, objective, approx):
+    data = make_data()
+    reference_solution, reference_objective = reference(data)
+
+    solution = model.run_model(frozen_data(data, reference_solution, 48))
+
+    assert solution.optimal
+    assert solution.frozen_periods == 48
+    assert objective(solution, data) == approx(reference_objective)
+    # Nothing is solved, but the statistics still have every entry.
+    assert solution.model_stats.keys() == reference_solution.model_stats.keys()
+    assert solution.model_stats.solve_seconds == 0.0
@@ -0,0 +1,28 @@
+"""
+Tests of the LP relaxation fast path, with the rounding of its indicators, against the reference MIP.
+"""
+
+import pytest
+
+from optibat import model
+
+
+@pytest.mark.parametrize("res", [True, False])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_relaxation_matches_reference(make_data, reference, objective, approx, res, seed):
+    data = make_data(res=res, seed=seed, model_relaxation=True)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+
+
+def test_relaxation_indicators_are_integral(make_data):
+    data = make_data(model_relaxation=True)
+
+    solution = model.run_model(data)
+
+    indicator = solution.bess_charge_discharge_indicator
+    assert indicator.isin([0.0, 1.0]).all()
@@ -0,0 +1,43 @@
+"""
+Tests of the rolling horizon decomposition against the reference MIP.
+
+Truncated windows cannot see the whole horizon, so the rolling objective is only a lower bound
+of the reference objective (a known gap), and it is not reported as optimal.
+"""
+
+import numpy as np
+
+from optibat import model
+
+
+def test_rolling_is_bounded_by_reference(make_data, reference, objective, approx):
+    data = make_data(days=3, model_decomposition="rolling", model_window_day=1, model_lookahead_day=0)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert not solution.optimal
+    assert np.isnan(solution.gap)
+    assert solution.subproblems_optimal
+    rolling_objective = objective(solution, data)
+    assert rolling_objective <= reference_objective or rolling_objective == approx(reference_objective)
+    assert solution.bess_state_of_charge_megawatt_hour.notna().all()
+
+
+def test_rolling_single_window_matches_reference(make_data, reference, objective, approx):
+    data = make_data(days=2, model_decomposition="rolling", model_window_day=2)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+
+
+def test_rolling_benchmark_reports_loss(make_data, reference):
+    data = make_data(days=3, model_decomposition="rolling", model_window_day=1, model_lookahead_day=0, model_benchmark=True)
+
+    solution = model.run_model(data)
+
+    assert solution.benchmark.reference_optimal
+    assert solution.benchmark.objective_loss_euro >= -1e-6
@@ -0,0 +1,48 @@
+"""
+Tests of the numerical scaling of the model against the reference MIP.
+"""
+
+import pytest
+
+from optibat import model
+
+
+@pytest.mark.parametrize("res", [True, False])
+@pytest.mark.parametrize("relaxation", [True, False])
+def test_scaling_matches_reference(make_data, reference, objective, approx, res, relaxation):
+    data = make_data(res=res, model_scaling=True, model_relaxation=relaxation)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert objective(solution, data) == approx(reference_objective)
+
+
+def test_scaling_keeps_unscaled_schedule(make_data):
+    data = make_data(model_scaling=True)
+
+    solution = model.run_model(data)
+
+    capacity = data.bess_energy_capacity_megawatt_hour
+    assert solution.bess_state_of_charge_megawatt_hour.between(-1e-6, capacity + 1e-6).all()
+    assert solution.bess_cycles_count <= data.market_horizon_day * data.bess_maximum_cycles_count_per_day + 1e-6
+
+
+def test_scaling_reuses_scaled_copy(make_data, reference, objective, approx):
+    # Same topology, so the second run reuses the template and its scaled copy with the new prices and states.
+    datas = [
+        make_data(model_scaling=True, seed=0),
+        make_data(model_scaling=True, seed=1, bess_initial_state_of_charge_percent=20.0),
+    ]
+    copies = []
+    for data in datas:
+        _, reference_objective = reference(data)
+        solution = model.run_model(data)
+        assert solution.optimal
+        assert objective(solution, data) == approx(reference_objective)
+        parameters = model._model_parameters(data)
+        with model._template_model(parameters, model._presolve(parameters)) as template:
+            copies.append(model._scaled_models[template][1])
+
+    assert copies[0] is copies[1]
@@ -0,0 +1,27 @@
+"""
+Tests of batched scenarios, solved as blocks of a single model, against independent runs.
+"""
+
+import pytest
+
+from optibat import model
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_scenarios_match_independent_runs(make_data, objective, approx, processes):
+    scenarios = [make_data(seed=seed, bess_profit_threshold_euro_per_megawatt_hour=float(seed)) for seed in range(3)]
+
+    solutions = model.run_scenarios(scenarios, processes=processes)
+
+    for data, solution in zip(scenarios, solutions):
+        independent = model.run_model(data)
+        assert solution.optimal
+        assert objective(solution, data) == approx(objective(independent, data))
+        assert solution.model_stats.solver == data.solver
+
+
+def test_scenarios_reject_matrix_backend(make_data):
+    data = make_data(solver="scipy")
+
+    with pytest.raises(ValueError):
+        model.run_scenarios([data, data])
@@ -0,0 +1,55 @@
+"""
+Tests of the spread bound, which leaves the battery idle without solving when no price spread can pay for a cycle.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from optibat import model
+
+
+def prices(data, profile):
+    """
+    Replaces the prices of the data with a profile: flat, a spread smaller than the losses, or negative.
+    """
+    index = data.market_input.index
+    hour = np.arange(len(index)) % 24
+    values = {
+        "flat": np.full(len(index), 50.0),
+        "narrow": 50.0 + 1.0 * np.sin(hour / 24.0 * 2.0 * np.pi),
+        "negative": np.full(len(index), -10.0),
+        "daily": data.market_price_euro_per_megawatt_hour.to_numpy(),
+    }[profile]
+    return data | {"market_price_euro_per_megawatt_hour": pd.Series(values, index=index)}
+
+
+@pytest.mark.parametrize(
+    "profile, settings, idle",
+    [
+        ("flat", {"bess_final_state_of_charge_percent": 50.0}, True),
+        ("narrow", {"bess_final_state_of_charge_percent": 50.0}, True),
+        ("narrow", {"bess_initial_state_of_charge_percent": 0.0}, True),
+        ("daily", {"bess_final_state_of_charge_percent": 50.0, "bess_profit_threshold_euro_per_megawatt_hour": 100.0}, True),
+        # Selling the initial energy pays if the final state of charge is free.
+        ("flat", {}, False),
+        # Charging pays by itself.
+        ("negative", {"bess_initial_state_of_charge_percent": 0.0}, False),
+        ("daily", {"bess_final_state_of_charge_percent": 50.0}, False),
+    ],
+)
+def test_spread_bound_matches_reference(make_data, reference, objective, approx, profile, settings, idle):
+    data = prices(make_data(res=False, model_spread_bound=True, **settings), profile)
+    _, reference_objective = reference(data)
+
+    solution = model.run_model(data)
+
+    assert solution.optimal
+    assert (solution.model_stats.solver == "spread_bound") == idle
+    assert objective(solution, data) == approx(reference_objective)
+
+
+def test_spread_bound_skips_renewable_imports(make_data):
+    data = prices(make_data(res=True, model_spread_bound=True, bess_final_state_of_charge_percent=50.0), "flat")
+
+    assert not model._spread_bound_condition(data, model._model_parameters(data))
@@ -0,0 +1,35 @@
+"""
+Tests of the model templates, reused between runs with the same topology.
+"""
+
+from optibat import model
+
+
+def test_template_hit_updates_parameters(make_data, reference, objective, approx):
+    # Same topology, with every kind of parameter changed: prices, capacities, efficiencies, limits and states.
+    datas = [
+        make_data(seed=0),
+        make_data(
+            seed=1,
+            bess_energy_capacity_megawatt_hour=30.0,
+            bess_power_capacity_megawatt=4.0,
+            bess_charging_efficiency_percent=90.0,
+            bess_discharging_efficiency_percent=92.0,
+            bess_grid_export_limits_megawatt=6.0,
+            bess_minimum_state_of_charge_percent=10.0,
+            bess_initial_state_of_charge_percent=40.0,
+            bess_maximum_cycles_count_per_day=1.5,
+        ),
+    ]
+    reference_objectives = [reference(data)[1] for data in datas]
+
+    templates = []
+    for data, reference_objective in zip(datas, reference_objectives):
+        solution = model.run_model(data)
+        assert solution.optimal
+        assert objective(solution, data) == approx(reference_objective)
+        parameters = model._model_parameters(data)
+        with model._templates_lock:
+            templates.append(model._templates[model._topology_signature(parameters)])
+
+    assert templates[0] is templates[1]
@@ -0,0 +1,27 @@
+"""
+Tests of concurrent model runs from a thread pool, as fleet and UI workloads do.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from optibat import model
+
+
+def test_threaded_runs_match_serial_runs(make_data, objective, approx):
+    # Different topologies build different templates, the repeated ones share a template between threads.
+    datas = [
+        make_data(days=1),
+        make_data(days=1, res=False, seed=1),
+        make_data(days=2, seed=2),
+        make_data(days=1, minute=30, seed=3),
+        make_data(days=1, seed=4),
+        make_data(days=1, res=False, seed=5),
+    ] * 2
+    serial = [model.run_model(data) for data in datas]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        threaded = list(executor.map(model.run_model, datas))
+
+    for data, expected, solution in zip(datas, serial, threaded):
+        assert solution.optimal
+        assert solution.market_input.index.equals(data.market_input.index)
+        assert objective(solution, data) == approx(objective(expected, data))
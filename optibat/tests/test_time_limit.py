@@ -0,0 +1,27 @@
+"""
+Tests of the solve deadline, which returns the best incumbent found instead of nothing.
+"""
+
+import numpy as np
+import pytest
+
+from optibat import model
+
+
+def test_time_limit_returns_incumbent_with_gap(make_data, reference, objective):
+    # A week of quarter hours with more than one cycle a day takes a few seconds to prove optimal.
+    data = make_data(days=7, minute=15, bess_maximum_cycles_count_per_day=1.5, solver_time_limit_second=0.5)
+
+    solution = model.run_model(data)
+    if solution.optimal:
+        pytest.skip("Solved before the time limit")
+
+    assert np.isfinite(solution.gap)
+    assert solution.model_stats.gap == solution.gap
+    capacity = data.bess_energy_capacity_megawatt_hour
+    assert solution.bess_state_of_charge_megawatt_hour.between(-1e-6, capacity + 1e-6).all()
+    # The incumbent is within its proven gap of the optimum, which persistent solvers find without the previous limit.
+    _, reference_objective = reference(data | {"solver_time_limit_second": None})
+    assert objective(solution, data) >= reference_objective - solution.gap * abs(reference_objective) - 1e-6
+    # Near optimal schedules are not reused as if they were optimal.
+    assert not model.run_model(data | {"model_cache_size": 4}).cached